@@ -1,10 +1,12 @@
-from app.data.db import connect_database
-from datetime import datetime
+from app.services.database_manager import (
+    get_connection, executemany_batched, DEFAULT_BATCH_SIZE)
+from app.services.write_queue import execute_write, write
+from app.data.timestamps import utc_now
 
 
 def load_history(username, role):
     """Return chat history as a list of dictionaries with role, content, and timestamp."""
-    conn = connect_database()
+    conn = get_connection()
     cur = conn.cursor()
     try:
         cur.execute("""
@@ -28,41 +30,121 @@ def load_history(username, role):
     except Exception as e:
         print("Error loading history:", e)
         return []
-    finally:
-        conn.close()
+
+
+# Messages shown per page in the AI panels
+HISTORY_WINDOW = 20
+
+
+def load_history_window(username, role, limit=HISTORY_WINDOW, before_id=None):
+    """Return (messages, cursor) for the newest `limit` messages older than before_id.
+
+    messages are oldest first and carry their id and status. cursor is the before_id
+    for the next-older page, or None when nothing older remains. Served by
+    idx_chat_user_role_id, so the cost does not grow with history length.
+    """
+    conn = get_connection()
+    try:
+        sql = """
+            SELECT id, message_role, content, timestamp, status
+            FROM ai_chat_history
+            WHERE username = ? AND role = ?
+        """
+        params = [username, role]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = conn.execute(sql, params).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        messages = [{"id": r[0], "role": r[1], "content": r[2], "timestamp": r[3],
+                     "status": r[4]} for r in reversed(rows)]
+        cursor = messages[0]["id"] if more else None
+        return messages, cursor
+
+    except Exception as e:
+        print("Error loading history:", e)
+        return [], None
 
 
 def save_message(username, role, message_role, content):
     """Save one chat message to database."""
-    conn = connect_database()
-    cur = conn.cursor()
     try:
-        ts = datetime.now().isoformat()
-        cur.execute("""
+        ts = utc_now()
+        execute_write("""
             INSERT INTO ai_chat_history (username, role, message_role, content, timestamp)
             VALUES (?, ?, ?, ?, ?)
         """, (username, role, message_role, content, ts))
-        conn.commit()
     except Exception as e:
         print("Error saving message:", e)
-    finally:
-        conn.close()
+
+
+def begin_message(username, role, message_role, content):
+    """Insert a message that is still streaming and return its id."""
+    try:
+        message_id, _ = execute_write("""
+            INSERT INTO ai_chat_history (username, role, message_role, content, timestamp, status)
+            VALUES (?, ?, ?, ?, ?, 'streaming')
+        """, (username, role, message_role, content, utc_now()))
+        return message_id
+    except Exception as e:
+        print("Error saving message:", e)
+        return None
+
+
+def update_message(message_id, content):
+    """Replace the partial content of a streaming message."""
+    try:
+        execute_write("UPDATE ai_chat_history SET content = ? WHERE id = ?",
+                      (content, message_id))
+    except Exception as e:
+        print("Error updating message:", e)
+
+
+def finish_message(message_id, content, status="complete", token_count=None, latency_ms=None):
+    """Write the final content of a streamed message with its token count and latency."""
+    try:
+        execute_write("""
+            UPDATE ai_chat_history
+            SET content = ?, status = ?, token_count = ?, latency_ms = ?
+            WHERE id = ?
+        """, (content, status, token_count, latency_ms, message_id))
+    except Exception as e:
+        print("Error finishing message:", e)
+
+
+def save_messages(messages, batch_size=DEFAULT_BATCH_SIZE):
+    """Save many chat messages in one transaction.
+
+    messages is an iterable of (username, role, message_role, content)
+    tuples, optionally followed by a timestamp. Returns the number saved.
+    """
+    now = utc_now()
+    rows = (tuple(m) if len(m) > 4 else tuple(m) + (now,) for m in messages)
+    return executemany_batched("""
+        INSERT INTO ai_chat_history (username, role, message_role, content, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows, batch_size)
+
+
+def _delete_history(conn, username, role):
+    conn.execute("""
+        DELETE FROM ai_chat_history
+        WHERE username = ? AND role = ?
+    """, (username, role))
+    conn.execute("DELETE FROM ai_chat_summaries WHERE username = ? AND role = ?",
+                 (username, role))
 
 
 def delete_history(username, role):
     """Delete all chat history for a user and role."""
-    conn = connect_database()
-    cur = conn.cursor()
     try:
-        cur.execute("""
-            DELETE FROM ai_chat_history
-            WHERE username = ? AND role = ?
-        """, (username, role))
-        conn.commit()
+        write(_delete_history, username, role)
     except Exception as e:
         print("Error deleting history:", e)
-    finally:
-        conn.close()
 
 # OOP Service wrapper
 class AIHistoryService:
@@ -71,8 +153,23 @@ class AIHistoryService:
     def load(self, username, role):
         return load_history(username, role)
 
+    def load_window(self, username, role, limit=HISTORY_WINDOW, before_id=None):
+        return load_history_window(username, role, limit, before_id)
+
     def save(self, username, role, message_role, content):
         save_message(username, role, message_role, content)
 
+    def begin(self, username, role, message_role, content):
+        return begin_message(username, role, message_role, content)
+
+    def update(self, message_id, content):
+        update_message(message_id, content)
+
+    def finish(self, message_id, content, status="complete", token_count=None, latency_ms=None):
+        finish_message(message_id, content, status, token_count, latency_ms)
+
+    def save_many(self, messages, batch_size=DEFAULT_BATCH_SIZE):
+        return save_messages(messages, batch_size)
+
     def clear(self, username, role):
         delete_history(username, role)
@@ -1,6 +1,7 @@
 import streamlit as st
 from app.services.user_service import login_user, register_user
 from app.ui.styles import load_custom_css
+from app.ui.session import current_session, start_session
 
 
 class HomePage:
@@ -15,8 +16,6 @@ class HomePage:
         if "token" not in st.session_state:
             st.session_state["token"] = ""
 
-        self.qp = st.query_params
-
     def render(self):
         title_html = """
         <div class="neon-title-container">
@@ -29,9 +28,10 @@ class HomePage:
         self.render_auth_tabs()
 
     def quick_launch(self):
-        if "user" in self.qp and self.qp.get("user"):
-            username = self.qp.get("user")[0]
-            role = self.qp.get("role", [""])[0]
+        claims = current_session()
+        if claims:
+            username = claims["sub"]
+            role = claims["role"]
 
             st.success(f"Welcome back — {username}")
             if st.button("🚀 Launch Dashboard"):
@@ -68,11 +68,7 @@ class HomePage:
                 success, msg, token, role = login_user(username, password)
 
                 if success:
-                    st.query_params = {
-                        "user": [username],
-                        "role": [role],
-                    }
-                    st.session_state.token = token
+                    start_session(token)
                     st.session_state.last_page = "Home"
                     self.launch_dashboard(role)
                 else:
@@ -127,11 +123,7 @@ class HomePage:
             if st.button("🚀 Login with Selected Account", key="demo_login_button"):
                 success, msg, token, user_role = login_user(username, password)
                 if success:
-                    st.query_params = {
-                        "user": [username],
-                        "role": [user_role],
-                    }
-                    st.session_state.token = token
+                    start_session(token)
                     st.session_state.last_page = "Home"
                     self.launch_dashboard(user_role)
                 else:
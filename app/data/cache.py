@@ -0,0 +1,196 @@
+from app.services import database_manager
+from app.services.database_manager import add_commit_listener
+from app.data.db import connect_database
+from collections import OrderedDict
+import functools
+import sys
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+# PRAGMA data_version is re-read at most this often (seconds). Writes made
+# in this process are seen at once through the generation counter; only
+# writes by other processes can take up to this long to invalidate.
+DEFAULT_VERSION_INTERVAL = 0.1
+
+
+def estimate_size(value):
+    """Rough in-memory size of a cached result in bytes."""
+    if hasattr(value, "memory_usage"):  # pandas DataFrame / Series
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class QueryCache:
+    """Process-wide LRU cache for read-query results.
+
+    An entry is served only while the database is unchanged, which is
+    checked two ways: a write-generation counter bumped after every
+    data-layer commit in this process, and SQLite's PRAGMA data_version
+    read on a dedicated connection, which also moves when another process
+    writes. data_version is read outside the entry lock and at most once
+    per version_interval, so cache hits do not queue behind a query.
+    Concurrent misses on the same key compute the result once and share
+    it. Cached values are shared between sessions and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 version_interval=DEFAULT_VERSION_INTERVAL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version_interval = version_interval
+        self._entries = OrderedDict()  # key -> (token, value, size)
+        self._inflight = {}  # key -> lock held while computing
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._version_lock = threading.Lock()
+        self._version_conn = None
+        self._version_path = None
+        self._version = None  # (path, data_version, monotonic time read)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation += 1
+
+    def _fresh_version(self, path):
+        version = self._version
+        if (version is not None and version[0] == path
+                and time.monotonic() - version[2] < self.version_interval):
+            return version[1]
+        return None
+
+    def _data_version(self, path):
+        """Return PRAGMA data_version for path, re-reading it at most once per interval."""
+        version = self._fresh_version(path)
+        if version is not None:
+            return version
+        # One thread re-reads; the others wait for it rather than queueing
+        # up their own queries. The version connection is never used for writes.
+        with self._version_lock:
+            version = self._fresh_version(path)
+            if version is not None:
+                return version
+            if self._version_conn is None or self._version_path != path:
+                if self._version_conn is not None:
+                    self._version_conn.close()
+                self._version_conn = connect_database(path)
+                self._version_path = path
+            version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            self._version = (path, version, time.monotonic())
+            return version
+
+    def _token(self):
+        path = database_manager.db_manager.db_path
+        # Read the generation first: a commit landing in between then makes
+        # the token stale rather than hiding the write
+        generation = self._generation
+        return (path, generation, self._data_version(path))
+
+    def _lookup(self, key, token):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+        return False, None
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing it on a miss."""
+        # Take the token before computing so a concurrent write makes the
+        # stored result stale rather than being missed.
+        token = self._token()
+        found, value = self._lookup(key, token)
+        if found:
+            return value
+
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                found, value = self._lookup(key, token)
+                if found:
+                    return value
+
+                value = compute()
+                with self._lock:
+                    self.misses += 1
+                    self._store(key, token, value)
+            finally:
+                # Removed even when compute() raises, so the key is not
+                # left with a lock nobody will ever clean up
+                with self._lock:
+                    if self._inflight.get(key) is key_lock:
+                        del self._inflight[key]
+        return value
+
+    def _store(self, key, token, value):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        self._entries[key] = (token, value, size)
+        self.bytes += size
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "generation": self._generation,
+            }
+
+
+query_cache = QueryCache()
+add_commit_listener(query_cache.bump_generation)
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def cached_query(fn):
+    """Decorator serving fn's result from query_cache, keyed by its arguments."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__module__, fn.__qualname__, _freeze(list(args)), _freeze(kwargs))
+        try:
+            hash(key)
+        except TypeError:
+            return fn(*args, **kwargs)
+        return query_cache.get_or_compute(key, lambda: fn(*args, **kwargs))
+    return wrapper
@@ -1,5 +1,15 @@
-from app.data.db import connect_database
+from app.services.database_manager import get_connection, commit
+from app.data.cache import cached_query
+from app.data.pagination import fetch_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.data.timestamps import fetch_between
+from app.data.schema import storage_table
 import pandas as pd
+import io
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Expected table schemas for CSV validation
@@ -29,12 +39,81 @@ def validate_csv_schema(df, table_name):
     return True, None
 
 
-def load_csv_to_table(csv_path, table_name, if_exists="append"):
-    """Load a CSV into a database table with schema validation."""
+# Columns the per-dataset size charts need
+DATASET_SIZE_COLUMNS = ["rows", "columns", "uploaded_by"]
+
+# Rows per chunk when streaming large CSV files
+DEFAULT_CHUNKSIZE = 50_000
+
+# Parallel ingest: bytes of CSV per worker task, and the suffixes it can
+# split (compressed files cannot be seeked into and are streamed instead)
+PARALLEL_RANGE_BYTES = 16 * 1024 * 1024
+PARALLEL_SUFFIXES = {".csv", ".txt"}
+
+
+def _column_mapping(columns, table_name):
+    """Map actual CSV column names to the expected schema names (case-insensitive).
+    Returns None for tables without a declared schema."""
+    if table_name not in TABLE_SCHEMAS:
+        return None
+
+    col_mapping = {}
+    df_cols_lower = {col.lower(): col for col in columns}
+
+    for expected_col in TABLE_SCHEMAS[table_name]:
+        if expected_col.lower() in df_cols_lower:
+            col_mapping[df_cols_lower[expected_col.lower()]] = expected_col
+    return col_mapping
+
+
+def _prepare_target(conn, table_name, if_exists):
+    """Return the to_sql mode to use, clearing known tables for 'replace'.
+
+    Known tables are emptied rather than dropped so that their primary key,
+    indexes and triggers survive a replace-mode upload. Coded tables are
+    emptied through their storage table rather than row by row via the view.
+    """
+    if if_exists == "replace" and table_name in TABLE_SCHEMAS:
+        conn.execute(f"DELETE FROM {storage_table(table_name)}")
+        return "append"
+    return if_exists
+
+
+def load_csv_to_table(csv_path, table_name, if_exists="append", stream=False,
+                      chunksize=DEFAULT_CHUNKSIZE, progress_callback=None,
+                      parallel=False, workers=None):
+    """Load a CSV into a database table with schema validation.
+
+    With stream=True the file is read chunksize rows at a time and each chunk
+    is inserted in its own transaction, so memory use is bounded by the chunk
+    rather than the file. .gz/.zip/.bz2/.xz inputs are decompressed on the fly.
+    progress_callback(rows_loaded, rows_per_sec) is called after every chunk.
+
+    With parallel=True, uncompressed CSVs for the known tables are split into
+    byte ranges parsed by `workers` processes (default: one per CPU) and
+    written in file order; other inputs fall back to streaming.
+    """
     csv_path = Path(csv_path)
     if not csv_path.exists():
         raise FileNotFoundError(f"CSV not found: {csv_path}")
 
+    if parallel and table_name in TABLE_SCHEMAS and csv_path.suffix.lower() in PARALLEL_SUFFIXES:
+        return _parallel_csv_to_table(csv_path, table_name, if_exists,
+                                      workers, progress_callback)
+
+    if stream or parallel:
+        return _stream_csv_to_table(csv_path, table_name, if_exists,
+                                    chunksize, progress_callback)
+
+    return write_frame_to_table(read_csv_for_table(csv_path, table_name),
+                                table_name, if_exists)
+
+
+def read_csv_for_table(csv_path, table_name):
+    """Parse and validate a CSV, returning only the table's schema columns.
+
+    Touches no database state, so it can run in a worker process.
+    """
     try:
         df = pd.read_csv(csv_path)
     except Exception as e:
@@ -48,52 +127,283 @@ def load_csv_to_table(csv_path, table_name, if_exists="append"):
     if not is_valid:
         raise ValueError(f"Schema validation failed: {error_msg}")
 
-    # Select only expected columns (case-insensitive matching)
-    if table_name in TABLE_SCHEMAS:
-        expected_cols = TABLE_SCHEMAS[table_name]
-        # Map actual column names (case-insensitive) to expected names
-        col_mapping = {}
-        df_cols_lower = {col.lower(): col for col in df.columns}
-        
-        for expected_col in expected_cols:
-            if expected_col.lower() in df_cols_lower:
-                actual_col_name = df_cols_lower[expected_col.lower()]
-                col_mapping[actual_col_name] = expected_col
-        
-        # Select matching columns and rename to expected schema
-        selected_cols = list(col_mapping.keys())
-        df_filtered = df[selected_cols].rename(columns=col_mapping)
-    else:
-        df_filtered = df
+    # Select only expected columns and rename to expected schema
+    col_mapping = _column_mapping(df.columns, table_name)
+    if col_mapping is not None:
+        return df[list(col_mapping.keys())].rename(columns=col_mapping)
+    return df
 
+
+def write_frame_to_table(df, table_name, if_exists="append"):
+    """Insert a validated DataFrame in one transaction; returns the row count."""
+    conn = get_connection()
     try:
-        conn = connect_database()
-        df_filtered.to_sql(
+        df.to_sql(
             name=table_name,
             con=conn,
-            if_exists=if_exists,
+            if_exists=_prepare_target(conn, table_name, if_exists),
             index=False
         )
-        rows = len(df_filtered)
-        conn.close()
-        return rows
+        commit()
+        return len(df)
     except Exception as e:
-        conn.close()
+        conn.rollback()
         raise ValueError(f"Failed to insert data into database: {e}")
 
 
+def _stream_csv_to_table(csv_path, table_name, if_exists, chunksize, progress_callback):
+    """Chunked variant of load_csv_to_table; see its docstring."""
+    try:
+        header = pd.read_csv(csv_path, nrows=0)
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV file: {e}")
+
+    # Validate the header once, before any rows are parsed
+    is_valid, error_msg = validate_csv_schema(header, table_name)
+    if not is_valid:
+        raise ValueError(f"Schema validation failed: {error_msg}")
+
+    col_mapping = _column_mapping(header.columns, table_name)
+    usecols = list(col_mapping.keys()) if col_mapping is not None else None
+
+    conn = get_connection()
+    mode = if_exists
+    rows = 0
+    start = time.perf_counter()
+
+    try:
+        reader = pd.read_csv(csv_path, chunksize=chunksize, usecols=usecols)
+        for chunk in reader:
+            if col_mapping is not None:
+                chunk = chunk.rename(columns=col_mapping)
+            if rows == 0:
+                mode = _prepare_target(conn, table_name, if_exists)
+            chunk.to_sql(name=table_name, con=conn, if_exists=mode, index=False)
+            commit()
+
+            # Later chunks always append to what the first one created
+            mode = "append"
+            rows += len(chunk)
+            if progress_callback:
+                elapsed = time.perf_counter() - start
+                progress_callback(rows, rows / elapsed if elapsed else 0.0)
+    except Exception as e:
+        conn.rollback()
+        raise ValueError(f"Failed to insert data into database after {rows} rows: {e}")
+
+    if rows == 0:
+        raise ValueError("CSV file is empty")
+    return rows
+
+
+def _count_quotes(fh, start, end, block=8 * 1024 * 1024):
+    fh.seek(start)
+    count = 0
+    remaining = end - start
+    while remaining > 0:
+        data = fh.read(min(block, remaining))
+        if not data:
+            break
+        count += data.count(b'"')
+        remaining -= len(data)
+    return count
+
+
+def split_csv_ranges(csv_path, range_bytes=None):
+    """Return (header, ranges): the header line and (start, end) byte ranges
+    that each hold whole records.
+
+    A boundary is the first line end after every range_bytes (default
+    PARALLEL_RANGE_BYTES) that is not inside a quoted field; quote parity
+    is tracked from the start of the data, so multi-line quoted
+    descriptions are never split.
+    """
+    range_bytes = range_bytes or PARALLEL_RANGE_BYTES
+    size = os.path.getsize(csv_path)
+    with open(csv_path, "rb") as fh:
+        header = fh.readline()
+        boundaries = [fh.tell()]
+        quotes = 0
+        pos = boundaries[0]
+        target = pos + range_bytes
+        while target < size:
+            quotes += _count_quotes(fh, pos, target)
+            fh.seek(target)
+            pos = target
+            while True:
+                line = fh.readline()
+                if not line:
+                    break
+                quotes += line.count(b'"')
+                pos += len(line)
+                if quotes % 2 == 0:
+                    break
+            if pos >= size:
+                break
+            boundaries.append(pos)
+            target = pos + range_bytes
+        boundaries.append(size)
+    ranges = [(a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+    return header, ranges
+
+
+def parse_csv_range(csv_path, start, end, header, usecols, col_mapping):
+    """Parse bytes [start, end) of a CSV and return the schema columns.
+
+    Values are read as strings (missing values stay NaN) so that the result
+    never depends on how the file was split; the table's column types
+    convert them on insert. Runs in a worker process.
+    """
+    with open(csv_path, "rb") as fh:
+        fh.seek(start)
+        data = fh.read(end - start)
+    try:
+        df = pd.read_csv(io.BytesIO(header + data), usecols=usecols, dtype=str)
+    except Exception as e:
+        raise ValueError(f"Failed to parse bytes {start}-{end}: {e}")
+    return df.rename(columns=col_mapping)[list(col_mapping.values())]
+
+
+def _parallel_csv_to_table(csv_path, table_name, if_exists, workers, progress_callback):
+    """Process-pool variant of load_csv_to_table; see its docstring."""
+    try:
+        header_df = pd.read_csv(csv_path, nrows=0)
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV file: {e}")
+
+    is_valid, error_msg = validate_csv_schema(header_df, table_name)
+    if not is_valid:
+        raise ValueError(f"Schema validation failed: {error_msg}")
+
+    col_mapping = _column_mapping(header_df.columns, table_name)
+    usecols = list(col_mapping.keys())
+    header, ranges = split_csv_ranges(csv_path)
+    if not ranges:
+        raise ValueError("CSV file is empty")
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+
+    conn = get_connection()
+    rows = 0
+    start = time.perf_counter()
+    mode = _prepare_target(conn, table_name, if_exists)
+
+    def write_batch(df):
+        nonlocal rows
+        df.to_sql(name=table_name, con=conn, if_exists=mode, index=False)
+        commit()
+        rows += len(df)
+        if progress_callback:
+            elapsed = time.perf_counter() - start
+            progress_callback(rows, rows / elapsed if elapsed else 0.0)
+
+    try:
+        if workers == 1:
+            for a, b in ranges:
+                write_batch(parse_csv_range(csv_path, a, b, header, usecols, col_mapping))
+        else:
+            # At most two ranges per worker are parsed ahead of the writer,
+            # so memory stays bounded however large the file is. Workers are
+            # spawned, not forked: this runs inside the multi-threaded
+            # Streamlit server, whose held locks and pooled SQLite handles
+            # a forked child would inherit.
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                pending = deque()
+                for a, b in ranges:
+                    pending.append(pool.submit(
+                        parse_csv_range, str(csv_path), a, b, header, usecols, col_mapping))
+                    if len(pending) >= workers * 2:
+                        write_batch(pending.popleft().result())
+                while pending:
+                    write_batch(pending.popleft().result())
+    except Exception as e:
+        conn.rollback()
+        raise ValueError(f"Failed to insert data into database after {rows} rows: {e}")
+
+    if rows == 0:
+        raise ValueError("CSV file is empty")
+    return rows
+
+
+@cached_query
 def list_datasets():
-    conn = connect_database()
-    df = pd.read_sql_query(
+    conn = get_connection()
+    return pd.read_sql_query(
         "SELECT * FROM datasets_metadata ORDER BY dataset_id ASC", conn)
-    conn.close()
-    return df
+
+@cached_query
+def list_datasets_page(after_id=None, limit=DEFAULT_PAGE_SIZE, columns=None):
+    """Return up to `limit` datasets with dataset_id > after_id."""
+    return fetch_page("datasets_metadata", "dataset_id", after_id, limit, columns)
+
+@cached_query
+def list_datasets_between(start=None, end=None, columns=None, limit=None):
+    """Return datasets with start <= upload_date < end, oldest first."""
+    return fetch_between("datasets_metadata", start, end, columns, limit)
+
+@cached_query
+def list_recent_datasets(limit=MAX_PAGE_SIZE, columns=DATASET_SIZE_COLUMNS):
+    """Return the newest `limit` datasets (by dataset_id), for distribution charts."""
+    return fetch_page("datasets_metadata", "dataset_id", None, limit, columns, descending=True)
+
+@cached_query
+def get_uploads_by_day():
+    """Return (day, datasets, rows) per upload day, oldest first."""
+    return pd.read_sql_query("""
+    SELECT date(upload_date) AS day, COUNT(*) AS datasets,
+           COALESCE(SUM("rows"), 0) AS "rows"
+    FROM datasets_metadata
+    WHERE date(upload_date) IS NOT NULL
+    GROUP BY date(upload_date)
+    ORDER BY date(upload_date)
+    """, get_connection())
+
+@cached_query
+def get_uploader_summary():
+    """Return (uploaded_by, datasets, total_rows) per uploader."""
+    return pd.read_sql_query("""
+    SELECT uploaded_by, COUNT(*) AS datasets, COALESCE(SUM("rows"), 0) AS total_rows
+    FROM datasets_metadata
+    WHERE uploaded_by IS NOT NULL
+    GROUP BY uploaded_by
+    """, get_connection())
+
+@cached_query
+def get_column_counts():
+    """Return (columns, count): how many datasets have each column count."""
+    return pd.read_sql_query("""
+    SELECT "columns", COUNT(*) AS count
+    FROM datasets_metadata
+    WHERE "columns" IS NOT NULL
+    GROUP BY "columns"
+    """, get_connection())
 
 class DatasetService:
     """Handle dataset operations."""
 
-    def load_csv(self, csv_path, table_name, if_exists="append"):
-        return load_csv_to_table(csv_path, table_name, if_exists)
+    def load_csv(self, csv_path, table_name, if_exists="append", stream=False,
+                 chunksize=DEFAULT_CHUNKSIZE, progress_callback=None,
+                 parallel=False, workers=None):
+        return load_csv_to_table(csv_path, table_name, if_exists, stream,
+                                 chunksize, progress_callback, parallel, workers)
 
     def list_all(self):
         return list_datasets()
+
+    def page(self, after_id=None, limit=DEFAULT_PAGE_SIZE, columns=None):
+        return list_datasets_page(after_id, limit, columns)
+
+    def between(self, start=None, end=None, columns=None, limit=None):
+        return list_datasets_between(start, end, columns, limit)
+
+    def recent(self, limit=MAX_PAGE_SIZE, columns=DATASET_SIZE_COLUMNS):
+        return list_recent_datasets(limit, columns)
+
+    def uploads_by_day(self):
+        return get_uploads_by_day()
+
+    def uploader_summary(self):
+        return get_uploader_summary()
+
+    def column_counts(self):
+        return get_column_counts()
@@ -4,12 +4,30 @@ import sqlite3
 # Database file path in DATA folder
 DB_PATH = Path("DATA") / "intelligence_platform.db"
 
+# Per-connection tuning applied once when a connection is opened
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",          # readers no longer block on writers
+    "synchronous": "NORMAL",        # safe with WAL, far fewer fsyncs
+    "busy_timeout": 5000,           # ms to wait on a locked database
+    "mmap_size": 268435456,         # 256 MB memory-mapped reads
+    "cache_size": -65536,           # 64 MB page cache (negative = KiB)
+    "temp_store": "MEMORY",
+}
+
+
+def configure_connection(conn):
+    """Apply the standard PRAGMA set to an open connection."""
+    for pragma, value in CONNECTION_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
 
 def connect_database(db_path: Path = DB_PATH):
-    """Return a SQLite3 connection object."""
+    """Return a new, tuned SQLite3 connection object."""
+    db_path = Path(db_path)
     # Ensure parent directory exists
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
     # Use row_factory for easier row access
     conn.row_factory = sqlite3.Row
-    return conn
+    return configure_connection(conn)
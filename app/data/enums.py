@@ -0,0 +1,16 @@
+from app.data.schema import lookup_table
+
+
+def encode(conn, table, column, value):
+    """Return the code for value in table.column, adding it to the lookup if new.
+
+    Runs on the caller's connection, so it belongs inside a write command.
+    """
+    if value is None:
+        return None
+    lookup = lookup_table(table, column)
+    row = conn.execute(f"SELECT code FROM {lookup} WHERE value = ?", (value,)).fetchone()
+    if row is not None:
+        return row[0]
+    return conn.execute(f"INSERT INTO {lookup} (value) VALUES (?)", (value,)).lastrowid
+
@@ -1,95 +1,138 @@
-from app.data.db import connect_database
+from app.services.database_manager import (
+    get_connection, executemany_batched, DEFAULT_BATCH_SIZE)
+from app.services.write_queue import write, execute_write
+from app.data.cache import cached_query
+from app.data.enums import encode
+from app.data.pagination import fetch_page, DEFAULT_PAGE_SIZE
+from app.data.timestamps import fetch_between
 import pandas as pd
 
+# Grid columns without the (large) free-text description
+INCIDENT_SUMMARY_COLUMNS = ["incident_id", "timestamp", "severity", "category", "status"]
+
+
+def _insert_incident(conn, incident_id, timestamp, severity, category, status, description):
+    # Written to storage directly: inserts through the view report no lastrowid
+    return conn.execute("""
+        INSERT INTO cyber_incidents_base
+        (incident_id, timestamp, severity_id, category_id, status_id, description)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (incident_id, timestamp,
+          encode(conn, "cyber_incidents", "severity", severity),
+          encode(conn, "cyber_incidents", "category", category),
+          encode(conn, "cyber_incidents", "status", status),
+          description)).lastrowid
+
 
 def insert_incident(timestamp, severity, category, status, description, incident_id=None):
     """Insert a new incident. ID defaults to database-generated if not provided."""
-    conn = connect_database()
-    cur = conn.cursor()
+    return write(_insert_incident, incident_id, timestamp, severity, category, status, description)
+
+
+def insert_incidents(incidents, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert many incidents in one transaction.
 
-    cur.execute("""
+    incidents is an iterable of (timestamp, severity, category, status,
+    description) tuples, optionally followed by an incident_id.
+    Returns the number of rows inserted.
+    """
+    rows = (tuple(row) + (None,) * (6 - len(row)) for row in incidents)
+    return executemany_batched("""
         INSERT INTO cyber_incidents
-        (incident_id, timestamp, severity, category, status, description)
+        (timestamp, severity, category, status, description, incident_id)
         VALUES (?, ?, ?, ?, ?, ?)
-    """, (incident_id, timestamp, severity, category, status, description))
-
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
-    return new_id
+    """, rows, batch_size)
 
 
+@cached_query
 def get_all_incidents():
     """Return all incidents as a DataFrame."""
-    conn = connect_database()
-    df = pd.read_sql_query(
+    conn = get_connection()
+    return pd.read_sql_query(
         "SELECT * FROM cyber_incidents ORDER BY incident_id ASC", conn)
-    conn.close()
-    return df
+
+
+@cached_query
+def get_incidents_page(after_id=None, limit=DEFAULT_PAGE_SIZE, columns=INCIDENT_SUMMARY_COLUMNS):
+    """Return up to `limit` incidents with incident_id > after_id.
+    Pass columns=None to include every column (including description)."""
+    return fetch_page("cyber_incidents", "incident_id", after_id, limit, columns)
+
+
+@cached_query
+def get_incidents_between(start=None, end=None, columns=INCIDENT_SUMMARY_COLUMNS, limit=None):
+    """Return incidents with start <= timestamp < end, oldest first.
+    Bounds may be datetimes, dates, ISO strings or epoch seconds."""
+    return fetch_between("cyber_incidents", start, end, columns, limit)
 
 
 def get_incident_by_id(incident_id):
     """Return a single incident by ID."""
-    conn = connect_database()
+    conn = get_connection()
     cur = conn.cursor()
     cur.execute(
         "SELECT * FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return cur.fetchone()
+
+
+def _update_incident_status(conn, incident_id, new_status):
+    return conn.execute(
+        "UPDATE cyber_incidents_base SET status_id = ? WHERE incident_id = ?",
+        (encode(conn, "cyber_incidents", "status", new_status), incident_id)).rowcount
 
 
 def update_incident_status(incident_id, new_status):
     """Update an incident status."""
-    conn = connect_database()
-    cur = conn.cursor()
-    cur.execute("UPDATE cyber_incidents SET status = ? WHERE incident_id = ?",
-                (new_status, incident_id))
-    conn.commit()
-    rows = cur.rowcount
-    conn.close()
-    return rows
+    return write(_update_incident_status, incident_id, new_status)
 
 
 def delete_incident(incident_id):
     """Delete an incident by ID."""
-    conn = connect_database()
-    cur = conn.cursor()
-    cur.execute(
-        "DELETE FROM cyber_incidents WHERE incident_id = ?", (incident_id,))
-    conn.commit()
-    rows = cur.rowcount
-    conn.close()
-    return rows
+    _, rowcount = execute_write(
+        "DELETE FROM cyber_incidents_base WHERE incident_id = ?", (incident_id,))
+    return rowcount
 
 
+@cached_query
 def get_incidents_by_type_count():
     """Count incidents by category."""
-    conn = connect_database()
+    conn = get_connection()
     query = """
-    SELECT category, COUNT(*) AS count
-    FROM cyber_incidents
-    GROUP BY category
+    SELECT (SELECT value FROM incident_categories WHERE code = category_id) AS category,
+           COUNT(*) AS count
+    FROM cyber_incidents_base
+    GROUP BY category_id
     ORDER BY count DESC
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    return pd.read_sql_query(query, conn)
 
 
+@cached_query
 def get_high_severity_by_status():
     """Count high severity incidents by status."""
-    conn = connect_database()
+    conn = get_connection()
     query = """
-    SELECT status, COUNT(*) AS count
-    FROM cyber_incidents
-    WHERE severity = 'High'
-    GROUP BY status
+    SELECT (SELECT value FROM incident_statuses WHERE code = status_id) AS status,
+           COUNT(*) AS count
+    FROM cyber_incidents_base
+    WHERE severity_id = (SELECT code FROM incident_severities WHERE value = 'High')
+    GROUP BY status_id
     ORDER BY count DESC
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    return pd.read_sql_query(query, conn)
+
+@cached_query
+def get_severity_category_counts():
+    """Count incidents by (category, severity); read from one covering index."""
+    conn = get_connection()
+    query = """
+    SELECT (SELECT value FROM incident_categories WHERE code = category_id) AS category,
+           (SELECT value FROM incident_severities WHERE code = severity_id) AS severity,
+           COUNT(*) AS count
+    FROM cyber_incidents_base
+    GROUP BY category_id, severity_id
+    """
+    return pd.read_sql_query(query, conn)
 
 class IncidentService:
     """Handle cybersecurity incidents."""
@@ -97,9 +140,18 @@ class IncidentService:
     def add_incident(self, timestamp, severity, category, status, description):
         return insert_incident(timestamp, severity, category, status, description)
 
+    def add_incidents(self, incidents, batch_size=DEFAULT_BATCH_SIZE):
+        return insert_incidents(incidents, batch_size)
+
     def all_incidents(self):
         return get_all_incidents()
 
+    def page(self, after_id=None, limit=DEFAULT_PAGE_SIZE, columns=INCIDENT_SUMMARY_COLUMNS):
+        return get_incidents_page(after_id, limit, columns)
+
+    def between(self, start=None, end=None, columns=INCIDENT_SUMMARY_COLUMNS, limit=None):
+        return get_incidents_between(start, end, columns, limit)
+
     def get_by_id(self, incident_id):
         return get_incident_by_id(incident_id)
 
@@ -114,3 +166,6 @@ class IncidentService:
 
     def high_severity_by_status(self):
         return get_high_severity_by_status()
+
+    def severity_category_counts(self):
+        return get_severity_category_counts()
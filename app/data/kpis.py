@@ -0,0 +1,151 @@
+from app.services.database_manager import get_connection
+from app.data.cache import cached_query
+import pandas as pd
+
+# One grouped query per domain, over the coded storage tables. Status,
+# severity and priority are compared case-insensitively, matching the
+# .str.lower() checks the pages used to do: each lookup table is filtered
+# once and every row is then tested by its integer code.
+
+INCIDENT_KPI_QUERY = """
+SELECT
+    COUNT(*) AS total,
+    COALESCE(SUM(status_id IN (
+        SELECT code FROM incident_statuses WHERE lower(value) = 'open')), 0) AS open,
+    COALESCE(SUM(status_id IN (
+        SELECT code FROM incident_statuses WHERE lower(value) = 'closed')), 0) AS closed,
+    COALESCE(SUM(severity_id IN (
+        SELECT code FROM incident_severities WHERE lower(value) = 'critical')), 0) AS critical,
+    COALESCE(SUM(severity_id IN (
+        SELECT code FROM incident_severities WHERE lower(value) = 'high')), 0) AS high,
+    COUNT(DISTINCT category_id) AS unique_categories,
+    (SELECT value FROM incident_categories WHERE code = (
+        SELECT category_id FROM cyber_incidents_base
+        WHERE category_id IS NOT NULL
+        GROUP BY category_id
+        ORDER BY COUNT(*) DESC,
+                 (SELECT value FROM incident_categories WHERE code = category_id)
+        LIMIT 1)) AS top_category
+FROM cyber_incidents_base
+"""
+
+TICKET_KPI_QUERY = """
+SELECT
+    COUNT(*) AS total,
+    COALESCE(SUM(status_id IN (
+        SELECT code FROM ticket_statuses WHERE lower(value) = 'open')), 0) AS open,
+    COALESCE(SUM(status_id IN (
+        SELECT code FROM ticket_statuses WHERE lower(value) IN ('resolved', 'closed'))), 0) AS resolved,
+    COALESCE(SUM(priority_id IN (
+        SELECT code FROM ticket_priorities WHERE lower(value) IN ('high', 'critical'))), 0) AS high_priority,
+    COUNT(DISTINCT assigned_to_id) AS unique_assignees,
+    AVG(resolution_time_hours) AS avg_resolution_hours,
+    (SELECT value FROM ticket_priorities WHERE code = (
+        SELECT priority_id FROM it_tickets_base
+        WHERE priority_id IS NOT NULL
+        GROUP BY priority_id
+        ORDER BY COUNT(*) DESC,
+                 (SELECT value FROM ticket_priorities WHERE code = priority_id)
+        LIMIT 1)) AS top_priority
+FROM it_tickets_base
+"""
+
+DATASET_KPI_QUERY = """
+SELECT
+    COUNT(*) AS total,
+    COALESCE(SUM("rows"), 0) AS total_rows,
+    COALESCE(SUM("columns"), 0) AS total_columns,
+    COUNT(DISTINCT uploaded_by) AS unique_uploaders,
+    AVG("rows") AS avg_rows,
+    AVG("columns") AS avg_columns,
+    COALESCE(MAX("rows"), 0) AS max_rows
+FROM datasets_metadata
+"""
+
+# Target resolution time per ticket priority, used for the SLA figures
+SLA_HOURS = {"critical": 4, "high": 8, "medium": 24, "low": 72}
+
+# sla_hours is built from the priority codes (see assignee_sla_query), so
+# each ticket is checked with an integer CASE rather than a lookup join
+ASSIGNEE_SLA_QUERY = """
+SELECT
+    (SELECT value FROM ticket_assignees WHERE code = t.assigned_to_id) AS assigned_to,
+    COUNT(*) AS tickets,
+    COALESCE(SUM(t.status_id IN (
+        SELECT code FROM ticket_statuses WHERE lower(value) = 'open')), 0) AS open,
+    AVG(t.resolution_time_hours) AS avg_resolution_hours,
+    AVG(CASE WHEN t.resolution_time_hours IS NULL THEN NULL
+             ELSE t.resolution_time_hours <= {sla_hours}
+        END) AS within_sla
+FROM it_tickets_base AS t
+WHERE t.assigned_to_id IS NOT NULL
+GROUP BY t.assigned_to_id
+ORDER BY tickets DESC, assigned_to
+"""
+
+
+def assignee_sla_query(conn):
+    """Return ASSIGNEE_SLA_QUERY with the targets for the current priority codes."""
+    cases = " ".join(
+        f"WHEN {code} THEN {SLA_HOURS[value.lower()]}"
+        for code, value in conn.execute("SELECT code, value FROM ticket_priorities")
+        if value.lower() in SLA_HOURS)
+    default = SLA_HOURS["medium"]
+    sla_hours = f"CASE t.priority_id {cases} ELSE {default} END" if cases else str(default)
+    return ASSIGNEE_SLA_QUERY.format(sla_hours=sla_hours)
+
+
+def _fetch_kpis(query):
+    row = get_connection().execute(query).fetchone()
+    return dict(row)
+
+
+@cached_query
+def get_incident_kpis():
+    """Return the Cybersecurity metric row as a dict."""
+    kpis = _fetch_kpis(INCIDENT_KPI_QUERY)
+    kpis["resolution_rate"] = (
+        round(kpis["closed"] / kpis["total"] * 100, 1) if kpis["total"] else 0)
+    return kpis
+
+
+@cached_query
+def get_ticket_kpis():
+    """Return the IT Operations metric row as a dict."""
+    kpis = _fetch_kpis(TICKET_KPI_QUERY)
+    kpis["resolution_rate"] = (
+        round(kpis["resolved"] / kpis["total"] * 100, 1) if kpis["total"] else 0)
+    kpis["avg_resolution_hours"] = round(kpis["avg_resolution_hours"] or 0, 1)
+    return kpis
+
+
+@cached_query
+def get_dataset_kpis():
+    """Return the Data Science metric row as a dict."""
+    kpis = _fetch_kpis(DATASET_KPI_QUERY)
+    kpis["avg_rows"] = round(kpis["avg_rows"] or 0)
+    kpis["avg_columns"] = round(kpis["avg_columns"] or 0, 1)
+    kpis["total_data_points"] = kpis["total_rows"] * kpis["total_columns"]
+    return kpis
+
+
+@cached_query
+def get_assignee_sla():
+    """Return per-assignee ticket counts, open tickets, mean resolution hours
+    and the share resolved within the SLA_HOURS target for their priority."""
+    conn = get_connection()
+    df = pd.read_sql_query(assignee_sla_query(conn), conn)
+    df["avg_resolution_hours"] = df["avg_resolution_hours"].round(1)
+    df["within_sla"] = (df["within_sla"] * 100).round(1)
+    return df
+
+
+@cached_query
+def get_top_datasets(limit=5):
+    """Return the largest datasets by row count."""
+    return pd.read_sql_query("""
+    SELECT name, "rows", "columns", uploaded_by, upload_date
+    FROM datasets_metadata
+    ORDER BY "rows" DESC, name
+    LIMIT ?
+    """, get_connection(), params=(limit,))
@@ -0,0 +1,49 @@
+from app.services.database_manager import get_connection
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def table_columns(table):
+    """Return the column names of a table in declaration order."""
+    conn = get_connection()
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def fetch_page(table, key_column, after=None, limit=DEFAULT_PAGE_SIZE,
+               columns=None, descending=False):
+    """Return one page of a table as a DataFrame using a keyset cursor.
+
+    Rows are ordered by key_column (an indexed, unique column) and the page
+    starts strictly after the key value `after`, so every page costs one
+    index seek regardless of how deep into the table it is. `columns`
+    restricts the projection; the key column is always included so the
+    caller can pass the last value back as the next cursor.
+    """
+    valid = table_columns(table)
+    selected = list(columns) if columns else list(valid)
+
+    unknown = [c for c in selected + [key_column] if c not in valid]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+    if key_column not in selected:
+        selected.insert(0, key_column)
+
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    direction = "DESC" if descending else "ASC"
+    params = []
+    where = ""
+    if after is not None:
+        where = f'WHERE "{key_column}" {"<" if descending else ">"} ?'
+        params.append(after)
+    params.append(limit)
+
+    query = f"""
+    SELECT {", ".join(f'"{c}"' for c in selected)}
+    FROM {table}
+    {where}
+    ORDER BY "{key_column}" {direction}
+    LIMIT ?
+    """
+    return pd.read_sql_query(query, get_connection(), params=params)
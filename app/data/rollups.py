@@ -0,0 +1,152 @@
+from app.services.database_manager import get_connection, db_manager
+from app.data.cache import cached_query
+from app.data.schema import ROLLUPS, UNDATED_BUCKET, rebuild_rollups, lookup_table, code_column
+import pandas as pd
+
+# strftime('%w') numbers days from Sunday = 0; charts list Monday first
+WEEKDAY_NAMES = ["Sunday", "Monday", "Tuesday", "Wednesday",
+                 "Thursday", "Friday", "Saturday"]
+DAY_ORDER = WEEKDAY_NAMES[1:] + WEEKDAY_NAMES[:1]
+
+_ROLLUP_NAMES = {rollup for rollup, *_ in ROLLUPS}
+
+
+def _dimension(rollup, dimension):
+    """Return (code column, lookup table) for a rollup dimension."""
+    for name, table, _, dimensions in ROLLUPS:
+        if name == rollup and dimension in dimensions:
+            return code_column(dimension), lookup_table(table, dimension)
+    raise ValueError(f"Unknown dimension for {rollup}: {dimension}")
+
+
+def _query_rollup(rollup, query):
+    if rollup not in _ROLLUP_NAMES:
+        raise ValueError(f"Unknown rollup table: {rollup}")
+    return pd.read_sql_query(query.format(rollup=rollup), get_connection(),
+                             params={"undated": UNDATED_BUCKET})
+
+
+@cached_query
+def counts_by_weekday(rollup):
+    """Return a DataFrame of (day, count) ordered Monday to Sunday."""
+    df = _query_rollup(rollup, """
+    SELECT CAST(strftime('%w', bucket) AS INTEGER) AS dow, SUM(count) AS count
+    FROM {rollup}
+    WHERE bucket <> :undated
+    GROUP BY dow
+    HAVING SUM(count) > 0
+    """)
+    df["day"] = df["dow"].map(lambda d: WEEKDAY_NAMES[d])
+    df["day"] = pd.Categorical(df["day"], categories=DAY_ORDER, ordered=True)
+    return df.sort_values("day")[["day", "count"]].reset_index(drop=True)
+
+
+@cached_query
+def counts_by_hour(rollup):
+    """Return a DataFrame of (hour, count) for hours 0-23 that have data."""
+    return _query_rollup(rollup, """
+    SELECT CAST(strftime('%H', bucket) AS INTEGER) AS hour, SUM(count) AS count
+    FROM {rollup}
+    WHERE bucket <> :undated
+    GROUP BY hour
+    HAVING SUM(count) > 0
+    ORDER BY hour
+    """)
+
+
+@cached_query
+def counts_by_day(rollup):
+    """Return a DataFrame of (date, count) per calendar day, oldest first."""
+    return _query_rollup(rollup, """
+    SELECT date(bucket) AS date, SUM(count) AS count
+    FROM {rollup}
+    WHERE bucket <> :undated
+    GROUP BY date
+    HAVING SUM(count) > 0
+    ORDER BY date
+    """)
+
+
+@cached_query
+def status_trend(rollup):
+    """Return a DataFrame of (date, status, count) per calendar day."""
+    column, lookup = _dimension(rollup, "status")
+    return _query_rollup(rollup, f"""
+    SELECT date(bucket) AS date,
+           COALESCE((SELECT value FROM {lookup} WHERE code = {column}), '') AS status,
+           SUM(count) AS count
+    FROM {{rollup}}
+    WHERE bucket <> :undated
+    GROUP BY date, {column}
+    HAVING SUM(count) > 0
+    ORDER BY date
+    """)
+
+
+@cached_query
+def counts_by_dimension(rollup, dimension):
+    """Return a DataFrame of (value, count) for one rollup dimension, largest first.
+
+    Undated rows are included, so the totals match the base table.
+    """
+    column, lookup = _dimension(rollup, dimension)
+    return _query_rollup(rollup, f"""
+    SELECT COALESCE((SELECT value FROM {lookup} WHERE code = {column}), '') AS value,
+           SUM(count) AS count
+    FROM {{rollup}}
+    GROUP BY {column}
+    HAVING SUM(count) > 0
+    ORDER BY count DESC, value
+    """)
+
+
+@cached_query
+def counts_by_pair(rollup, first, second):
+    """Return a DataFrame of (first, second, count) over two rollup dimensions.
+
+    Columns are named after the dimensions; undated rows are included.
+    """
+    first_column, first_lookup = _dimension(rollup, first)
+    second_column, second_lookup = _dimension(rollup, second)
+    return _query_rollup(rollup, f"""
+    SELECT COALESCE((SELECT value FROM {first_lookup} WHERE code = {first_column}), '') AS {first},
+           COALESCE((SELECT value FROM {second_lookup} WHERE code = {second_column}), '') AS {second},
+           SUM(count) AS count
+    FROM {{rollup}}
+    GROUP BY {first_column}, {second_column}
+    HAVING SUM(count) > 0
+    ORDER BY {first}, {second}
+    """)
+
+
+@cached_query
+def recent_window_counts(rollup, days=7):
+    """Compare the last `days` of data with the `days` before them.
+
+    The window ends at the newest bucket rather than today, so historical
+    datasets still get a meaningful trend. Returns a dict with latest,
+    current and previous.
+    """
+    if rollup not in _ROLLUP_NAMES:
+        raise ValueError(f"Unknown rollup table: {rollup}")
+    row = get_connection().execute(f"""
+    WITH bounds AS (SELECT MAX(bucket) AS latest FROM {rollup} WHERE bucket <> ?)
+    SELECT latest,
+           COALESCE(SUM(CASE WHEN bucket > datetime(latest, ?) THEN count END), 0),
+           COALESCE(SUM(CASE WHEN bucket <= datetime(latest, ?)
+                              AND bucket > datetime(latest, ?) THEN count END), 0)
+    FROM {rollup}, bounds
+    """, (UNDATED_BUCKET, f"-{days} days", f"-{days} days", f"-{days * 2} days")).fetchone()
+    return {"latest": row[0], "current": row[1], "previous": row[2]}
+
+
+def rebuild():
+    """Recompute every rollup from the base tables (after bulk backfills)."""
+    rebuild_rollups(get_connection())
+
+
+if __name__ == "__main__":
+    # python -m app.data.rollups
+    rebuild()
+    db_manager.close_all()
+    print("Rollup tables rebuilt.")
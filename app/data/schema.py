@@ -7,14 +7,40 @@ def create_users_table(conn):
         password_hash TEXT NOT NULL,
         role TEXT DEFAULT 'user',
         avatar TEXT DEFAULT NULL,
+        avatar_version INTEGER NOT NULL DEFAULT 0,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """)
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(users)")]
+    if "avatar_version" not in columns:
+        cur.execute("ALTER TABLE users ADD COLUMN avatar_version INTEGER NOT NULL DEFAULT 0")
+        cur.execute("UPDATE users SET avatar_version = 1 WHERE avatar IS NOT NULL")
+    conn.commit()
+
+
+def create_revoked_sessions_table(conn):
+    """Create the session revocation list.
+
+    One row per signed-out token id, kept only until the token would have
+    expired anyway. version increases with every revocation so readers can
+    tell from MAX(version) whether their cached copy is stale.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS revoked_sessions (
+        token_id TEXT PRIMARY KEY,
+        expires_at INTEGER NOT NULL,
+        version INTEGER NOT NULL
+    )
+    """)
     conn.commit()
 
 
 def create_cyber_incidents_table(conn):
-    """Create table matching cyber_incidents.csv schema."""
+    """Create table matching cyber_incidents.csv schema.
+
+    migrate_enum_columns() then moves it to coded storage behind a view.
+    """
     cur = conn.cursor()
     cur.execute("""
     CREATE TABLE IF NOT EXISTS cyber_incidents (
@@ -23,7 +49,8 @@ def create_cyber_incidents_table(conn):
         severity TEXT,
         category TEXT,
         status TEXT,
-        description TEXT
+        description TEXT,
+        ts_epoch INTEGER
     )
     """)
     conn.commit()
@@ -39,14 +66,18 @@ def create_datasets_metadata_table(conn):
         rows INTEGER,
         columns INTEGER,
         uploaded_by TEXT,
-        upload_date TEXT
+        upload_date TEXT,
+        ts_epoch INTEGER
     )
     """)
     conn.commit()
 
 
 def create_it_tickets_table(conn):
-    """Create table matching it_tickets.csv schema."""
+    """Create table matching it_tickets.csv schema.
+
+    migrate_enum_columns() then moves it to coded storage behind a view.
+    """
     cur = conn.cursor()
     cur.execute("""
     CREATE TABLE IF NOT EXISTS it_tickets (
@@ -56,7 +87,8 @@ def create_it_tickets_table(conn):
         status TEXT,
         assigned_to TEXT,
         created_at TEXT,
-        resolution_time_hours INTEGER
+        resolution_time_hours INTEGER,
+        ts_epoch INTEGER
     )
     """)
     conn.commit()
@@ -72,15 +104,478 @@ def create_ai_chat_history_table(conn):
         role TEXT NOT NULL,
         message_role TEXT NOT NULL,   -- 'user' or 'assistant'
         content TEXT NOT NULL,
-        timestamp TEXT NOT NULL
+        timestamp TEXT NOT NULL,
+        ts_epoch INTEGER,
+        status TEXT NOT NULL DEFAULT 'complete',  -- 'streaming', 'complete' or 'interrupted'
+        token_count INTEGER,
+        latency_ms INTEGER
+    )
+    """)
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(ai_chat_history)")]
+    for column, ddl in (("status", "TEXT NOT NULL DEFAULT 'complete'"),
+                        ("token_count", "INTEGER"), ("latency_ms", "INTEGER")):
+        if column not in columns:
+            cur.execute(f"ALTER TABLE ai_chat_history ADD COLUMN {column} {ddl}")
+    # Rolling summary of each conversation's older turns, covering every
+    # message up to and including through_id (see app.services.prompt_assembler)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ai_chat_summaries (
+        username TEXT NOT NULL,
+        role TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        through_id INTEGER NOT NULL,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (username, role)
     )
     """)
     conn.commit()
 
 
+def create_ai_response_cache_table(conn):
+    """Create the shared AI answer cache (see app.services.ai_service).
+
+    cache_key hashes (role, normalised prompt, data version, model); rows
+    are evicted by age and least-recent use.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ai_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        role TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        data_version TEXT NOT NULL,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    conn.commit()
+
+
+# Low-cardinality text columns stored as integer codes: table -> (storage
+# table, {column: lookup table}). The table name itself becomes a view that
+# decodes them, so readers and CSV loads keep the original column names.
+ENUM_TABLES = {
+    "cyber_incidents": ("cyber_incidents_base", {
+        "severity": "incident_severities",
+        "category": "incident_categories",
+        "status": "incident_statuses",
+    }),
+    "it_tickets": ("it_tickets_base", {
+        "priority": "ticket_priorities",
+        "status": "ticket_statuses",
+        "assigned_to": "ticket_assignees",
+    }),
+}
+
+
+def storage_table(table):
+    """Return the table that physically holds `table`'s rows."""
+    return ENUM_TABLES[table][0] if table in ENUM_TABLES else table
+
+
+def code_column(column):
+    """Name of the storage column holding an enum column's codes."""
+    return f"{column}_id"
+
+
+def lookup_table(table, column):
+    """Return the lookup table decoding table.column."""
+    return ENUM_TABLES[table][1][column]
+
+
+def migrate_enum_columns(conn):
+    """Create the lookup tables and move plain tables to coded storage (idempotent).
+
+    Codes are assigned in value order on first migration; later values get
+    the next free code. Values are kept exactly as written, so "Open" and
+    "open" remain distinct, as they were in the text columns.
+    """
+    cur = conn.cursor()
+    for table, (base, enums) in ENUM_TABLES.items():
+        for lookup in enums.values():
+            cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {lookup} (
+                code INTEGER PRIMARY KEY,
+                value TEXT NOT NULL UNIQUE
+            )
+            """)
+
+        kind = cur.execute(
+            "SELECT type FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+        if kind is None or kind[0] != "table":
+            continue
+
+        definitions, values = [], []
+        for _, name, col_type, _, _, pk in cur.execute(f"PRAGMA table_info({table})").fetchall():
+            if name in enums:
+                definitions.append(f"{code_column(name)} INTEGER")
+                values.append(f"(SELECT code FROM {enums[name]} WHERE value = t.{name})")
+            else:
+                definitions.append(f"{name} {col_type}{' PRIMARY KEY' if pk else ''}")
+                values.append(f"t.{name}")
+
+        # One transaction: either the table is fully migrated or untouched
+        cur.execute("SAVEPOINT enum_migration")
+        try:
+            for column, lookup in enums.items():
+                cur.execute(f"""
+                INSERT OR IGNORE INTO {lookup} (value)
+                SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL ORDER BY 1
+                """)
+            cur.execute(f"CREATE TABLE {base} ({', '.join(definitions)})")
+            cur.execute(f"INSERT INTO {base} SELECT {', '.join(values)} FROM {table} AS t")
+            cur.execute(f"DROP TABLE {table}")
+        except Exception:
+            cur.execute("ROLLBACK TO enum_migration")
+            cur.execute("RELEASE enum_migration")
+            raise
+        cur.execute("RELEASE enum_migration")
+    conn.commit()
+
+
+def create_enum_views(conn):
+    """Create the decoding views and the triggers that make them writable.
+
+    Each view has the original table's columns in the original order. Its
+    INSTEAD OF triggers add unseen values to the lookups and write codes to
+    storage, so INSERT/UPDATE/DELETE against the old name keep working.
+    SQLite reports no lastrowid or rowcount for them, so the data layer's
+    own writers go to storage directly. Views are rebuilt only when the
+    storage columns change.
+    """
+    cur = conn.cursor()
+    for table, (base, enums) in ENUM_TABLES.items():
+        columns = cur.execute(f"PRAGMA table_info({base})").fetchall()
+        key = next((c[1] for c in columns if c[5]), columns[0][1])
+        decoded = {code_column(c): c for c in enums}
+
+        names, selects, joins = [], [], []
+        for _, name, *_ in columns:
+            if name in decoded:
+                column = decoded[name]
+                names.append(column)
+                selects.append(f"{column}.value AS {column}")
+                joins.append(f"LEFT JOIN {enums[column]} AS {column} "
+                             f"ON {column}.code = b.{name}")
+            else:
+                names.append(name)
+                selects.append(f"b.{name}")
+
+        current = [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+        if current != names:
+            cur.execute(f"DROP VIEW IF EXISTS {table}")
+            cur.execute(f"""
+            CREATE VIEW {table} AS
+            SELECT {", ".join(selects)}
+            FROM {base} AS b
+            {" ".join(joins)}""")
+
+        def target(column):
+            return code_column(column) if column in enums else column
+
+        def add_value(column):
+            return (f"INSERT OR IGNORE INTO {enums[column]} (value) "
+                    f"SELECT NEW.{column} WHERE NEW.{column} IS NOT NULL;")
+
+        def stored(column):
+            if column in enums:
+                return f"(SELECT code FROM {enums[column]} WHERE value = NEW.{column})"
+            return f"NEW.{column}"
+
+        add_all = " ".join(add_value(c) for c in enums)
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_view_insert
+        INSTEAD OF INSERT ON {table} BEGIN {add_all}
+            INSERT INTO {base} ({", ".join(target(n) for n in names)})
+            VALUES ({", ".join(stored(n) for n in names)});
+        END""")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_view_delete
+        INSTEAD OF DELETE ON {table} BEGIN
+            DELETE FROM {base} WHERE {key} = OLD.{key};
+        END""")
+        # One trigger per column so an UPDATE only touches (and fires the
+        # storage triggers for) the columns it sets. Changing the key
+        # rewrites the whole row, whichever order the triggers run in.
+        for name in names:
+            if name == key:
+                assignments = ", ".join(f"{target(n)} = {stored(n)}" for n in names)
+                body = f"{add_all} UPDATE {base} SET {assignments} WHERE {key} = OLD.{key};"
+            else:
+                body = (f"{add_value(name) if name in enums else ''} "
+                        f"UPDATE {base} SET {target(name)} = {stored(name)} WHERE {key} = OLD.{key};")
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_view_update_{name}
+            INSTEAD OF UPDATE OF {name} ON {table} BEGIN {body}
+            END""")
+    conn.commit()
+
+
+# Tables carrying a normalised ts_epoch column: table -> source timestamp column
+EPOCH_COLUMNS = {
+    "cyber_incidents": "timestamp",
+    "it_tickets": "created_at",
+    "datasets_metadata": "upload_date",
+    "ai_chat_history": "timestamp",
+}
+
+# Unix seconds for any SQLite-parsable timestamp ("YYYY-MM-DD[ T]HH:MM:SS[.ffffff]");
+# naive values are read as UTC wall time, unparsable ones give NULL.
+EPOCH_EXPR = "CAST(strftime('%s', {}) AS INTEGER)"
+
+
+def migrate_epoch_columns(conn):
+    """Add, backfill and maintain ts_epoch on every timestamped table (idempotent).
+
+    Triggers fill ts_epoch after every insert that did not provide it and
+    whenever the source timestamp changes, so no writer has to compute it.
+    """
+    cur = conn.cursor()
+    for table, ts_col in EPOCH_COLUMNS.items():
+        table = storage_table(table)
+        columns = [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+        if "ts_epoch" not in columns:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN ts_epoch INTEGER")
+
+        epoch = EPOCH_EXPR.format(f"NEW.{ts_col}")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_epoch_insert
+        AFTER INSERT ON {table} WHEN NEW.ts_epoch IS NULL BEGIN
+            UPDATE {table} SET ts_epoch = {epoch} WHERE rowid = NEW.rowid;
+        END""")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_epoch_update
+        AFTER UPDATE OF {ts_col} ON {table} BEGIN
+            UPDATE {table} SET ts_epoch = {epoch} WHERE rowid = NEW.rowid;
+        END""")
+
+        # One-off backfill for rows written before the column existed
+        cur.execute(f"""
+        UPDATE {table} SET ts_epoch = {EPOCH_EXPR.format(ts_col)}
+        WHERE ts_epoch IS NULL AND {ts_col} IS NOT NULL
+        """)
+    conn.commit()
+
+
+# Secondary indexes backing the dashboard and chat queries: (name, table, columns)
+INDEXES = [
+    ("idx_chat_user_role_id", "ai_chat_history", "username, role, id"),
+    ("idx_tickets_created_at", "it_tickets_base", "created_at"),
+    ("idx_tickets_priority", "it_tickets_base", "priority_id"),
+    ("idx_incidents_severity_status", "cyber_incidents_base", "severity_id, status_id"),
+    # Also serves the severity-by-category heatmap without a temp sort
+    ("idx_incidents_category_severity", "cyber_incidents_base", "category_id, severity_id"),
+    ("idx_incidents_timestamp", "cyber_incidents_base", "timestamp"),
+    ("idx_incidents_ts_epoch", "cyber_incidents_base", "ts_epoch"),
+    ("idx_tickets_ts_epoch", "it_tickets_base", "ts_epoch"),
+    ("idx_datasets_ts_epoch", "datasets_metadata", "ts_epoch"),
+    ("idx_chat_ts_epoch", "ai_chat_history", "ts_epoch"),
+    # Covers the per-assignee SLA and per-assignee status aggregates, so
+    # neither reads the table
+    ("idx_tickets_assignee_status", "it_tickets_base",
+     "assigned_to_id, status_id, priority_id, resolution_time_hours"),
+    ("idx_response_cache_last_used", "ai_response_cache", "last_used"),
+    ("idx_response_cache_created_at", "ai_response_cache", "created_at"),
+    ("idx_datasets_rows", "datasets_metadata", "\"rows\" DESC, name"),
+    ("idx_datasets_columns", "datasets_metadata", "\"columns\""),
+    ("idx_datasets_uploaded_by", "datasets_metadata", "uploaded_by, \"rows\""),
+    ("idx_datasets_upload_day", "datasets_metadata", "date(upload_date)"),
+]
+
+# Indexes superseded by wider ones above; dropped from existing databases
+OBSOLETE_INDEXES = ["idx_incidents_category", "idx_tickets_assigned_to"]
+
+
+def create_indexes(conn, table=None):
+    """Create secondary indexes (idempotent). Optionally limit to one table."""
+    cur = conn.cursor()
+    if table is None:
+        for name in OBSOLETE_INDEXES:
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+    for name, index_table, columns in INDEXES:
+        if table is None or index_table == table:
+            cur.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {index_table} ({columns})")
+    conn.commit()
+
+
+# Hourly rollups kept current by triggers: (rollup, table, time column, dimensions).
+# Dimensions are enum columns; rollups store their codes, with 0 for NULL.
+ROLLUPS = [
+    ("incident_counts_hourly", "cyber_incidents", "timestamp", ("status", "severity")),
+    ("ticket_counts_hourly", "it_tickets", "created_at", ("status", "priority")),
+]
+
+# Rows whose time is NULL or unparsable are counted under UNDATED_BUCKET, so
+# per-dimension totals still match the base table; time charts skip it.
+UNDATED_BUCKET = ""
+HOUR_BUCKET = "COALESCE(strftime('%Y-%m-%d %H:00:00', {}), '')"
+
+
+def _rollup_increment(rollup, time_col, dims, row, delta):
+    """Return trigger SQL adding delta (+1/-1) for the NEW or OLD row."""
+    bucket = HOUR_BUCKET.format(f"{row}.{time_col}")
+    keys = [f"COALESCE({row}.{d}, 0)" for d in dims]
+    if delta > 0:
+        return f"""
+        INSERT INTO {rollup} (bucket, {", ".join(dims)}, count)
+        VALUES ({bucket}, {", ".join(keys)}, 1)
+        ON CONFLICT (bucket, {", ".join(dims)}) DO UPDATE SET count = count + 1;"""
+    # Groups that empty out are removed rather than left at zero
+    match = " AND ".join(f"{d} = {k}" for d, k in zip(dims, keys))
+    return f"""
+        UPDATE {rollup} SET count = count - 1
+        WHERE bucket = {bucket} AND {match};
+        DELETE FROM {rollup}
+        WHERE bucket = {bucket} AND {match} AND count <= 0;"""
+
+
+def _replace_trigger(cur, name, definition):
+    """Create trigger `name`, replacing an older definition; True if it changed.
+
+    CREATE TRIGGER IF NOT EXISTS would keep a stale body forever, so the
+    stored SQL is compared with the current one instead.
+    """
+    sql = f"CREATE TRIGGER {name} {definition.strip()}"
+    row = cur.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+        (name,)).fetchone()
+    if row is not None and row[0] == sql:
+        return False
+    cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cur.execute(sql)
+    return True
+
+
+def create_rollup_tables(conn):
+    """Create hourly count rollups and the triggers that maintain them.
+
+    A rollup is backfilled when it is first created and whenever its
+    triggers change; rebuild_rollups() can be run at any time to recompute
+    them from scratch.
+    """
+    cur = conn.cursor()
+    for rollup, table, time_col, dims in ROLLUPS:
+        base = storage_table(table)
+        dims = tuple(code_column(d) for d in dims)
+        columns = [row[1] for row in cur.execute(f"PRAGMA table_info({rollup})")]
+        if columns and columns != ["bucket", *dims, "count"]:
+            # Built over text dimensions before they were coded; rebuild it
+            cur.execute(f"DROP TABLE {rollup}")
+            columns = []
+        exists = bool(columns)
+
+        cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {rollup} (
+            bucket TEXT NOT NULL,
+            {" ".join(f"{d} INTEGER NOT NULL," for d in dims)}
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, {", ".join(dims)})
+        )
+        """)
+
+        inc_new = _rollup_increment(rollup, time_col, dims, "NEW", 1)
+        dec_old = _rollup_increment(rollup, time_col, dims, "OLD", -1)
+        watched = ", ".join((time_col,) + tuple(dims))
+        changed = [
+            _replace_trigger(cur, f"trg_{rollup}_insert", f"""
+            AFTER INSERT ON {base} BEGIN {inc_new}
+            END"""),
+            _replace_trigger(cur, f"trg_{rollup}_delete", f"""
+            AFTER DELETE ON {base} BEGIN {dec_old}
+            END"""),
+            _replace_trigger(cur, f"trg_{rollup}_update", f"""
+            AFTER UPDATE OF {watched} ON {base} BEGIN {dec_old} {inc_new}
+            END"""),
+        ]
+
+        if not exists or any(changed):
+            rebuild_rollup(conn, rollup)
+    conn.commit()
+
+
+def rebuild_rollup(conn, rollup):
+    """Recompute one rollup table from its base table."""
+    _, table, time_col, dims = next(r for r in ROLLUPS if r[0] == rollup)
+    base = storage_table(table)
+    dims = tuple(code_column(d) for d in dims)
+    bucket = HOUR_BUCKET.format(time_col)
+    keys = ", ".join(f"COALESCE({d}, 0)" for d in dims)
+    conn.execute(f"DELETE FROM {rollup}")
+    conn.execute(f"""
+    INSERT INTO {rollup} (bucket, {", ".join(dims)}, count)
+    SELECT {bucket}, {keys}, COUNT(*)
+    FROM {base}
+    GROUP BY {", ".join(str(i + 1) for i in range(len(dims) + 1))}
+    """)
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup table (use after bulk backfills)."""
+    for rollup, *_ in ROLLUPS:
+        rebuild_rollup(conn, rollup)
+    conn.commit()
+
+
+# Full-text indexes over free-text columns: fts table -> (content table, key, column)
+FTS_TABLES = {
+    "incidents_fts": ("cyber_incidents", "incident_id", "description"),
+    "tickets_fts": ("it_tickets", "ticket_id", "description"),
+}
+
+
+def create_fts_tables(conn):
+    """Create external-content FTS5 indexes kept in sync by triggers.
+
+    The index stores only tokens; text is read back from the base table.
+    Existing rows are indexed the first time an FTS table is created.
+    """
+    cur = conn.cursor()
+    for fts, (table, key, column) in FTS_TABLES.items():
+        base = storage_table(table)
+        exists = cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (fts,)).fetchone()
+
+        cur.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {column}, content='{base}', content_rowid='{key}',
+            tokenize='porter unicode61'
+        )""")
+
+        delete_old = (f"INSERT INTO {fts} ({fts}, rowid, {column}) "
+                      f"VALUES ('delete', OLD.{key}, OLD.{column});")
+        insert_new = (f"INSERT INTO {fts} (rowid, {column}) "
+                      f"VALUES (NEW.{key}, NEW.{column});")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert
+        AFTER INSERT ON {base} BEGIN {insert_new} END""")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete
+        AFTER DELETE ON {base} BEGIN {delete_old} END""")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+        AFTER UPDATE OF {key}, {column} ON {base} BEGIN {delete_old} {insert_new} END""")
+
+        if not exists:
+            cur.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    conn.commit()
+
+
 def create_all_tables(conn):
     create_users_table(conn)
     create_cyber_incidents_table(conn)
     create_datasets_metadata_table(conn)
     create_it_tickets_table(conn)
     create_ai_chat_history_table(conn)
+    create_revoked_sessions_table(conn)
+    create_ai_response_cache_table(conn)
+    migrate_enum_columns(conn)
+    migrate_epoch_columns(conn)
+    create_enum_views(conn)
+    create_indexes(conn)
+    create_rollup_tables(conn)
+    create_fts_tables(conn)
@@ -0,0 +1,54 @@
+from app.services.database_manager import get_connection
+from app.data.cache import cached_query
+import re
+import pandas as pd
+
+DEFAULT_SEARCH_LIMIT = 20
+
+# Control characters bracketing matches in snippets; the UI turns them into
+# <mark> tags after HTML-escaping the text around them.
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+
+def to_fts_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, and the
+    last word also matches as a prefix so results update while typing."""
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+def _search(fts, base, key, columns, query, limit):
+    match = to_fts_query(query)
+    if match is None:
+        return pd.DataFrame(columns=[key] + columns + ["snippet", "score"])
+
+    sql = f"""
+    SELECT {", ".join(f"b.{c}" for c in [key] + columns)},
+           snippet({fts}, 0, ?, ?, '…', 16) AS snippet,
+           bm25({fts}) AS score
+    FROM {fts}
+    JOIN {base} AS b ON b.{key} = {fts}.rowid
+    WHERE {fts} MATCH ?
+    ORDER BY score
+    LIMIT ?
+    """
+    return pd.read_sql_query(sql, get_connection(),
+                             params=[MATCH_START, MATCH_END, match, int(limit)])
+
+
+@cached_query
+def search_incidents(query, limit=DEFAULT_SEARCH_LIMIT):
+    """Return incidents whose description matches query, best (lowest bm25) first."""
+    return _search("incidents_fts", "cyber_incidents", "incident_id",
+                   ["timestamp", "severity", "category", "status"], query, limit)
+
+
+@cached_query
+def search_tickets(query, limit=DEFAULT_SEARCH_LIMIT):
+    """Return tickets whose description matches query, best (lowest bm25) first."""
+    return _search("tickets_fts", "it_tickets", "ticket_id",
+                   ["priority", "status", "assigned_to", "created_at"], query, limit)
@@ -1,62 +1,118 @@
-from app.data.db import connect_database
+from app.services.database_manager import (
+    get_connection, executemany_batched, DEFAULT_BATCH_SIZE)
+from app.services.write_queue import write, execute_write
+from app.data.cache import cached_query
+from app.data.enums import encode
+from app.data.pagination import fetch_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.data.timestamps import fetch_between
 import pandas as pd
 
+# Grid columns without the (large) free-text description
+TICKET_SUMMARY_COLUMNS = ["ticket_id", "priority", "status", "assigned_to",
+                          "created_at", "resolution_time_hours"]
+
+# Columns the resolution-time distribution chart needs
+TICKET_RESOLUTION_COLUMNS = ["priority", "resolution_time_hours"]
+
+
+def _insert_ticket(conn, ticket_id, priority, description, status, assigned_to,
+                   created_at, resolution_time_hours):
+    # Written to storage directly: inserts through the view report no lastrowid
+    return conn.execute("""
+        INSERT INTO it_tickets_base
+        (ticket_id, priority_id, description, status_id, assigned_to_id, created_at, resolution_time_hours)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (ticket_id,
+          encode(conn, "it_tickets", "priority", priority),
+          description,
+          encode(conn, "it_tickets", "status", status),
+          encode(conn, "it_tickets", "assigned_to", assigned_to),
+          created_at, resolution_time_hours)).lastrowid
+
 
 def insert_ticket(priority, description, status, assigned_to, created_at, resolution_time_hours, ticket_id=None):
     """Insert a new ticket; ID defaults to database-generated."""
-    conn = connect_database()
-    cur = conn.cursor()
-    cur.execute("""
+    return write(_insert_ticket, ticket_id, priority, description, status, assigned_to,
+                 created_at, resolution_time_hours)
+
+
+def insert_tickets(tickets, batch_size=DEFAULT_BATCH_SIZE):
+    """Insert many tickets in one transaction.
+
+    tickets is an iterable of (priority, description, status, assigned_to,
+    created_at, resolution_time_hours) tuples, optionally followed by a
+    ticket_id. Returns the number of rows inserted.
+    """
+    rows = (tuple(row) + (None,) * (7 - len(row)) for row in tickets)
+    return executemany_batched("""
         INSERT INTO it_tickets
-        (ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours)
+        (priority, description, status, assigned_to, created_at, resolution_time_hours, ticket_id)
         VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours))
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
-    return new_id
+    """, rows, batch_size)
 
 
 def get_ticket_by_id(ticket_id):
     """Return a single ticket by ID."""
-    conn = connect_database()
+    conn = get_connection()
     cur = conn.cursor()
     cur.execute("SELECT * FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+    return cur.fetchone()
+
+
+def _update_ticket_status(conn, ticket_id, new_status):
+    return conn.execute(
+        "UPDATE it_tickets_base SET status_id = ? WHERE ticket_id = ?",
+        (encode(conn, "it_tickets", "status", new_status), ticket_id)).rowcount
 
 
 def update_ticket_status(ticket_id, new_status):
     """Update a ticket's status."""
-    conn = connect_database()
-    cur = conn.cursor()
-    cur.execute("UPDATE it_tickets SET status = ? WHERE ticket_id = ?",
-                (new_status, ticket_id))
-    conn.commit()
-    count = cur.rowcount
-    conn.close()
-    return count
+    return write(_update_ticket_status, ticket_id, new_status)
 
 
 def delete_ticket(ticket_id):
     """Delete a ticket by ID."""
-    conn = connect_database()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM it_tickets WHERE ticket_id = ?", (ticket_id,))
-    conn.commit()
-    rows = cur.rowcount
-    conn.close()
-    return rows
+    _, rowcount = execute_write("DELETE FROM it_tickets_base WHERE ticket_id = ?", (ticket_id,))
+    return rowcount
 
 
+@cached_query
 def get_all_tickets():
     """Return all tickets as a DataFrame, ordered by creation date (newest first)."""
-    conn = connect_database()
-    df = pd.read_sql_query(
+    conn = get_connection()
+    return pd.read_sql_query(
         "SELECT * FROM it_tickets ORDER BY created_at DESC", conn)
-    conn.close()
-    return df
+
+@cached_query
+def get_tickets_page(after_id=None, limit=DEFAULT_PAGE_SIZE, columns=TICKET_SUMMARY_COLUMNS):
+    """Return up to `limit` tickets with ticket_id > after_id.
+    Pass columns=None to include every column (including description)."""
+    return fetch_page("it_tickets", "ticket_id", after_id, limit, columns)
+
+@cached_query
+def get_tickets_between(start=None, end=None, columns=TICKET_SUMMARY_COLUMNS, limit=None):
+    """Return tickets with start <= created_at < end, oldest first.
+    Bounds may be datetimes, dates, ISO strings or epoch seconds."""
+    return fetch_between("it_tickets", start, end, columns, limit)
+
+@cached_query
+def get_recent_tickets(limit=MAX_PAGE_SIZE, columns=TICKET_RESOLUTION_COLUMNS):
+    """Return the newest `limit` tickets (by ticket_id), for distribution charts."""
+    return fetch_page("it_tickets", "ticket_id", None, limit, columns, descending=True)
+
+@cached_query
+def get_assignee_status_counts():
+    """Count tickets by (assignee, status); read from one covering index."""
+    conn = get_connection()
+    query = """
+    SELECT (SELECT value FROM ticket_assignees WHERE code = assigned_to_id) AS assigned_to,
+           (SELECT value FROM ticket_statuses WHERE code = status_id) AS status,
+           COUNT(*) AS count
+    FROM it_tickets_base
+    WHERE assigned_to_id IS NOT NULL
+    GROUP BY assigned_to_id, status_id
+    """
+    return pd.read_sql_query(query, conn)
 
 class TicketService:
     """Handle IT support tickets."""
@@ -64,9 +120,24 @@ class TicketService:
     def create_ticket(self, priority, description, status, assigned_to, created_at, resolution_time_hours):
         return insert_ticket(priority, description, status, assigned_to, created_at, resolution_time_hours)
 
+    def create_tickets(self, tickets, batch_size=DEFAULT_BATCH_SIZE):
+        return insert_tickets(tickets, batch_size)
+
     def all_tickets(self):
         return get_all_tickets()
 
+    def page(self, after_id=None, limit=DEFAULT_PAGE_SIZE, columns=TICKET_SUMMARY_COLUMNS):
+        return get_tickets_page(after_id, limit, columns)
+
+    def between(self, start=None, end=None, columns=TICKET_SUMMARY_COLUMNS, limit=None):
+        return get_tickets_between(start, end, columns, limit)
+
+    def recent(self, limit=MAX_PAGE_SIZE, columns=TICKET_RESOLUTION_COLUMNS):
+        return get_recent_tickets(limit, columns)
+
+    def assignee_status_counts(self):
+        return get_assignee_status_counts()
+
     def get(self, ticket_id):
         return get_ticket_by_id(ticket_id)
 
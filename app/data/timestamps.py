@@ -0,0 +1,63 @@
+from app.services.database_manager import get_connection
+from app.data.pagination import table_columns
+from datetime import datetime, date, timezone
+import calendar
+import pandas as pd
+
+
+def utc_now():
+    """Current UTC wall time as a naive ISO string, the form ts_epoch reads as UTC."""
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def to_epoch(value):
+    """Convert a datetime, date, ISO string or number to Unix seconds.
+
+    Naive values are read as UTC wall time, matching how SQLite's
+    strftime('%s', ...) fills the ts_epoch columns.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return calendar.timegm(value.timetuple())
+    if isinstance(value, date):
+        return calendar.timegm(value.timetuple())
+    raise TypeError(f"Cannot convert {type(value).__name__} to an epoch timestamp")
+
+
+def fetch_between(table, start=None, end=None, columns=None, limit=None):
+    """Return rows with start <= ts_epoch < end as a DataFrame, oldest first.
+
+    Either bound may be None for an open range. The filter and ordering are
+    both served by the table's ts_epoch index.
+    """
+    valid = table_columns(table)
+    selected = list(columns) if columns else list(valid)
+    unknown = [c for c in selected if c not in valid]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+
+    clauses, params = ["ts_epoch IS NOT NULL"], []
+    if start is not None:
+        clauses.append("ts_epoch >= ?")
+        params.append(to_epoch(start))
+    if end is not None:
+        clauses.append("ts_epoch < ?")
+        params.append(to_epoch(end))
+
+    query = f"""
+    SELECT {", ".join(f'"{c}"' for c in selected)}
+    FROM {table}
+    WHERE {" AND ".join(clauses)}
+    ORDER BY ts_epoch ASC
+    """
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(int(limit))
+    return pd.read_sql_query(query, get_connection(), params=params)
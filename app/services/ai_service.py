@@ -1,30 +1,34 @@
-import google.generativeai as genai
 import streamlit as st
 import pandas as pd
-import sqlite3
-from datetime import datetime
-from app.data.db import DB_PATH
-
-from app.data.incidents import get_all_incidents
-from app.data.tickets import get_all_tickets
-from app.data.datasets import list_datasets
+import hashlib
+import os
+import re
+import threading
+import time
+from app.data.timestamps import utc_now
+from app.services.database_manager import get_connection
+from app.services.write_queue import execute_write, write, submit_write
+
+from app.services.data_context import build_data_context
+from DATA.ai_history import (
+    load_history_window, HISTORY_WINDOW, begin_message, update_message, finish_message)
+from app.services.prompt_assembler import assemble_prompt, estimate_tokens
+from app.services.model_registry import model_registry, ModelRegistry, ModelUnavailableError
 
 
 def save_chat_message(username, role, sender, content):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute("""
+    execute_write("""
         INSERT INTO ai_chat_history (username, role, message_role, content, timestamp)
         VALUES (?, ?, ?, ?, ?)
-    """, (username, role, sender, content, datetime.utcnow().isoformat()))
+    """, (username, role, sender, content, utc_now()))
 
-    conn.commit()
-    conn.close()
 
+def load_chat_history(username, role, limit=HISTORY_WINDOW):
+    """Return the newest `limit` messages (oldest first); limit=None loads all."""
+    if limit is not None:
+        return load_history_window(username, role, limit)[0]
 
-def load_chat_history(username, role):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cur = conn.cursor()
 
     cur.execute("""
@@ -35,22 +39,21 @@ def load_chat_history(username, role):
     """, (username, role))
 
     rows = cur.fetchall()
-    conn.close()
 
     return [{"role": r[0], "content": r[1], "timestamp": r[2]} for r in rows]
 
 
-def clear_chat_history(username, role):
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute("""
+def _clear_chat_history(conn, username, role):
+    conn.execute("""
         DELETE FROM ai_chat_history
         WHERE username = ? AND role = ?
     """, (username, role))
+    conn.execute("DELETE FROM ai_chat_summaries WHERE username = ? AND role = ?",
+                 (username, role))
 
-    conn.commit()
-    conn.close()
+
+def clear_chat_history(username, role):
+    write(_clear_chat_history, username, role)
 
 
 def get_system_prompt(role):
@@ -71,116 +74,301 @@ Provide clear explanations and insights about datasets. Only provide code snippe
 
 
 def get_data_context(role):
+    """Return the cached statistical digest for the role's data."""
     try:
-        if role == "cyber":
-            df = get_all_incidents()
-        elif role == "it":
-            df = get_all_tickets()
-        elif role == "data":
-            df = list_datasets()
-        else:
-            return ""
+        return build_data_context(role)
+    except Exception as e:
+        return f"\n[ERROR FETCHING DATA]: {e}\n"
 
-        if df.empty:
-            return "\n[DATABASE CONTEXT: No data found]\n"
 
-        return f"\n[DATABASE CONTEXT - TOP 50 ROWS]\n{df.head(50).to_csv(index=False)}\n"
+# Shared cache of complete answers, so identical questions about unchanged
+# data (e.g. the example-question buttons) are answered without the model.
+RESPONSE_CACHE_TTL = float(os.environ.get("AI_CACHE_TTL_SECONDS", 24 * 3600))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", 500))
+REPLAY_CHUNK_CHARS = 400
+
+# Prompts that lean on earlier turns ("why is that?", "show more") are only
+# cached when there is no earlier turn to lean on.
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|their|he|she|above|previous|"
+    r"earlier|again|more|also|else|same|instead|continue|elaborate)\b|^(and|but|so|ok)\b")
+
+_cache_stats = {"hits": 0, "misses": 0, "bypassed": 0}
+_last_reply_cached = {}
+_cache_lock = threading.Lock()
+
+
+class CachedChunk:
+    """Chunk replayed from the response cache; same shape as a model chunk."""
+    cached = True
 
-    except Exception as e:
-        return f"\n[ERROR FETCHING DATA]: {e}\n"
+    def __init__(self, text):
+        self.text = text
+
+
+def normalise_prompt(prompt):
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    return " ".join(prompt.lower().split()).rstrip(" ?!.")
+
+
+def is_cacheable(prompt, has_prior_turns):
+    if not has_prior_turns:
+        return True
+    text = normalise_prompt(prompt)
+    return len(text.split()) >= 4 and not FOLLOW_UP_PATTERN.search(text)
+
+
+def response_cache_key(role, prompt, data_context, model):
+    """Return (cache_key, data_version) for a request."""
+    data_version = hashlib.sha256((data_context or "").encode()).hexdigest()[:16]
+    key = hashlib.sha256(
+        "\x1f".join([role, normalise_prompt(prompt), data_version, model]).encode()).hexdigest()
+    return key, data_version
+
+
+def _count(outcome, username=None, role=None):
+    with _cache_lock:
+        _cache_stats[outcome] += 1
+        if username:
+            _last_reply_cached[(username, role)] = outcome == "hits"
+
+
+def get_cached_response(cache_key):
+    """Return the cached answer for cache_key, or None if absent or expired."""
+    conn = get_connection()
+    now = time.time()
+    row = conn.execute(
+        "SELECT response, created_at FROM ai_response_cache WHERE cache_key = ?",
+        (cache_key,)).fetchone()
+    if row is None or now - row[1] > RESPONSE_CACHE_TTL:
+        return None
+    # Recency only steers eviction, so the hit does not wait for this write
+    submit_write(_touch_cached_response, cache_key, now)
+    return row[0]
+
+
+def _touch_cached_response(conn, cache_key, now):
+    conn.execute(
+        "UPDATE ai_response_cache SET last_used = ?, hits = hits + 1 WHERE cache_key = ?",
+        (now, cache_key))
+
+
+def _store_cached_response(conn, cache_key, role, prompt, data_version, model, response):
+    now = time.time()
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO ai_response_cache
+            (cache_key, role, prompt, data_version, model, response, created_at, last_used, hits)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)
+        """,
+        (cache_key, role, normalise_prompt(prompt), data_version, model, response, now, now))
+    # Expiry follows created_at, as lookups do; hits only refresh last_used,
+    # which orders the size cap below
+    conn.execute("DELETE FROM ai_response_cache WHERE created_at < ?",
+                 (now - RESPONSE_CACHE_TTL,))
+    conn.execute(
+        """
+        DELETE FROM ai_response_cache WHERE last_used < (
+            SELECT last_used FROM ai_response_cache
+            ORDER BY last_used DESC LIMIT 1 OFFSET ?)
+        """,
+        (RESPONSE_CACHE_MAX_ENTRIES - 1,))
 
 
-def get_gemini_response(user_prompt, chat_history, role):
-    """Return a generator that yields response chunks for streaming."""
+def store_cached_response(cache_key, role, prompt, data_version, model, response):
+    """Store an answer, then evict expired rows and the least recently used
+    beyond RESPONSE_CACHE_MAX_ENTRIES."""
+    write(_store_cached_response, cache_key, role, prompt, data_version, model, response)
+
+def clear_response_cache():
+    execute_write("DELETE FROM ai_response_cache")
+
+
+def response_cache_stats():
+    """Hit/miss/bypass counts for this process plus the stored entry count."""
+    with _cache_lock:
+        stats = dict(_cache_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["entries"] = get_connection().execute(
+        "SELECT COUNT(*) FROM ai_response_cache").fetchone()[0]
+    return stats
+
+
+def last_reply_cached(username, role):
+    """True if the latest answer for (username, role) came from the cache."""
+    with _cache_lock:
+        return _last_reply_cached.get((username, role), False)
+
+
+def _api_key():
+    try:
+        return st.secrets.get("GOOGLE_API_KEY")
+    except Exception:
+        return None  # no secrets.toml
+
+
+def ai_unavailable_reason(registry=None):
+    """Return why the AI provider cannot answer (SDK or API key missing), or None."""
+    registry = registry or model_registry
+    try:
+        provider = registry.provider
+    except ImportError as e:
+        return f"the {e.name or 'AI provider'} package is not installed"
+    if provider.requires_api_key and not _api_key():
+        return "GOOGLE_API_KEY is not set in .streamlit/secrets.toml"
+    return None
+
+
+def _replay(text):
+    for i in range(0, len(text), REPLAY_CHUNK_CHARS):
+        yield CachedChunk(text[i:i + REPLAY_CHUNK_CHARS])
+
+
+def get_gemini_response(user_prompt, chat_history, role, username=None, registry=None):
+    """Return a generator that yields response chunks for streaming.
+
+    The request is built by assemble_prompt, which keeps it within the
+    configured token budget; with a username, older turns are sent as the
+    stored rolling summary instead of verbatim. The model and provider come
+    from `registry` (default model_registry, whose provider is chosen by
+    AI_PROVIDER), so discovery runs once per process, not per prompt.
+
+    Self-contained prompts are answered from the response cache when the
+    same question was asked for the same data and model; replayed chunks
+    carry cached=True.
+    """
     # Helper class for error messages
     class ErrorChunk:
         def __init__(self, text):
             self.text = text
     
+    registry = registry or model_registry
     try:
-        api_key = st.secrets.get("GOOGLE_API_KEY")
-        if not api_key:
+        api_key = None
+        if registry.provider.requires_api_key:
+            api_key = _api_key()
+        if registry.provider.requires_api_key and not api_key:
             yield ErrorChunk("⚠️ Error: Missing GOOGLE_API_KEY in secrets.toml. Please add your Google API key to .streamlit/secrets.toml")
             return
-        genai.configure(api_key=api_key)
     except Exception as e:
         yield ErrorChunk(f"⚠️ Error: Failed to configure API - {str(e)}")
         return
 
     try:
-        # Try to find an available model
-        model = None
-        last_error = None
-        
-        # First, try to list available models
-        try:
-            models = genai.list_models()
-            available_models = []
-            for m in models:
-                if hasattr(m, 'supported_generation_methods') and 'generateContent' in m.supported_generation_methods:
-                    model_name = m.name
-                    # Remove 'models/' prefix if present
-                    if model_name.startswith('models/'):
-                        model_name = model_name[7:]
-                    available_models.append(model_name)
-            
-            # Try available Gemini models first
-            if available_models:
-                for model_name in available_models:
-                    if 'gemini' in model_name.lower():
-                        try:
-                            model = genai.GenerativeModel(model_name)
-                            break
-                        except:
-                            continue
-        except:
-            pass
-        
-        # If no model found, try common names
-        if model is None:
-            model_names = ["gemini-pro", "gemini-1.5-pro"]
-            for model_name in model_names:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    break
-                except Exception as e:
-                    last_error = str(e)
-                    continue
-        
-        if model is None:
-            error_msg = f"⚠️ Error: Could not initialize Gemini model.\n\nError: {last_error or 'Unknown error'}\n\nPlease check:\n1. Your API key is valid and has proper permissions\n2. The Gemini API is enabled in your Google Cloud project\n3. Try using 'gemini-pro' model name"
-            yield ErrorChunk(error_msg)
-            return
-
         gemini_history = []
 
-        system_instruction = (
-            get_system_prompt(role)
-            + "\n\n"
-            + get_data_context(role)
-            + "\n\nUse only the facts from the above data."
-        )
+        data_context = get_data_context(role)
+        request = assemble_prompt(
+            role, user_prompt, get_system_prompt(role), data_context,
+            chat_history=chat_history, username=username)
+
+        cacheable = False
+        has_prior_turns = bool(request["messages"]) or bool(request["metrics"]["summary_tokens"])
+        if not data_context.startswith("\n[ERROR") and is_cacheable(user_prompt, has_prior_turns):
+            cacheable = True
+            model_name, _ = registry.get_model(api_key)
+            cache_key, _ = response_cache_key(role, user_prompt, data_context, model_name)
+            cached = get_cached_response(cache_key)
+            if cached is not None:
+                _count("hits", username, role)
+                yield from _replay(cached)
+                return
+            _count("misses", username, role)
+        else:
+            _count("bypassed", username, role)
 
-        gemini_history.append({"role": "user", "parts": [system_instruction]})
+        gemini_history.append({"role": "user", "parts": [request["system"]]})
         gemini_history.append(
             {"role": "model", "parts": ["Understood. Using live database context."]})
 
-        for msg in chat_history:
+        for msg in request["messages"]:
             role_map = {"user": "user", "assistant": "model"}
             gemini_history.append({
                 "role": role_map.get(msg["role"], "user"),
                 "parts": [msg["content"]]
             })
 
-        chat = model.start_chat(history=gemini_history)
-        stream = chat.send_message(user_prompt, stream=True)
+        # The model is resolved once per process; a model that fails before
+        # sending anything is reported and the next preference is tried.
+        for attempt in range(len(registry.preferences)):
+            model_name, model = registry.get_model(api_key)
+            parts = []
+            try:
+                for chunk in registry.provider.stream_chat(model, gemini_history, user_prompt):
+                    parts.append(chunk.text)
+                    yield chunk
+                if cacheable and parts:
+                    # Keyed on the model that actually answered
+                    cache_key, data_version = response_cache_key(
+                        role, user_prompt, data_context, model_name)
+                    store_cached_response(cache_key, role, user_prompt, data_version,
+                                          model_name, "".join(parts))
+                return
+            except Exception:
+                if parts or attempt == len(registry.preferences) - 1:
+                    raise
+                registry.report_failure(model_name)
+
+    except ModelUnavailableError as e:
+        yield ErrorChunk(f"⚠️ Error: {e}\n\nPlease check:\n1. Your API key is valid and has proper permissions\n2. The Gemini API is enabled in your Google Cloud project\n3. GEMINI_MODELS lists a model your key can use")
+    except Exception as e:
+        yield ErrorChunk(f"⚠️ AI Error: {str(e)}")
+
+
+# A streaming reply is written to its history row at most this often, or
+# once this many new characters have arrived, whichever comes first.
+STREAM_FLUSH_SECONDS = 1.0
+STREAM_FLUSH_CHARS = 1024
+
+
+def ai_error_message(error):
+    return f"⚠️ AI Error: {error}"
+
 
-        for chunk in stream:
-            if hasattr(chunk, "text") and chunk.text:
-                yield chunk
+def persist_stream(chunks, username, role, flush_seconds=STREAM_FLUSH_SECONDS,
+                   flush_chars=STREAM_FLUSH_CHARS):
+    """Yield chunks unchanged while saving the reply as one ai_chat_history row.
 
+    The row is inserted with the first chunk (status 'streaming'), updated
+    with the partial text whenever flush_seconds or flush_chars is reached,
+    and finalised with its token count and latency. If the consumer stops
+    early, the partial text is kept as 'interrupted'. If the stream fails, the
+    error text is appended to that row (or saved as the row when no chunk had
+    arrived) before the exception propagates, so callers must not save it again.
+    """
+    start = time.perf_counter()
+    message_id = None
+    parts = []
+    size = flushed_size = 0
+    last_flush = start
+    status = "interrupted"
+    try:
+        for chunk in chunks:
+            text = getattr(chunk, "text", "")
+            if text:
+                parts.append(text)
+                size += len(text)
+                now = time.perf_counter()
+                if message_id is None:
+                    message_id = begin_message(username, role, "assistant", text)
+                    flushed_size, last_flush = size, now
+                elif now - last_flush >= flush_seconds or size - flushed_size >= flush_chars:
+                    update_message(message_id, "".join(parts))
+                    flushed_size, last_flush = size, now
+            yield chunk
+        status = "complete"
     except Exception as e:
-        yield ErrorChunk(f"⚠️ AI Error: {str(e)}")
+        error = ai_error_message(e)
+        parts.append(f"\n\n{error}" if parts else error)
+        if message_id is None:
+            message_id = begin_message(username, role, "assistant", error)
+        raise
+    finally:
+        if message_id is not None:
+            full = "".join(parts)
+            finish_message(message_id, full, status, estimate_tokens(full),
+                           round((time.perf_counter() - start) * 1000))
 
 
 def cyber_ai_chat(username, message):
@@ -188,10 +376,7 @@ def cyber_ai_chat(username, message):
     history = load_chat_history(username, role)
     save_chat_message(username, role, "user", message)
 
-    response = get_gemini_response(message, history, role)
-    save_chat_message(username, role, "assistant", response)
-
-    return response
+    return persist_stream(get_gemini_response(message, history, role, username), username, role)
 
 
 def data_ai_chat(username, message):
@@ -199,10 +384,7 @@ def data_ai_chat(username, message):
     history = load_chat_history(username, role)
     save_chat_message(username, role, "user", message)
 
-    response = get_gemini_response(message, history, role)
-    save_chat_message(username, role, "assistant", response)
-
-    return response
+    return persist_stream(get_gemini_response(message, history, role, username), username, role)
 
 
 def it_ai_chat(username, message):
@@ -210,17 +392,20 @@ def it_ai_chat(username, message):
     history = load_chat_history(username, role)
     save_chat_message(username, role, "user", message)
 
-    response = get_gemini_response(message, history, role)
-    save_chat_message(username, role, "assistant", response)
-
-    return response
+    return persist_stream(get_gemini_response(message, history, role, username), username, role)
 
 class AIService:
-    """Handle AI responses with role-based prompts."""
+    """Handle AI responses with role-based prompts.
+
+    Pass a provider (see app.services.llm_providers) to answer through it
+    instead of the process-wide model_registry, e.g. StubProvider offline.
+    """
+
+    def __init__(self, provider=None):
+        self.registry = ModelRegistry(provider) if provider else model_registry
 
     def ask(self, username, message, role):
         history = load_chat_history(username, role)
         save_chat_message(username, role, "user", message)
-        response = get_gemini_response(message, history, role)
-        save_chat_message(username, role, "assistant", response)
-        return response
+        response = get_gemini_response(message, history, role, username, registry=self.registry)
+        return persist_stream(response, username, role)
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt releases the GIL, so a small thread pool verifies passwords in
+# parallel. Callers still wait for their result; the worker count caps how
+# many hashes run at once and MAX_PENDING caps how many may queue.
+AUTH_WORKERS = os.cpu_count() or 1
+MAX_PENDING = AUTH_WORKERS * 16
+QUEUE_TIMEOUT = 10
+
+TARGET_HASH_MS = float(os.environ.get("BCRYPT_TARGET_MS", 250))
+MIN_COST = 10
+MAX_COST = 16
+
+_cost_lock = threading.Lock()
+_target_cost = None
+
+
+class AuthBusyError(RuntimeError):
+    """Raised when the auth pool queue stays full for QUEUE_TIMEOUT seconds."""
+
+
+def hash_cost(hashed):
+    """Return the work factor of a bcrypt hash ("$2b$12$..." -> 12), or None."""
+    try:
+        return int(hashed.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def calibrate_cost(target_ms=TARGET_HASH_MS, min_cost=MIN_COST, max_cost=MAX_COST):
+    """Return the highest bcrypt cost whose hash time fits within target_ms.
+
+    One hash is timed at min_cost; each extra cost step doubles the work,
+    so the rest is extrapolated. min_cost is the floor on slow hardware.
+    """
+    start = time.perf_counter()
+    bcrypt.hashpw(b"calibration", bcrypt.gensalt(min_cost))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    cost = min_cost
+    while cost < max_cost and elapsed_ms * 2 <= target_ms:
+        cost += 1
+        elapsed_ms *= 2
+    return cost
+
+
+def target_cost():
+    """Work factor for new hashes: BCRYPT_COST if set, else calibrated once."""
+    global _target_cost
+    if _target_cost is None:
+        with _cost_lock:
+            if _target_cost is None:
+                env_cost = os.environ.get("BCRYPT_COST")
+                _target_cost = int(env_cost) if env_cost else calibrate_cost()
+    return _target_cost
+
+
+def set_target_cost(cost):
+    """Override the work factor for this process (None recalibrates on next use)."""
+    global _target_cost
+    with _cost_lock:
+        _target_cost = cost
+
+
+class AuthPool:
+    """Bounded thread pool for bcrypt hashing and verification."""
+
+    def __init__(self, workers=AUTH_WORKERS, max_pending=MAX_PENDING):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn, *args, timeout=QUEUE_TIMEOUT):
+        """Queue fn(*args) and return its future, waiting up to timeout for a slot."""
+        if not self._slots.acquire(timeout=timeout):
+            raise AuthBusyError("Too many sign-ins in progress. Please try again.")
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, timeout=QUEUE_TIMEOUT):
+        """Run fn(*args) on the pool and wait for its result."""
+        return self.submit(fn, *args, timeout=timeout).result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+auth_pool = AuthPool()
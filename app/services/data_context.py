@@ -0,0 +1,97 @@
+from app.data.cache import cached_query
+from app.data.kpis import (
+    get_incident_kpis, get_ticket_kpis, get_dataset_kpis, get_assignee_sla, get_top_datasets)
+from app.data.incidents import get_incidents_by_type_count
+from app.data.rollups import counts_by_dimension, recent_window_counts
+
+# Days compared in the "recent trend" line (last N days vs the N before)
+TREND_DAYS = 7
+TOP_N = 5
+
+
+def _counts(df, limit=None):
+    rows = df.head(limit) if limit else df
+    return ", ".join(f"{r.value or 'Unknown'} {r.count}" for r in rows.itertuples())
+
+
+def _trend(rollup, noun):
+    window = recent_window_counts(rollup, TREND_DAYS)
+    if not window["latest"]:
+        return f"Recent trend: no {noun} yet."
+    current, previous = window["current"], window["previous"]
+    change = f" ({(current - previous) / previous * 100:+.0f}%)" if previous else ""
+    return (f"Recent trend: {current} {noun} in the {TREND_DAYS} days to {window['latest'][:10]} "
+            f"vs {previous} in the {TREND_DAYS} days before{change}.")
+
+
+def _cyber_digest():
+    kpis = get_incident_kpis()
+    if not kpis["total"]:
+        return "[DATABASE CONTEXT: No incidents found]"
+    categories = get_incidents_by_type_count().head(TOP_N)
+    return "\n".join([
+        "[DATABASE CONTEXT - CYBER INCIDENTS DIGEST]",
+        f"Total incidents: {kpis['total']}; open {kpis['open']}, closed {kpis['closed']}, "
+        f"resolution rate {kpis['resolution_rate']}%.",
+        f"Critical: {kpis['critical']}; high: {kpis['high']}.",
+        "By status: " + _counts(counts_by_dimension("incident_counts_hourly", "status")),
+        "By severity: " + _counts(counts_by_dimension("incident_counts_hourly", "severity")),
+        "Top categories: " + ", ".join(
+            f"{r.category} {r.count}" for r in categories.itertuples()),
+        _trend("incident_counts_hourly", "incidents"),
+    ])
+
+
+def _it_digest():
+    kpis = get_ticket_kpis()
+    if not kpis["total"]:
+        return "[DATABASE CONTEXT: No tickets found]"
+    lines = [
+        "[DATABASE CONTEXT - IT TICKETS DIGEST]",
+        f"Total tickets: {kpis['total']}; open {kpis['open']}, resolved/closed {kpis['resolved']}, "
+        f"resolution rate {kpis['resolution_rate']}%; "
+        f"average resolution {kpis['avg_resolution_hours']} h.",
+        "By status: " + _counts(counts_by_dimension("ticket_counts_hourly", "status")),
+        "By priority: " + _counts(counts_by_dimension("ticket_counts_hourly", "priority")),
+        _trend("ticket_counts_hourly", "tickets"),
+        "Assignees (tickets, open, avg hours, % within SLA):",
+    ]
+    for r in get_assignee_sla().head(TOP_N * 2).itertuples():
+        lines.append(f"- {r.assigned_to}: {r.tickets}, {r.open} open, "
+                     f"{r.avg_resolution_hours} h, {r.within_sla}%")
+    return "\n".join(lines)
+
+
+def _data_digest():
+    kpis = get_dataset_kpis()
+    if not kpis["total"]:
+        return "[DATABASE CONTEXT: No datasets found]"
+    lines = [
+        "[DATABASE CONTEXT - DATASETS DIGEST]",
+        f"Datasets: {kpis['total']}; {kpis['total_rows']:,} rows and "
+        f"{kpis['total_columns']} columns in total; "
+        f"{kpis['unique_uploaders']} uploaders.",
+        f"Average size: {kpis['avg_rows']:,} rows x {kpis['avg_columns']} columns; "
+        f"largest {kpis['max_rows']:,} rows.",
+        "Largest datasets:",
+    ]
+    for r in get_top_datasets(TOP_N).itertuples():
+        lines.append(f"- {r.name}: {r.rows:,} rows x {r.columns} cols, "
+                     f"by {r.uploaded_by} on {r.upload_date}")
+    return "\n".join(lines)
+
+
+DIGESTS = {"cyber": _cyber_digest, "it": _it_digest, "data": _data_digest}
+
+
+@cached_query
+def build_data_context(role):
+    """Return a compact statistical digest of the role's whole dataset.
+
+    Built from the KPI and rollup queries and cached until the database
+    changes, so repeated prompts reuse the same text.
+    """
+    digest = DIGESTS.get(role)
+    if digest is None:
+        return ""
+    return "\n" + digest() + "\n"
@@ -1,8 +1,148 @@
-from app.data.db import connect_database
+import threading
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from app.data.db import connect_database, DB_PATH
+
+# Callables run after every data-layer commit (e.g. cache invalidation)
+_commit_listeners = []
 
 
 class DatabaseManager:
-    """Provide database connections."""
+    """Provide pooled, per-thread database connections.
+
+    Each thread gets one long-lived connection (opened and tuned once by
+    connect_database). Connections owned by threads that have finished are
+    closed the next time the pool is used, so Streamlit's short-lived script
+    threads do not leak file handles.
+    """
+
+    def __init__(self, db_path: Path = DB_PATH):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # thread -> connection
 
     def get_connection(self):
-        return connect_database()
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        conn = connect_database(self.db_path)
+        self._local.conn = conn
+        with self._lock:
+            self._prune_dead_threads()
+            self._connections[threading.current_thread()] = conn
+        return conn
+
+    def in_unit_of_work(self):
+        return getattr(self._local, "depth", 0) > 0
+
+    @contextmanager
+    def unit_of_work(self):
+        """Group every write made inside the block into a single commit.
+
+        Data-layer functions commit through commit(), which is deferred while
+        a unit of work is open. Blocks may nest; only the outermost one
+        commits, and any exception rolls the whole group back.
+        """
+        conn = self.get_connection()
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            yield conn
+        except Exception:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                conn.rollback()
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            conn.commit()
+            self._notify_commit()
+
+    def commit(self):
+        """Commit this thread's connection unless a unit of work is open."""
+        if not self.in_unit_of_work():
+            self.get_connection().commit()
+            self._notify_commit()
+
+    def _notify_commit(self):
+        notify_commit()
+
+    def _prune_dead_threads(self):
+        for thread in [t for t in self._connections if not t.is_alive()]:
+            try:
+                self._connections.pop(thread).close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        """Close every pooled connection (used at shutdown and in scripts)."""
+        with self._lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+    def pool_size(self):
+        with self._lock:
+            return len(self._connections)
+
+
+# Process-wide pool shared by the data and service layers
+db_manager = DatabaseManager()
+
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def get_connection():
+    """Return the calling thread's pooled connection."""
+    return db_manager.get_connection()
+
+
+def commit():
+    """Commit the calling thread's connection (deferred inside unit_of_work)."""
+    db_manager.commit()
+
+
+def add_commit_listener(listener):
+    """Register a zero-argument callable run after every data-layer commit."""
+    _commit_listeners.append(listener)
+
+
+def notify_commit():
+    """Run the commit listeners (for writers that commit outside this pool)."""
+    for listener in _commit_listeners:
+        listener()
+
+
+def unit_of_work():
+    """Context manager grouping mixed writes into one transaction."""
+    return db_manager.unit_of_work()
+
+
+def executemany_batched(sql, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """Run sql for every row in one transaction, batch_size rows per executemany.
+
+    rows may be any iterable (including a generator); only one batch is held
+    in memory at a time. Returns the number of rows written.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    total = 0
+    rows = iter(rows)
+    with unit_of_work() as conn:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            conn.executemany(sql, batch)
+            total += len(batch)
+    return total
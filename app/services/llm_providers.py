@@ -0,0 +1,136 @@
+import hashlib
+import os
+import time
+
+# Which backend answers AI prompts: "gemini" (default) or "stub" for offline
+# load tests and profiling.
+AI_PROVIDER = os.environ.get("AI_PROVIDER", "gemini")
+
+# Stub streaming defaults; tokens_per_second=0 streams as fast as possible
+STUB_FIRST_TOKEN_MS = float(os.environ.get("AI_STUB_FIRST_TOKEN_MS", 300))
+STUB_TOKENS_PER_SECOND = float(os.environ.get("AI_STUB_TOKENS_PER_SECOND", 60))
+STUB_RESPONSE_TOKENS = int(os.environ.get("AI_STUB_RESPONSE_TOKENS", 200))
+STUB_CHUNK_TOKENS = int(os.environ.get("AI_STUB_CHUNK_TOKENS", 8))
+
+_STUB_WORDS = (
+    "the data shows a steady pattern across recent records with most items "
+    "resolved within target while a small share remains open and needs "
+    "attention from the assigned team").split()
+
+
+class TextChunk:
+    """A piece of streamed text, shaped like a google.generativeai chunk."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class GeminiProvider:
+    """google.generativeai behind the interface the AI service uses.
+
+    A provider lists and creates models and streams a chat turn; models are
+    opaque to callers and only passed back to stream_chat.
+    """
+    name = "gemini"
+    requires_api_key = True
+
+    def __init__(self):
+        import google.generativeai as genai
+        self._genai = genai
+
+    def configure(self, api_key):
+        self._genai.configure(api_key=api_key)
+
+    def list_models(self):
+        """Names of models that support generateContent, without 'models/'."""
+        names = []
+        for m in self._genai.list_models():
+            if "generateContent" in getattr(m, "supported_generation_methods", ()):
+                names.append(m.name[7:] if m.name.startswith("models/") else m.name)
+        return names
+
+    def create(self, name):
+        return self._genai.GenerativeModel(name)
+
+    def stream_chat(self, model, history, prompt):
+        """Yield chunks with a .text attribute for one chat turn.
+
+        history uses Gemini's format: [{"role": "user"|"model", "parts": [...]}].
+        """
+        chat = model.start_chat(history=history)
+        for chunk in chat.send_message(prompt, stream=True):
+            if hasattr(chunk, "text") and chunk.text:
+                yield chunk
+
+
+class StubProvider:
+    """Deterministic offline provider for tests, load runs and profiling.
+
+    Answers echo the prompt, then add filler words up to response_tokens
+    (one word is one token). The first chunk arrives after first_token_ms;
+    later chunks of chunk_tokens words are paced at tokens_per_second. The
+    same prompt always streams the same text. list_models sleeps list_delay
+    seconds, and names in `broken` fail on create. Call counts are kept so
+    callers can check how often each step ran.
+    """
+    name = "stub"
+    requires_api_key = False
+
+    def __init__(self, models=("gemini-1.5-flash", "gemini-pro"), list_delay=0.0, broken=(),
+                 first_token_ms=STUB_FIRST_TOKEN_MS, tokens_per_second=STUB_TOKENS_PER_SECOND,
+                 response_tokens=STUB_RESPONSE_TOKENS, chunk_tokens=STUB_CHUNK_TOKENS):
+        self.models = list(models)
+        self.list_delay = list_delay
+        self.broken = set(broken)
+        self.first_token_ms = first_token_ms
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.calls = {"configure": 0, "list_models": 0, "create": 0, "stream_chat": 0}
+
+    def configure(self, api_key):
+        self.calls["configure"] += 1
+
+    def list_models(self):
+        self.calls["list_models"] += 1
+        time.sleep(self.list_delay)
+        return list(self.models)
+
+    def create(self, name):
+        self.calls["create"] += 1
+        if name in self.broken or name not in self.models:
+            raise ValueError(f"Model {name} is not available")
+        return name
+
+    def response_words(self, model, prompt):
+        words = f"[{model}] {prompt}".split()
+        offset = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+        while len(words) < self.response_tokens:
+            words.append(_STUB_WORDS[(offset + len(words)) % len(_STUB_WORDS)])
+        return words
+
+    def stream_chat(self, model, history, prompt):
+        self.calls["stream_chat"] += 1
+        words = self.response_words(model, prompt)
+        start = time.perf_counter()
+        for i in range(0, len(words), self.chunk_tokens):
+            # Deadline for this chunk measured from the start, so pacing
+            # does not drift with the consumer's own per-chunk work
+            due = self.first_token_ms / 1000
+            if self.tokens_per_second:
+                due += i / self.tokens_per_second
+            delay = due - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            yield TextChunk(" ".join(words[i:i + self.chunk_tokens]) + " ")
+
+
+PROVIDERS = {"gemini": GeminiProvider, "stub": StubProvider}
+
+
+def get_provider(name=None):
+    """Create the provider named by `name` or AI_PROVIDER."""
+    name = name or AI_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown AI provider '{name}' (expected one of {', '.join(PROVIDERS)})")
+    return PROVIDERS[name]()
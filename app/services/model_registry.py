@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+
+from app.services.llm_providers import get_provider
+
+# Models tried in order; the first one the API offers is used until it fails.
+MODEL_PREFERENCES = [
+    name.strip() for name in
+    os.environ.get("GEMINI_MODELS", "gemini-1.5-flash,gemini-1.5-pro,gemini-pro").split(",")
+    if name.strip()
+]
+# A resolved model is re-validated after this long; a failed one is skipped
+# for the same period before it is tried again.
+MODEL_TTL_SECONDS = float(os.environ.get("GEMINI_MODEL_TTL_SECONDS", 3600))
+
+
+class ModelUnavailableError(RuntimeError):
+    """Raised when none of the preferred or listed models can be created."""
+
+
+class ModelRegistry:
+    """Resolve a model once per process and hand out the cached instance.
+
+    The first get_model() configures the provider (see
+    app.services.llm_providers), lists models once and creates
+    the first available name from `preferences`. Later calls return the
+    cached model until `ttl` expires, refresh() is called, or the caller
+    reports a failure, after which the next preference is resolved.
+    """
+
+    def __init__(self, provider=None, preferences=None, ttl=MODEL_TTL_SECONDS):
+        self._provider = provider
+        self.preferences = list(preferences or MODEL_PREFERENCES)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._api_key = None
+        self._name = None
+        self._model = None
+        self._resolved_at = 0.0
+        self._failed = {}
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            self._provider = get_provider()
+        return self._provider
+
+    def _fresh(self, api_key):
+        return (self._model is not None and api_key == self._api_key
+                and time.monotonic() - self._resolved_at < self.ttl)
+
+    def get_model(self, api_key):
+        """Return (name, model), resolving only when nothing valid is cached."""
+        if self._fresh(api_key):
+            return self._name, self._model
+        with self._lock:
+            if not self._fresh(api_key):
+                self._resolve(api_key)
+            return self._name, self._model
+
+    def _candidates(self):
+        now = time.monotonic()
+        self._failed = {n: t for n, t in self._failed.items() if now - t < self.ttl}
+        preferred = [n for n in self.preferences if n not in self._failed]
+        try:
+            available = self.provider.list_models()
+        except Exception:
+            # Discovery failed; fall back to creating the preferences blindly
+            return preferred
+        listed = [n for n in preferred if n in available]
+        others = [n for n in available
+                  if "gemini" in n.lower() and n not in listed and n not in self._failed]
+        return listed + others
+
+    def _resolve(self, api_key):
+        self.provider.configure(api_key)
+        last_error = None
+        for name in self._candidates():
+            try:
+                model = self.provider.create(name)
+            except Exception as e:
+                last_error = e
+                self._failed[name] = time.monotonic()
+                continue
+            self._api_key = api_key
+            self._name, self._model = name, model
+            self._resolved_at = time.monotonic()
+            return
+        self._name = self._model = None
+        raise ModelUnavailableError(
+            f"Could not initialize a Gemini model (tried {', '.join(self.preferences)}): "
+            f"{last_error or 'no model available'}")
+
+    def report_failure(self, name):
+        """Drop the cached model if it is `name`; the next call resolves another."""
+        with self._lock:
+            self._failed[name] = time.monotonic()
+            if self._name == name:
+                self._name = self._model = None
+
+    def refresh(self):
+        """Forget the cached model and any failures; the next call re-resolves."""
+        with self._lock:
+            self._name = self._model = None
+            self._failed.clear()
+
+    @property
+    def current(self):
+        """Name of the cached model, or None."""
+        return self._name
+
+
+model_registry = ModelRegistry()
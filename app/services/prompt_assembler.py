@@ -0,0 +1,182 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from app.data.timestamps import utc_now
+from app.services.database_manager import get_connection
+from app.services.write_queue import execute_write
+from DATA.ai_history import load_history_window
+
+# Gemini has no offline tokenizer; ~4 characters per token is the usual
+# estimate for English text and is close enough for budgeting.
+CHARS_PER_TOKEN = 4
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("AI_PROMPT_TOKEN_BUDGET", 6000))
+KEEP_TURNS = int(os.environ.get("AI_KEEP_TURNS", 4))
+SUMMARY_TOKEN_BUDGET = 600
+SUMMARY_LINE_CHARS = 160
+# When a long conversation is first summarised, only this many of the most
+# recent older messages are folded in; anything earlier is skipped.
+MAX_FOLD_MESSAGES = 200
+
+SUMMARY_HEADER = "\n\n[EARLIER CONVERSATION SUMMARY]\n"
+INSTRUCTION_FOOTER = "\n\nUse only the facts from the above data."
+
+_metrics = deque(maxlen=200)
+_metrics_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _truncate_to_tokens(text, max_tokens):
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(0, max_chars - 15)] + "\n[...truncated]"
+
+
+def _summary_line(msg):
+    """One line per folded message: its first sentence, clipped."""
+    text = " ".join(msg["content"].split())
+    first = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 1] + "…"
+    who = "User asked" if msg["role"] == "user" else "Assistant answered"
+    return f"- {who}: {first}"
+
+
+def fold_into_summary(summary, messages, max_tokens=SUMMARY_TOKEN_BUDGET):
+    """Append messages to a rolling summary, dropping the oldest lines over budget."""
+    lines = summary.splitlines() if summary else []
+    lines.extend(_summary_line(m) for m in messages)
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def update_summary(username, role, window_start_id):
+    """Return the summary of every message before window_start_id.
+
+    The stored summary covers messages up to through_id; only messages that
+    have since slid out of the verbatim window are read and folded in, so
+    the summary is rewritten once per window move rather than per call.
+    """
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT summary, through_id FROM ai_chat_summaries WHERE username = ? AND role = ?",
+        (username, role),
+    ).fetchone()
+    summary, through_id = (row[0], row[1]) if row else ("", 0)
+    if window_start_id is None or through_id >= window_start_id - 1:
+        return summary
+
+    rows = conn.execute(
+        """
+        SELECT message_role, content FROM ai_chat_history
+        WHERE username = ? AND role = ? AND id > ? AND id < ?
+        ORDER BY id DESC LIMIT ?
+        """,
+        (username, role, through_id, window_start_id, MAX_FOLD_MESSAGES),
+    ).fetchall()
+    summary = fold_into_summary(
+        summary, [{"role": r[0], "content": r[1]} for r in reversed(rows)])
+
+    execute_write(
+        """
+        INSERT INTO ai_chat_summaries (username, role, summary, through_id, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (username, role) DO UPDATE SET
+            summary = excluded.summary,
+            through_id = excluded.through_id,
+            updated_at = excluded.updated_at
+        """,
+        (username, role, summary, window_start_id - 1, utc_now()),
+    )
+    return summary
+
+
+def _recent_turns(username, role, user_prompt, keep_turns):
+    """Last keep_turns exchanges, minus the prompt itself if already saved."""
+    recent, _ = load_history_window(username, role, keep_turns * 2 + 1)
+    if recent and recent[-1]["role"] == "user" and recent[-1]["content"] == user_prompt:
+        recent = recent[:-1]
+    return recent[-keep_turns * 2:] if keep_turns else []
+
+
+def assemble_prompt(role, user_prompt, system_prompt, data_context="",
+                    chat_history=None, username=None,
+                    budget=PROMPT_TOKEN_BUDGET, keep_turns=KEEP_TURNS):
+    """Build a model request that fits within `budget` estimated tokens.
+
+    With a username, the last keep_turns exchanges are read from
+    ai_chat_history and everything older is represented by the rolling
+    summary; otherwise the tail of chat_history is used. Over budget, the
+    oldest verbatim messages go first, then summary lines, then the data
+    context is truncated. Returns {"system", "messages", "prompt",
+    "metrics"}; messages are {"role": "user"|"assistant", "content"}.
+    """
+    start = time.perf_counter()
+    if username:
+        recent = _recent_turns(username, role, user_prompt, keep_turns)
+        summary = update_summary(username, role, recent[0]["id"] if recent else None)
+    else:
+        recent = list(chat_history or [])[-keep_turns * 2:] if keep_turns else []
+        summary = ""
+    messages = [{"role": m["role"], "content": m["content"]} for m in recent]
+
+    # Section separators and headers count against the budget too
+    fixed = (estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+             + estimate_tokens("\n\n" + SUMMARY_HEADER + INSTRUCTION_FOOTER))
+    history_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+    dropped = 0
+    while len(messages) > 2 and fixed + history_tokens + estimate_tokens(summary) > budget:
+        history_tokens -= estimate_tokens(messages.pop(0)["content"])
+        dropped += 1
+    remaining = budget - fixed - history_tokens
+    if estimate_tokens(summary) > remaining:
+        summary = fold_into_summary(summary, [], max(0, remaining))
+    data_budget = budget - fixed - history_tokens - estimate_tokens(summary)
+    data_context = _truncate_to_tokens(data_context or "", data_budget)
+
+    system = system_prompt
+    if data_context:
+        system += "\n\n" + data_context
+    if summary:
+        system += SUMMARY_HEADER + summary
+    system += INSTRUCTION_FOOTER
+
+    request = {"system": system, "messages": messages, "prompt": user_prompt}
+    metrics = {
+        "username": username,
+        "role": role,
+        "system_tokens": estimate_tokens(system_prompt),
+        "data_tokens": estimate_tokens(data_context),
+        "summary_tokens": estimate_tokens(summary),
+        "history_tokens": history_tokens,
+        "prompt_tokens": estimate_tokens(user_prompt),
+        "total_tokens": estimate_tokens(system) + history_tokens + estimate_tokens(user_prompt),
+        "budget": budget,
+        "messages_sent": len(messages),
+        "messages_dropped": dropped,
+        "request_bytes": len(json.dumps(request).encode()),
+        "assembly_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    with _metrics_lock:
+        _metrics.append(metrics)
+    request["metrics"] = metrics
+    return request
+
+
+def recent_prompt_metrics(username=None, limit=20):
+    """Metrics of the latest assembled prompts, newest first."""
+    with _metrics_lock:
+        items = list(_metrics)
+    if username:
+        items = [m for m in items if m["username"] == username]
+    return items[::-1][:limit]
@@ -0,0 +1,178 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+from app.services.database_manager import get_connection
+from app.services.write_queue import write
+
+# Tokens are "<payload>.<signature>", both base64url. The payload carries
+# everything a page needs to render (username, role, avatar version), so a
+# valid token is checked with one HMAC and no users-table query.
+SECRET_PATH = Path("DATA") / "session_secret.key"
+TOKEN_TTL = int(os.environ.get("SESSION_TTL_SECONDS", 8 * 3600))
+
+# How long a process trusts its copy of the revocation list before checking
+# MAX(version) again. Revocations made in this process apply immediately.
+REVOCATION_CHECK_SECONDS = 5
+
+_secret = None
+_secret_lock = threading.Lock()
+_revocations = {"version": None, "checked": 0.0, "token_ids": frozenset()}
+_revocation_lock = threading.Lock()
+
+
+class RevocationCheckError(RuntimeError):
+    """Raised when the revocation list cannot be read and was never loaded."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signing_key() -> bytes:
+    """SESSION_SECRET if set, else a random key created once in DATA/."""
+    global _secret
+    if _secret is None:
+        with _secret_lock:
+            if _secret is None:
+                env_secret = os.environ.get("SESSION_SECRET")
+                if env_secret:
+                    _secret = env_secret.encode()
+                elif SECRET_PATH.exists():
+                    _secret = SECRET_PATH.read_bytes()
+                else:
+                    SECRET_PATH.parent.mkdir(parents=True, exist_ok=True)
+                    key = secrets.token_bytes(32)
+                    fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                    with os.fdopen(fd, "wb") as fh:
+                        fh.write(key)
+                    _secret = key
+    return _secret
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_signing_key(), payload.encode(), hashlib.sha256).digest())
+
+
+def issue_session_token(username: str, role: str, avatar_version: int = 0,
+                        ttl: int = TOKEN_TTL) -> str:
+    """Return a signed token for username valid for ttl seconds."""
+    now = int(time.time())
+    claims = {
+        "sub": username,
+        "role": role,
+        "av": avatar_version,
+        "iat": now,
+        "exp": now + ttl,
+        "jti": secrets.token_urlsafe(12),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def _decode(token):
+    """Return the claims of a correctly signed token, expired or not."""
+    try:
+        payload, signature = token.split(".")
+    except (AttributeError, ValueError):
+        return None
+    if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+        return None
+    try:
+        return json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+
+
+def _revoked_token_ids():
+    """Revoked token ids, re-read only when the table's version has moved.
+
+    If the table cannot be read, the last loaded set is used (and the read
+    retried on the next call); with no earlier copy RevocationCheckError is
+    raised, so a revoked token is never accepted by default.
+    """
+    state = _revocations
+    if time.monotonic() - state["checked"] < REVOCATION_CHECK_SECONDS:
+        return state["token_ids"]
+
+    with _revocation_lock:
+        try:
+            conn = get_connection()
+            version = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM revoked_sessions").fetchone()[0]
+            if version != state["version"]:
+                rows = conn.execute("SELECT token_id FROM revoked_sessions")
+                state["token_ids"] = frozenset(row[0] for row in rows)
+                state["version"] = version
+        except Exception as e:
+            if state["version"] is None:
+                raise RevocationCheckError(f"Could not read the revocation list: {e}") from e
+            return state["token_ids"]
+        state["checked"] = time.monotonic()
+        return state["token_ids"]
+
+
+def verify_session_token(token):
+    """Return the token's claims, or None if it is forged, expired or revoked.
+
+    Raises RevocationCheckError when revocation cannot be checked at all.
+    """
+    claims = _decode(token)
+    if not claims or claims.get("exp", 0) < time.time():
+        return None
+    if claims.get("jti") in _revoked_token_ids():
+        return None
+    return claims
+
+
+def _record_revocation(conn, token_id, expires_at, now):
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO revoked_sessions (token_id, expires_at, version)
+        VALUES (?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM revoked_sessions))
+        """,
+        (token_id, expires_at),
+    )
+    # Pruned after the insert so MAX(version) never goes backwards
+    conn.execute("DELETE FROM revoked_sessions WHERE expires_at < ?", (now,))
+
+
+def revoke_session_token(token) -> bool:
+    """Add a token to the revocation list (used on logout)."""
+    claims = _decode(token)
+    if not claims:
+        return False
+    now = int(time.time())
+    if claims["exp"] < now:
+        return True  # already unusable
+    try:
+        write(_record_revocation, claims["jti"], claims["exp"], now)
+        _revocations["checked"] = 0.0
+        return True
+    except Exception as e:
+        print("revoke_session_token error:", e)
+        return False
+
+
+def refresh_session_token(token, **changes):
+    """Revoke token and return a new one with the same user and any changed
+    claims (e.g. avatar_version after a profile picture update)."""
+    claims = verify_session_token(token)
+    if not claims:
+        return None
+    revoke_session_token(token)
+    return issue_session_token(
+        claims["sub"],
+        changes.get("role", claims["role"]),
+        changes.get("avatar_version", claims["av"]),
+    )
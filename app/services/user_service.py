@@ -1,14 +1,26 @@
 import bcrypt
+import hashlib
+import io
 import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from app.data.db import connect_database
+from PIL import Image, ImageOps, features
+from app.services.database_manager import get_connection, unit_of_work
+from app.services.write_queue import execute_write
+from app.services.auth_pool import auth_pool, hash_cost, target_cost
+from app.services.session_tokens import issue_session_token
 
 USERS_TXT_PATH = Path("DATA/users.txt")
+MIGRATION_BATCH_SIZE = 5000
 
 
-def hash_password(password: str) -> str:
-    """Hash a password with bcrypt."""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+def hash_password(password: str, rounds: int = None) -> str:
+    """Hash a password with bcrypt at the calibrated work factor (or rounds)."""
+    salt = bcrypt.gensalt(rounds or target_cost())
+    return bcrypt.hashpw(password.encode(), salt).decode()
 
 
 def verify_password(password: str, hashed: str) -> bool:
@@ -19,26 +31,84 @@ def verify_password(password: str, hashed: str) -> bool:
         return False
 
 
-def register_user(username: str, password: str, role: str = "user"):
-    """Register a new user with bcrypt hashing."""
+def needs_rehash(hashed: str) -> bool:
+    """True when a stored hash was made at a lower work factor than the target.
+
+    Only upgrades: each process calibrates its own target, so rehashing on
+    any difference would flip an account between hosts on every login.
+    """
+    cost = hash_cost(hashed)
+    return cost is None or cost < target_cost()
+
+
+def _rehash_password(username: str, password: str, old_hash: str):
+    """Replace old_hash with one at the target cost, unless it changed meanwhile."""
+    try:
+        new_hash = hash_password(password)
+        execute_write(
+            "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+            (new_hash, username, old_hash),
+        )
+    except Exception as e:
+        print("Rehash error:", e)
+
+
+def hash_passwords(passwords, max_workers=None, executor=None):
+    """Hash many passwords in parallel worker processes, preserving order.
+
+    bcrypt is CPU-bound, so a process pool (one worker per core by default)
+    scales where threads would not. Small inputs are hashed inline to avoid
+    the pool start-up cost. Pass executor to reuse a pool across calls.
+    """
+    passwords = list(passwords)
+    # Resolve the work factor here so workers do not each calibrate
+    hash_fn = partial(hash_password, rounds=target_cost())
+    if len(passwords) <= 1:
+        return [hash_fn(p) for p in passwords]
+
+    workers = min(max_workers or os.cpu_count() or 1, len(passwords))
+    chunksize = max(1, len(passwords) // (workers * 4))
+    if executor is not None:
+        return list(executor.map(hash_fn, passwords, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_fn, passwords, chunksize=chunksize))
+
+
+def existing_usernames(usernames):
+    """Return the subset of usernames already present, in one query per 500 names."""
+    usernames = list(usernames)
+    found = set()
+    conn = get_connection()
+    for i in range(0, len(usernames), 500):
+        batch = usernames[i:i + 500]
+        placeholders = ", ".join("?" * len(batch))
+        rows = conn.execute(
+            f"SELECT username FROM users WHERE username IN ({placeholders})", batch)
+        found.update(row[0] for row in rows)
+    return found
+
+
+def register_user(username: str, password: str, role: str = "user", password_hash: str = None):
+    """Register a new user with bcrypt hashing.
+
+    password_hash may carry a precomputed bcrypt hash (e.g. from
+    hash_passwords), in which case password is not hashed again.
+    """
     try:
-        conn = connect_database()
+        conn = get_connection()
         cur = conn.cursor()
 
         cur.execute("SELECT id FROM users WHERE username = ?", (username,))
         if cur.fetchone():
             return False, "Username already exists."
 
-        pw_hash = hash_password(password)
+        pw_hash = password_hash or auth_pool.run(hash_password, password)
 
-        cur.execute(
+        execute_write(
             "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
             (username, pw_hash, role),
         )
 
-        conn.commit()
-        conn.close()
-
         # Append user to users.txt file
         try:
             # Ensure DATA directory exists
@@ -58,87 +128,125 @@ def register_user(username: str, password: str, role: str = "user"):
 
 
 def login_user(username: str, password: str):
-    """Authenticate user using bcrypt."""
+    """Authenticate user using bcrypt.
+
+    The check runs on the auth pool, which caps how many hashes run at once;
+    the calling thread still waits for its result. A hash made at a lower
+    work factor is upgraded in the background after a successful login.
+    """
     try:
-        conn = connect_database()
+        conn = get_connection()
         cur = conn.cursor()
 
         cur.execute(
-            "SELECT password_hash, role FROM users WHERE username = ?",
+            "SELECT password_hash, role, avatar_version FROM users WHERE username = ?",
             (username,),
         )
         row = cur.fetchone()
-        conn.close()
 
         if not row:
             return False, "User not found.", None, None
 
-        stored_hash, role = row[0], row[1]
+        stored_hash, role, avatar_version = row[0], row[1], row[2]
 
         # Verify password against stored hash
-        if not verify_password(password, stored_hash):
+        if not auth_pool.run(verify_password, password, stored_hash):
             return False, "Incorrect password.", None, None
 
-        token = f"TOKEN::{username}"
+        if needs_rehash(stored_hash):
+            try:
+                auth_pool.submit(_rehash_password, username, password, stored_hash, timeout=0)
+            except Exception:
+                pass  # pool is busy; upgrade on a later login
+
+        token = issue_session_token(username, role, avatar_version)
         return True, "Login successful.", token, role
 
     except Exception as e:
         return False, f"Login error: {e}", None, None
 
 
-def migrate_users_from_file():
-    """Import users from DATA/users.txt, hashing any plain text passwords if needed."""
-    if not USERS_TXT_PATH.exists():
-        return 0
-
-    count = 0
-
-    with open(USERS_TXT_PATH, "r") as fh:
+def _read_user_lines(path, batch_size):
+    """Yield (lines_read, [(username, password_or_hash, role), ...]) batches."""
+    batch, lines = [], 0
+    with open(path, "r", encoding="utf-8") as fh:
         for line in fh:
+            lines += 1
             parts = line.strip().split(",")
             if len(parts) < 3:
                 continue
+            batch.append((parts[0], parts[1], parts[2]))
+            if len(batch) >= batch_size:
+                yield lines, batch
+                batch = []
+    if batch:
+        yield lines, batch
+
+
+def migrate_users_from_file(path=USERS_TXT_PATH, batch_size=MIGRATION_BATCH_SIZE,
+                            progress_callback=None, max_workers=None):
+    """Import users from DATA/users.txt, hashing any plain text passwords if needed.
+
+    The file is streamed in batches of batch_size lines. Each batch skips
+    usernames already in the database (one query), hashes its plaintext
+    passwords on a shared process pool and is inserted with executemany;
+    the whole import is a single transaction. The first line wins when a
+    username appears more than once.
+
+    progress_callback(lines_read, migrated), if given, is called after each
+    batch. Returns the number of users inserted.
+    """
+    path = Path(path)
+    if not path.exists():
+        return 0
 
-            username, password_or_hash, role = parts[0], parts[1], parts[2]
-
-            if password_or_hash.startswith("$2b$"):
-                pw_hash = password_or_hash
-            else:
-                pw_hash = hash_password(password_or_hash)
-
-            try:
-                conn = connect_database()
-                cur = conn.cursor()
-
-                cur.execute(
-                    "SELECT id FROM users WHERE username = ?", (username,))
-                exists = cur.fetchone()
-
-                if not exists:
-                    cur.execute(
-                        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-                        (username, pw_hash, role),
-                    )
-                    conn.commit()
-                    count += 1
-
-                conn.close()
-            except Exception as e:
-                print("Migration error:", e)
+    count = 0
+    seen = set()
+    pool = None
+    try:
+        with unit_of_work() as conn:
+            for lines_read, batch in _read_user_lines(path, batch_size):
+                fresh = {}
+                for username, password_or_hash, role in batch:
+                    if username not in seen:
+                        seen.add(username)
+                        fresh[username] = (password_or_hash, role)
+                for username in existing_usernames(fresh):
+                    del fresh[username]
+
+                pending = [(u, pw, role) for u, (pw, role) in fresh.items()]
+                plaintext = [i for i, (_, pw, _) in enumerate(pending)
+                             if not pw.startswith("$2b$")]
+                if len(plaintext) > 1 and pool is None:
+                    pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+                hashes = hash_passwords((pending[i][1] for i in plaintext),
+                                        max_workers=max_workers, executor=pool)
+                for i, pw_hash in zip(plaintext, hashes):
+                    pending[i] = (pending[i][0], pw_hash, pending[i][2])
+
+                conn.executemany(
+                    "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                    pending,
+                )
+                count += len(pending)
+                if progress_callback:
+                    progress_callback(lines_read, count)
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
     return count
 
 
 def get_user_by_username(username: str):
     try:
-        conn = connect_database()
+        conn = get_connection()
         cur = conn.cursor()
         cur.execute(
-            "SELECT username, role, avatar, created_at FROM users WHERE username = ?",
+            "SELECT username, role, avatar, created_at, avatar_version FROM users WHERE username = ?",
             (username,),
         )
         row = cur.fetchone()
-        conn.close()
 
         if not row:
             return None
@@ -148,6 +256,7 @@ def get_user_by_username(username: str):
             "role": row[1],
             "avatar": row[2],
             "created_at": row[3],
+            "avatar_version": row[4],
         }
 
     except Exception as e:
@@ -181,12 +290,8 @@ def get_valid_avatar_path(username: str, avatar_path: str = None):
         # Update database with correct path
         abs_path = os.path.abspath(str(correct_path)).replace("\\", "/")
         try:
-            conn = connect_database()
-            cur = conn.cursor()
-            cur.execute("UPDATE users SET avatar = ? WHERE username = ?",
-                        (abs_path, username))
-            conn.commit()
-            conn.close()
+            execute_write("UPDATE users SET avatar = ? WHERE username = ?",
+                          (abs_path, username))
         except Exception as e:
             print(f"Warning: Could not update avatar path in database: {e}")
         return str(correct_path)
@@ -194,18 +299,141 @@ def get_valid_avatar_path(username: str, avatar_path: str = None):
     return None
 
 
+AVATAR_DIR = Path("app/user_images")
+# Widths avatars are shown at: dashboard headers, profile header, profile page
+AVATAR_SIZES = (70, 120, 200)
+AVATAR_FORMAT, AVATAR_EXT = ("WEBP", "webp") if features.check("webp") else ("PNG", "png")
+
+# username -> (avatar_version, {size: image bytes}); empty dict means no avatar
+_avatar_cache = {}
+_avatar_cache_lock = threading.Lock()
+
+
+def _render_thumbnails(source) -> dict:
+    """Decode an image once and encode a square thumbnail for every AVATAR_SIZES."""
+    img = ImageOps.exif_transpose(Image.open(source)).convert("RGBA")
+    side = min(img.size)
+    img = ImageOps.fit(img, (side, side))
+    encoded = {}
+    for size in AVATAR_SIZES:
+        buf = io.BytesIO()
+        img.resize((size, size), Image.LANCZOS).save(buf, format=AVATAR_FORMAT)
+        encoded[size] = buf.getvalue()
+    return encoded
+
+
+def avatar_thumbnail_path(avatar_path: str, size: int) -> str:
+    """Sibling thumbnail of a stored "<user>-<digest>-<size>.<ext>" avatar path."""
+    stem, ext = os.path.splitext(avatar_path)
+    return f"{stem.rsplit('-', 1)[0]}-{size}{ext}"
+
+
+def _is_thumbnail(avatar_path: str) -> bool:
+    return bool(avatar_path) and avatar_path.endswith(f"-{max(AVATAR_SIZES)}.{AVATAR_EXT}")
+
+
+def save_avatar_thumbnails(username: str, image_file) -> str:
+    """Write pre-sized thumbnails of an uploaded image under content-hashed names.
+
+    Returns the absolute path of the largest thumbnail, which is what
+    update_user_profile_image stores; the other sizes sit beside it.
+    """
+    encoded = _render_thumbnails(image_file)
+    digest = hashlib.sha256(encoded[max(AVATAR_SIZES)]).hexdigest()[:16]
+    safe_name = re.sub(r"[^A-Za-z0-9_.]", "_", username)
+
+    AVATAR_DIR.mkdir(parents=True, exist_ok=True)
+    for size, data in encoded.items():
+        (AVATAR_DIR / f"{safe_name}-{digest}-{size}.{AVATAR_EXT}").write_bytes(data)
+    largest = AVATAR_DIR / f"{safe_name}-{digest}-{max(AVATAR_SIZES)}.{AVATAR_EXT}"
+    return os.path.abspath(largest).replace("\\", "/")
+
+
+def _load_avatar_images(avatar_path: str) -> dict:
+    """Read a user's thumbnails, or render them in memory for a legacy upload."""
+    if not avatar_path:
+        return {}
+    if _is_thumbnail(avatar_path):
+        images = {}
+        for size in AVATAR_SIZES:
+            try:
+                images[size] = Path(avatar_thumbnail_path(avatar_path, size)).read_bytes()
+            except OSError:
+                pass
+        if images:
+            return images
+
+    for candidate in (Path(avatar_path), AVATAR_DIR / os.path.basename(avatar_path)):
+        if candidate.exists():
+            try:
+                return _render_thumbnails(candidate)
+            except Exception as e:
+                print("avatar thumbnail error:", e)
+                break
+    return {}
+
+
+def get_avatar_thumbnail(username: str, size: int, avatar_version: int = None):
+    """Return the user's avatar as image bytes sized for `size` px, or None.
+
+    Served from an in-process cache, so headers render without a query,
+    filesystem probe or image decode. avatar_version (from the session
+    token) lets a session notice an avatar updated by another process.
+    """
+    entry = _avatar_cache.get(username)
+    if entry is None or (avatar_version is not None and avatar_version > entry[0]):
+        user = get_user_by_username(username)
+        entry = (
+            user["avatar_version"] if user else 0,
+            _load_avatar_images(user.get("avatar") if user else None),
+        )
+        with _avatar_cache_lock:
+            _avatar_cache[username] = entry
+
+    images = entry[1]
+    fitting = [s for s in AVATAR_SIZES if s >= size and s in images]
+    if fitting:
+        return images[min(fitting)]
+    return images[max(images)] if images else None
+
+
+def invalidate_avatar_cache(username: str):
+    with _avatar_cache_lock:
+        _avatar_cache.pop(username, None)
+
+
+def _delete_avatar_files(avatar_path: str):
+    """Delete an avatar file and, for pipeline thumbnails, all its sizes."""
+    paths = ([avatar_thumbnail_path(avatar_path, s) for s in AVATAR_SIZES]
+             if _is_thumbnail(avatar_path) else [avatar_path])
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as file_error:
+            # Log warning but don't fail
+            print(f"Warning: Could not delete avatar file: {file_error}")
+
+
 def update_user_profile_image(username: str, image_path: str):
-    """Store absolute avatar path for use in image tags."""
+    """Store absolute avatar path for use in image tags.
+
+    Thumbnails from an earlier save_avatar_thumbnails call are deleted and
+    the user's cached avatar is dropped.
+    """
     try:
         abs_path = os.path.abspath(image_path)
         abs_path = abs_path.replace("\\", "/")
 
-        conn = connect_database()
-        cur = conn.cursor()
-        cur.execute("UPDATE users SET avatar = ? WHERE username = ?",
-                    (abs_path, username))
-        conn.commit()
-        conn.close()
+        user = get_user_by_username(username)
+        old_path = user.get("avatar") if user else None
+
+        execute_write("UPDATE users SET avatar = ?, avatar_version = avatar_version + 1 "
+                      "WHERE username = ?", (abs_path, username))
+        invalidate_avatar_cache(username)
+
+        if old_path and old_path != abs_path and _is_thumbnail(old_path):
+            _delete_avatar_files(old_path)
         return True
     except Exception as e:
         print("update_user_profile_image error:", e)
@@ -224,20 +452,13 @@ def remove_user_profile_image(username: str):
         avatar_path = user.get("avatar") if user else None
 
         # Remove from database
-        conn = connect_database()
-        cur = conn.cursor()
-        cur.execute("UPDATE users SET avatar = NULL WHERE username = ?",
-                    (username,))
-        conn.commit()
-        conn.close()
+        execute_write("UPDATE users SET avatar = NULL, avatar_version = avatar_version + 1 "
+                      "WHERE username = ?", (username,))
+        invalidate_avatar_cache(username)
 
-        # Delete file if it exists
-        if avatar_path and os.path.exists(avatar_path):
-            try:
-                os.remove(avatar_path)
-            except Exception as file_error:
-                # Log warning but don't fail
-                print(f"Warning: Could not delete avatar file: {file_error}")
+        # Delete file(s) if present
+        if avatar_path:
+            _delete_avatar_files(avatar_path)
 
         return True, "Profile picture removed successfully."
     except Exception as e:
@@ -260,5 +481,5 @@ class UserService:
     def update_avatar(self, username: str, image_path: str) -> bool:
         return update_user_profile_image(username, image_path)
 
-    def migrate_users(self):
-        return migrate_users_from_file()
+    def migrate_users(self, progress_callback=None):
+        return migrate_users_from_file(progress_callback=progress_callback)
@@ -0,0 +1,207 @@
+"""Single-writer queue for the app's small interactive writes.
+
+Only writes that go through write(), execute_write() or submit_write() are
+serialised here. The bulk paths run their own transaction on the calling
+thread's pooled connection and so bypass the writer, taking SQLite's write
+lock directly (waiting up to the busy timeout while a group commits):
+executemany_batched(), the CSV stream and parallel loaders in
+app.data.datasets (and write_frame_to_table), and migrate_users_from_file(),
+which runs inside unit_of_work().
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.data.db import connect_database
+from app.services import database_manager
+
+# Under contention a group is committed once WRITE_BATCH_MAX commands are
+# queued or WRITE_WINDOW_MS has passed since its first one, whichever is first.
+WRITE_BATCH_MAX = int(os.environ.get("DB_WRITE_BATCH_MAX", 256))
+WRITE_WINDOW_MS = float(os.environ.get("DB_WRITE_WINDOW_MS", 1))
+WRITE_TIMEOUT = 30
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Single writer thread that applies queued write commands in groups.
+
+    SQLite allows one writer at a time, so instead of every Streamlit
+    thread committing on its own connection (and waiting on the lock),
+    commands are queued here and run by one thread on one connection.
+    Each command is fn(conn, *args). A group runs in one transaction with a
+    savepoint per command: if a command raises, only its own changes are
+    rolled back and the rest of the group still commits. Commands are never
+    re-run, so they may have side effects outside the database. Futures
+    resolve only after the group's COMMIT.
+    """
+
+    def __init__(self, batch_max=WRITE_BATCH_MAX, window_ms=WRITE_WINDOW_MS):
+        self.batch_max = batch_max
+        self.window = window_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self._conn_path = None
+        self.groups = 0
+        self.commands = 0
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name="db-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, fn, *args):
+        """Queue fn(conn, *args) and return a Future for its result."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((future, fn, args))
+        return future
+
+    def flush(self, timeout=WRITE_TIMEOUT):
+        """Wait until everything queued so far has been committed."""
+        return self.submit(lambda conn: None).result(timeout)
+
+    def shutdown(self, timeout=WRITE_TIMEOUT):
+        """Commit what is queued, stop the writer thread and close its connection."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self):
+        groups = self.groups
+        return {"groups": groups, "commands": self.commands,
+                "avg_group": round(self.commands / groups, 1) if groups else 0.0}
+
+    def _connection(self):
+        # Follow the process-wide pool if it is pointed at another database
+        path = database_manager.db_manager.db_path
+        if self._conn is None or self._conn_path != path:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = connect_database(path)
+            self._conn_path = path
+        return self._conn
+
+    def _next_group(self, first):
+        # Take everything already queued; only when that shows other writers
+        # are active, wait up to the window for more, so a lone writer never
+        # pays the window as latency.
+        group = [first]
+        deadline = time.monotonic() + self.window
+        while len(group) < self.batch_max:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if len(group) == 1 or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            group, stop = self._next_group(first)
+            self._apply(group)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _apply(self, group):
+        group = [item for item in group if item[0].set_running_or_notify_cancel()]
+        if not group:
+            return
+        try:
+            outcomes = self._run_group(self._connection(), group)
+        except Exception as e:
+            self._fail(group, e)
+            return
+
+        self.groups += 1
+        self.commands += len(outcomes)
+        database_manager.notify_commit()
+        for future, value, ok in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    @staticmethod
+    def _run_group(conn, group):
+        """Run a group in one transaction and commit it; returns (future, value, ok)."""
+        outcomes = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for future, fn, args in group:
+                conn.execute("SAVEPOINT write_command")
+                try:
+                    value = fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_command")
+                    outcomes.append((future, e, False))
+                else:
+                    outcomes.append((future, value, True))
+                conn.execute("RELEASE write_command")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return outcomes
+
+    @staticmethod
+    def _fail(group, error):
+        for future, _, _ in group:
+            future.set_exception(error)
+
+
+# Process-wide writer shared by the data and service layers
+write_queue = WriteQueue()
+atexit.register(write_queue.shutdown)
+
+
+def write(fn, *args, timeout=WRITE_TIMEOUT):
+    """Run fn(conn, *args) as a write and return its result.
+
+    Inside unit_of_work() the command runs on the calling thread's
+    connection so it joins that transaction; otherwise it goes through the
+    write queue and this call waits for its group to commit.
+    """
+    if database_manager.db_manager.in_unit_of_work():
+        return fn(database_manager.get_connection(), *args)
+    return write_queue.submit(fn, *args).result(timeout)
+
+
+def _execute(conn, sql, params):
+    cur = conn.execute(sql, params)
+    return cur.lastrowid, cur.rowcount
+
+
+def execute_write(sql, params=()):
+    """Run one INSERT/UPDATE/DELETE through write(); returns (lastrowid, rowcount)."""
+    return write(_execute, sql, params)
+
+
+def submit_write(fn, *args):
+    """Queue fn(conn, *args) without waiting; returns its Future."""
+    return write_queue.submit(fn, *args)
@@ -70,8 +70,9 @@ def render_chart(df, chart_type="bar", x=None, y=None, color=None, title="", val
         fig = px.scatter(df, **scatter_kwargs)
 
     elif chart_type == "histogram":
+        # With y (e.g. a pre-aggregated count column) bars sum y per bin
         fig = px.histogram(
-            df, x=x, color=color,
+            df, x=x, y=y, color=color,
             title=title,
             template="plotly_dark",
             color_discrete_sequence=NEON_COLORS,
@@ -88,7 +89,11 @@ def render_chart(df, chart_type="bar", x=None, y=None, color=None, title="", val
 
     elif chart_type == "heatmap":
         if groupby and len(groupby) == 2:
-            pivot_data = df.groupby(groupby).size().reset_index(name='count')
+            if values is not None:
+                # Already aggregated: sum the given count column per cell
+                pivot_data = df.groupby(groupby)[values].sum().reset_index(name='count')
+            else:
+                pivot_data = df.groupby(groupby).size().reset_index(name='count')
             pivot_table = pivot_data.pivot(index=groupby[0], columns=groupby[1], values='count').fillna(0)
             fig = px.imshow(
                 pivot_table,
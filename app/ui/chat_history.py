@@ -0,0 +1,95 @@
+import streamlit as st
+
+from DATA.ai_history import load_history_window, HISTORY_WINDOW
+
+
+def _render_message(msg):
+    cls = "ai-chat-bubble-user" if msg["role"] == "user" else "ai-chat-bubble-assistant"
+    who = "You" if msg["role"] == "user" else "AI"
+    st.markdown(f"<div class='{cls}'><strong>{who}:</strong> {msg['content']}</div>",
+                unsafe_allow_html=True)
+    if msg.get("status", "complete") != "complete":
+        st.caption(f"{msg['timestamp']} · ⚠️ reply was interrupted; partial answer shown")
+    else:
+        st.caption(msg["timestamp"])
+
+
+def _older_pages(key, anchor):
+    """Older pages loaded so far for this panel; reset when the window moves."""
+    state = st.session_state.get(f"{key}_older")
+    if not state or state["anchor"] != anchor:
+        state = {"anchor": anchor, "cursor": anchor, "messages": []}
+        st.session_state[f"{key}_older"] = state
+    return state
+
+
+def _render_load_older(key, username, role, window, older):
+    if older["cursor"] is not None:
+        if st.button("⬆ Load older messages", key=f"{key}_load_older"):
+            page, older["cursor"] = load_history_window(
+                username, role, window, before_id=older["cursor"])
+            older["messages"] = page + older["messages"]
+            st.rerun()
+
+
+def render_chat_transcript(key, username, role, window=HISTORY_WINDOW):
+    """Show the newest `window` messages in order, with a "Load older" button
+    above them. Returns the window (oldest first)."""
+    history, cursor = load_history_window(username, role, window)
+    if not history:
+        st.info("No chat history yet.")
+        return history
+
+    older = _older_pages(key, cursor)
+    _render_load_older(key, username, role, window, older)
+    for msg in older["messages"] + history:
+        _render_message(msg)
+    return history
+
+
+def render_chat_window(key, username, role, window=HISTORY_WINDOW):
+    """Show the last question and answer, earlier messages in an expander,
+    and a "Load older" button that pages further back on demand.
+
+    Only the newest `window` messages are read on each rerun. Returns them
+    (oldest first) so callers can pass them to the model as context.
+    """
+    history, cursor = load_history_window(username, role, window)
+    if not history:
+        st.info("No chat history. Try asking a question above!")
+        return history
+
+    last_user_idx = next(
+        (i for i in range(len(history) - 1, -1, -1) if history[i]["role"] == "user"), None)
+    if last_user_idx is None:
+        st.info("No questions asked yet. Try asking a question above!")
+        return history
+
+    st.markdown("### 💬 Last Message")
+    for msg in history[last_user_idx:last_user_idx + 2]:
+        _render_message(msg)
+
+    older = _older_pages(key, cursor)
+    previous = history[:last_user_idx]
+    if previous or cursor is not None:
+        with st.expander("💬 Previous Chat History", expanded=bool(older["messages"])):
+            _render_load_older(key, username, role, window, older)
+            for msg in older["messages"] + previous:
+                _render_message(msg)
+
+    return history
+
+
+def render_cache_status(username, role):
+    """Caption under the chat: a "cached" badge when the latest answer was
+    replayed from the response cache, and the process-wide hit rate."""
+    try:
+        from app.services.ai_service import last_reply_cached, response_cache_stats
+    except Exception:
+        return
+    stats = response_cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    badge = "⚡ cached · " if last_reply_cached(username, role) else ""
+    if lookups or badge:
+        st.caption(f"{badge}AI cache: {stats['hits']} of {lookups} answers served from cache "
+                   f"({stats['hit_rate']:.0%}), {stats['entries']} stored")
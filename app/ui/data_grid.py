@@ -0,0 +1,33 @@
+import streamlit as st
+
+GRID_PAGE_SIZE = 100
+
+
+def render_paginated_grid(key, fetch_page, id_column, page_size=GRID_PAGE_SIZE,
+                          columns=None, empty_message="No data available.", height=500):
+    """Render one keyset page of a table with Previous/Next controls.
+
+    fetch_page(after_id, limit, columns) must return a DataFrame ordered by
+    id_column. The stack of page-start cursors lives in session_state under
+    `key`, so only the visible page is ever read from the database.
+    """
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    page = fetch_page(cursors[-1], page_size, columns)
+
+    if page.empty and len(cursors) == 1:
+        st.info(empty_message)
+        return
+
+    st.dataframe(page, height=height)
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("◀ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with info_col:
+        st.caption(f"Page {len(cursors)} · {len(page)} rows")
+    with next_col:
+        if st.button("Next ▶", key=f"{key}_next", disabled=len(page) < page_size):
+            cursors.append(int(page[id_column].iloc[-1]))
+            st.rerun()
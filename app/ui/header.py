@@ -1,18 +1,17 @@
 import streamlit as st
-from app.services.user_service import get_user_by_username, get_valid_avatar_path
+from app.services.user_service import get_avatar_thumbnail
+from app.ui.session import end_session
 
 
-def render_dashboard_header(username: str, role: str):
+def render_dashboard_header(username: str, role: str, avatar_version: int = 0):
 
     col_a, col_b, col_c = st.columns([1, 6, 2])
 
     with col_a:
-        user_data = get_user_by_username(username)
-        avatar = user_data.get("avatar") if user_data else None
-        avatar_path = get_valid_avatar_path(username, avatar)
+        avatar = get_avatar_thumbnail(username, 70, avatar_version)
 
-        if avatar_path:
-            st.image(avatar_path, width=70)
+        if avatar:
+            st.image(avatar, width=70)
             st.markdown(
                 """
                 <style>
@@ -58,7 +57,7 @@ def render_dashboard_header(username: str, role: str):
                 st.switch_page("pages/profile.py")
         with b2:
             if st.button("Logout"):
-                st.query_params.clear()
+                end_session()
                 st.switch_page("Home.py")
 
     st.markdown("---")
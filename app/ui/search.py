@@ -0,0 +1,39 @@
+import html
+import pandas as pd
+import streamlit as st
+
+from app.data.search import MATCH_START, MATCH_END
+
+
+def _highlight(snippet):
+    """HTML-escape a search snippet and turn match markers into <mark> tags."""
+    text = html.escape(snippet or "")
+    return text.replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def render_search_box(key, search_fn, id_column, label_columns, placeholder="Search descriptions…"):
+    """Render a full-text search box and its ranked, highlighted results."""
+    query = st.text_input("🔎 Search", key=f"{key}_query", placeholder=placeholder)
+    if not query or not query.strip():
+        return
+
+    try:
+        results = search_fn(query.strip())
+    except Exception as e:
+        st.error(f"Search failed: {e}")
+        return
+
+    if results.empty:
+        st.info("No matches.")
+        return
+
+    st.caption(f"{len(results)} best matches")
+    for _, row in results.iterrows():
+        labels = " · ".join(html.escape(str(row[c])) for c in label_columns if pd.notna(row[c]))
+        st.markdown(
+            f"<div style='margin-bottom:8px;'>"
+            f"<strong style='color:#FF1493;'>#{row[id_column]}</strong> "
+            f"<span style='color:rgba(255,255,255,0.6);font-size:12px;'>{labels}</span><br>"
+            f"{_highlight(row['snippet'])}</div>",
+            unsafe_allow_html=True,
+        )
@@ -0,0 +1,56 @@
+import streamlit as st
+from app.services.session_tokens import (
+    verify_session_token, revoke_session_token, RevocationCheckError)
+
+# The signed token is kept in session_state and mirrored to ?session= so a
+# browser reload stays signed in. Pages never trust a bare username.
+SESSION_PARAM = "session"
+
+
+def start_session(token: str):
+    """Remember a freshly issued token for this browser session."""
+    st.session_state["token"] = token
+    st.query_params.clear()
+    st.query_params[SESSION_PARAM] = token
+
+
+def current_session():
+    """Return the verified token claims for this browser session, or None."""
+    token = st.session_state.get("token") or st.query_params.get(SESSION_PARAM)
+    try:
+        claims = verify_session_token(token) if token else None
+    except RevocationCheckError as e:
+        # Fail closed, but keep the token so the next rerun can retry
+        st.error(f"Could not verify your session: {e}")
+        st.stop()
+    if claims:
+        st.session_state["token"] = token
+        if st.query_params.get(SESSION_PARAM) != token:
+            st.query_params[SESSION_PARAM] = token
+    return claims
+
+
+def require_session(page: str = None):
+    """Return the session claims, or send the visitor back to Home.py.
+
+    page, if given, is recorded as last_page for the Profile back button.
+    """
+    claims = current_session()
+    if not claims:
+        end_session()
+        st.switch_page("Home.py")
+        st.stop()
+    if page:
+        st.session_state.last_page = page
+    return claims
+
+
+def end_session():
+    """Revoke the current token and forget it."""
+    token = st.session_state.get("token") or st.query_params.get(SESSION_PARAM)
+    if token:
+        revoke_session_token(token)
+    st.query_params.clear()
+    for key in ("token", "user", "role"):
+        if key in st.session_state:
+            del st.session_state[key]
@@ -0,0 +1,23 @@
+# Streaming loop shared by the AI panels. Kept free of Streamlit imports so
+# benchmarks can drive it with any object that has markdown(body, unsafe_allow_html=).
+
+# Templates for the streamed reply; "{}" receives the text so far
+BUBBLE_TEMPLATE = "<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {}</div>"
+PANEL_TEMPLATE = "<div class='ai-response'><strong>AI:</strong> {}</div>"
+RESPONSE_TEMPLATE = "<div class='ai-response'>{}</div>"
+CURSOR = "▌"
+
+
+def stream_reply(placeholder, chunks, template=BUBBLE_TEMPLATE):
+    """Render chunks into placeholder as they arrive and return the full text.
+
+    Every chunk re-renders the reply so far with a cursor; the final render
+    drops it. Exceptions from the stream propagate to the caller.
+    """
+    full = ""
+    for chunk in chunks:
+        if hasattr(chunk, "text"):
+            full += chunk.text
+            placeholder.markdown(template.format(full + CURSOR), unsafe_allow_html=True)
+    placeholder.markdown(template.format(full), unsafe_allow_html=True)
+    return full
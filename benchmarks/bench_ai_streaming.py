@@ -0,0 +1,82 @@
+"""Measure the AI panels' streaming loop against the local stub provider.
+
+Drives app.ui.streaming.stream_reply (the loop every AI panel runs) with
+StubProvider chunks, so no network, API key or Streamlit is needed. The
+placeholder stand-in encodes each markdown call the way a Streamlit delta
+carries it (the whole body, JSON-serialised) and times that work.
+
+Run from the project root:
+    python -m benchmarks.bench_ai_streaming [response_tokens] [tokens_per_second] [first_token_ms]
+
+"unpaced" streams as fast as the stub can, isolating the loop's own cost;
+"paced" uses the given rate and time-to-first-token (defaults 60 tok/s,
+300 ms) to show what a user sees end to end.
+"""
+import json
+import sys
+import time
+
+from app.services.llm_providers import StubProvider
+from app.ui.streaming import stream_reply, BUBBLE_TEMPLATE
+
+CHUNK_SIZES = [1, 8, 32]
+
+
+class TimedPlaceholder:
+    """Stand-in for st.empty(): records render time and bytes per call."""
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.first_at = None
+
+    def markdown(self, body, unsafe_allow_html=False):
+        start = time.perf_counter()
+        if self.first_at is None:
+            self.first_at = start
+        payload = json.dumps({"markdown": {"body": body, "allow_html": unsafe_allow_html}})
+        self.bytes += len(payload.encode())
+        self.calls += 1
+        self.seconds += time.perf_counter() - start
+
+
+def measure(provider, prompt="What is the average resolution time for tickets?"):
+    placeholder = TimedPlaceholder()
+    start = time.perf_counter()
+    full = stream_reply(placeholder, provider.stream_chat("gemini-1.5-flash", [], prompt),
+                        BUBBLE_TEMPLATE)
+    total = time.perf_counter() - start
+    tokens = len(full.split())
+    return {
+        "chunks": placeholder.calls - 1,
+        "ttft_ms": (placeholder.first_at - start) * 1000,
+        "total_ms": total * 1000,
+        "tokens_per_sec": tokens / total if total else 0.0,
+        "render_us_per_chunk": placeholder.seconds / placeholder.calls * 1e6,
+        "render_ms": placeholder.seconds * 1000,
+        "kb_sent": placeholder.bytes / 1024,
+    }
+
+
+def main():
+    response_tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    first_token_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 300
+
+    print(f"{response_tokens} tokens per reply")
+    print(f"{'mode':<8}  {'chunk':>5}  {'chunks':>6}  {'ttft ms':>8}  {'total ms':>9}  "
+          f"{'tok/s':>8}  {'render us/chunk':>15}  {'render ms':>9}  {'KB sent':>8}")
+    runs = [("unpaced", 0, 0), ("paced", rate, first_token_ms)]
+    for mode, tokens_per_second, ttft in runs:
+        for chunk_tokens in CHUNK_SIZES:
+            provider = StubProvider(first_token_ms=ttft, tokens_per_second=tokens_per_second,
+                                    response_tokens=response_tokens, chunk_tokens=chunk_tokens)
+            r = measure(provider)
+            print(f"{mode:<8}  {chunk_tokens:>5}  {r['chunks']:>6}  {r['ttft_ms']:>8.1f}  "
+                  f"{r['total_ms']:>9.1f}  {r['tokens_per_sec']:>8.0f}  "
+                  f"{r['render_us_per_chunk']:>15.1f}  {r['render_ms']:>9.2f}  {r['kb_sent']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare one-commit-per-row inserts with the batched write path.
+
+Run from the project root:
+    python -m benchmarks.bench_bulk_inserts [rows] [batch_size]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.data.schema import create_all_tables
+from app.services import database_manager
+from app.services.database_manager import DatabaseManager
+
+
+def make_rows(n):
+    return (("2024-01-01 00:00:00", "High", "Phishing", "Open", f"incident {i}")
+            for i in range(n))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    from app.data.incidents import insert_incident, insert_incidents
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DatabaseManager(Path(tmp) / "bench.db")
+        database_manager.db_manager = manager
+        create_all_tables(manager.get_connection())
+
+        start = time.perf_counter()
+        for row in make_rows(n):
+            insert_incident(*row)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        insert_incidents(make_rows(n), batch_size=batch_size)
+        batched = time.perf_counter() - start
+
+        manager.close_all()
+
+    print(f"{n:,} incidents")
+    print(f"single inserts  {single:8.2f}s  {n / single:>12,.0f} rows/sec")
+    print(f"batched ({batch_size})  {batched:8.2f}s  {n / batched:>12,.0f} rows/sec")
+    print(f"speed-up        {single / batched:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare connect-per-query against the pooled DatabaseManager.
+
+Run from the project root:
+    python -m benchmarks.bench_connection_pool [queries] [threads]
+"""
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.data.db import connect_database
+from app.services.database_manager import DatabaseManager
+
+
+def seed(db_path, rows=10_000):
+    conn = connect_database(db_path)
+    conn.execute("""
+        CREATE TABLE cyber_incidents (
+            incident_id INTEGER PRIMARY KEY, timestamp TEXT, severity TEXT,
+            category TEXT, status TEXT, description TEXT)
+    """)
+    conn.executemany(
+        "INSERT INTO cyber_incidents VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, "2024-01-01 00:00:00", "High", "Phishing", "Open", "x" * 64)
+         for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def query(conn, i):
+    conn.execute("SELECT * FROM cyber_incidents WHERE incident_id = ?",
+                 (i % 10_000,)).fetchone()
+
+
+def run_unpooled(db_path, n):
+    for i in range(n):
+        conn = sqlite3.connect(str(db_path))
+        query(conn, i)
+        conn.close()
+
+
+def run_pooled(manager, n):
+    for i in range(n):
+        query(manager.get_connection(), i)
+
+
+def timed(label, fn, n, threads):
+    workers = [threading.Thread(target=fn, args=(n,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {n * threads / elapsed:>12,.0f} queries/sec")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        seed(db_path)
+        manager = DatabaseManager(db_path)
+        print(f"{n:,} point queries x {threads} threads")
+        timed("unpooled", lambda k: run_unpooled(db_path, k), n, threads)
+        timed("pooled", lambda k: run_pooled(manager, k), n, threads)
+        manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
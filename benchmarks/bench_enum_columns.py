@@ -0,0 +1,217 @@
+"""Compare text enum columns with dictionary-encoded ones on a large dataset.
+
+Run from the project root:
+    python -m benchmarks.bench_enum_columns [rows]
+
+Builds an incidents and a tickets table of `rows` rows each (default 5M)
+in the old all-text layout with its indexes, copies the file and migrates
+the copy with app.data.schema.migrate_enum_columns. Reports both file sizes
+after VACUUM and the best-of-3 latency of the dashboard GROUP BY queries:
+the SQL the data layer used to run against the text tables versus the
+current data-layer functions against the coded tables. "status via view"
+runs one unchanged query through the compatibility view, to show what
+code still reading the old column names pays. Exits with status 1 if any
+pair of results differs.
+"""
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.data import incidents, kpis
+from app.data.db import connect_database
+from app.data.schema import (
+    create_cyber_incidents_table, create_it_tickets_table, migrate_enum_columns,
+    create_enum_views, create_indexes, ENUM_TABLES)
+from app.services import database_manager
+from app.services.database_manager import DatabaseManager
+
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+CATEGORIES = ["Phishing", "Malware", "DDoS", "Unauthorized Access", "Misconfiguration",
+              "Insider Threat", "Data Leak", "Ransomware"]
+INCIDENT_STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+TICKET_STATUSES = ["Open", "In Progress", "Resolved", "Closed", "Waiting for User"]
+ASSIGNEES = [f"IT_Support_{chr(ord('A') + i)}" for i in range(20)]
+
+# Indexes the text layout had on these tables
+TEXT_INDEXES = [
+    ("cyber_incidents", "severity, status"),
+    ("cyber_incidents", "category"),
+    ("cyber_incidents", "timestamp"),
+    ("it_tickets", "created_at"),
+    ("it_tickets", "priority"),
+    ("it_tickets", "assigned_to"),
+]
+
+SLA_CASES = " ".join(f"WHEN '{p}' THEN {h}" for p, h in kpis.SLA_HOURS.items())
+
+# Unchanged SQL that still reads the old column names, now through the view
+VIEW_QUERY = "SELECT status, COUNT(*) AS count FROM cyber_incidents GROUP BY status ORDER BY status"
+
+# The queries as they ran against the text columns
+TEXT_QUERIES = {
+    "incidents by category": """
+        SELECT category, COUNT(*) AS count FROM cyber_incidents
+        GROUP BY category ORDER BY count DESC""",
+    "high severity by status": """
+        SELECT status, COUNT(*) AS count FROM cyber_incidents
+        WHERE severity = 'High' GROUP BY status ORDER BY count DESC""",
+    "incident KPIs": """
+        SELECT COUNT(*) AS total,
+            COALESCE(SUM(lower(status) = 'open'), 0) AS open,
+            COALESCE(SUM(lower(status) = 'closed'), 0) AS closed,
+            COALESCE(SUM(lower(severity) = 'critical'), 0) AS critical,
+            COALESCE(SUM(lower(severity) = 'high'), 0) AS high,
+            COUNT(DISTINCT category) AS unique_categories,
+            (SELECT category FROM cyber_incidents WHERE category IS NOT NULL
+             GROUP BY category ORDER BY COUNT(*) DESC, category LIMIT 1) AS top_category
+        FROM cyber_incidents""",
+    "ticket KPIs": """
+        SELECT COUNT(*) AS total,
+            COALESCE(SUM(lower(status) = 'open'), 0) AS open,
+            COALESCE(SUM(lower(status) IN ('resolved', 'closed')), 0) AS resolved,
+            COALESCE(SUM(lower(priority) IN ('high', 'critical')), 0) AS high_priority,
+            COUNT(DISTINCT assigned_to) AS unique_assignees,
+            AVG(resolution_time_hours) AS avg_resolution_hours,
+            (SELECT priority FROM it_tickets WHERE priority IS NOT NULL
+             GROUP BY priority ORDER BY COUNT(*) DESC, priority LIMIT 1) AS top_priority
+        FROM it_tickets""",
+    "assignee SLA": f"""
+        SELECT assigned_to, COUNT(*) AS tickets,
+            COALESCE(SUM(lower(status) = 'open'), 0) AS open,
+            AVG(resolution_time_hours) AS avg_resolution_hours,
+            AVG(CASE WHEN resolution_time_hours IS NULL THEN NULL
+                     ELSE resolution_time_hours <= CASE lower(priority) {SLA_CASES}
+                          ELSE {kpis.SLA_HOURS['medium']} END
+                END) AS within_sla
+        FROM it_tickets WHERE assigned_to IS NOT NULL
+        GROUP BY assigned_to ORDER BY tickets DESC, assigned_to""",
+    "status via view": VIEW_QUERY,
+}
+
+
+def _rows(query):
+    return [tuple(row) for row in database_manager.get_connection().execute(query)]
+
+
+def coded_queries():
+    """The same results from the current data layer (uncached)."""
+    return {
+        "incidents by category": incidents.get_incidents_by_type_count.__wrapped__,
+        "high severity by status": incidents.get_high_severity_by_status.__wrapped__,
+        "incident KPIs": lambda: _rows(kpis.INCIDENT_KPI_QUERY),
+        "ticket KPIs": lambda: _rows(kpis.TICKET_KPI_QUERY),
+        "assignee SLA": lambda: _rows(kpis.assignee_sla_query(database_manager.get_connection())),
+        "status via view": lambda: _rows(VIEW_QUERY),
+    }
+
+
+def as_rows(result):
+    if hasattr(result, "itertuples"):
+        # NaN (a NULL group) does not compare equal to itself
+        return [tuple(None if v != v else v for v in row)
+                for row in result.itertuples(index=False)]
+    return [tuple(row) for row in result]
+
+
+def best_of(fn, runs=3):
+    best, result = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, as_rows(result)
+
+
+def build_text_database(path, n, seed=7):
+    rng = random.Random(seed)
+    conn = connect_database(path)
+    create_cyber_incidents_table(conn)
+    create_it_tickets_table(conn)
+
+    def incident_rows():
+        for i in range(1, n + 1):
+            yield (i, f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} "
+                      f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+                   rng.choice(SEVERITIES), rng.choice(CATEGORIES),
+                   rng.choice(INCIDENT_STATUSES), f"Incident {i} reported by monitoring")
+
+    def ticket_rows():
+        for i in range(1, n + 1):
+            yield (i, rng.choice(PRIORITIES), f"Ticket {i} raised by user",
+                   rng.choice(TICKET_STATUSES), rng.choice(ASSIGNEES),
+                   f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:00:00",
+                   rng.randint(1, 120))
+
+    conn.executemany("INSERT INTO cyber_incidents (incident_id, timestamp, severity, category, "
+                     "status, description) VALUES (?, ?, ?, ?, ?, ?)", incident_rows())
+    conn.executemany("INSERT INTO it_tickets (ticket_id, priority, description, status, "
+                     "assigned_to, created_at, resolution_time_hours) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     ticket_rows())
+    for i, (table, columns) in enumerate(TEXT_INDEXES):
+        conn.execute(f"CREATE INDEX idx_text_{i} ON {table} ({columns})")
+    conn.commit()
+    conn.close()
+
+
+def vacuum_size(path):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute("VACUUM")
+    conn.close()
+    return Path(path).stat().st_size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path, coded_path = Path(tmp) / "text.db", Path(tmp) / "coded.db"
+        start = time.perf_counter()
+        build_text_database(text_path, n)
+        text_size = vacuum_size(text_path)
+        print(f"{n:,} incidents + {n:,} tickets generated in {time.perf_counter() - start:.1f}s")
+
+        shutil.copy(text_path, coded_path)
+        conn = connect_database(coded_path)
+        start = time.perf_counter()
+        migrate_enum_columns(conn)
+        create_enum_views(conn)
+        for table in ENUM_TABLES:
+            create_indexes(conn, ENUM_TABLES[table][0])
+        print(f"migrated to coded columns in {time.perf_counter() - start:.1f}s")
+        conn.close()
+        coded_size = vacuum_size(coded_path)
+
+        print(f"\n{'database size':<24}  {text_size / 1e6:>9,.1f} MB -> {coded_size / 1e6:,.1f} MB "
+              f"({(1 - coded_size / text_size) * 100:.0f}% smaller)")
+
+        text_conn = sqlite3.connect(text_path)
+        manager = DatabaseManager(coded_path)
+        database_manager.db_manager = manager
+
+        mismatches = []
+        print(f"\n{'query':<24}  {'text ms':>9}  {'coded ms':>9}  {'speed-up':>8}")
+        for name, coded in coded_queries().items():
+            text_time, text_rows = best_of(
+                lambda: [tuple(row) for row in text_conn.execute(TEXT_QUERIES[name])])
+            coded_time, coded_rows = best_of(coded)
+            if text_rows != coded_rows:
+                mismatches.append(name)
+            print(f"{name:<24}  {text_time * 1000:>9,.1f}  {coded_time * 1000:>9,.1f}  "
+                  f"{text_time / coded_time:>7.1f}x")
+        text_conn.close()
+        manager.close_all()
+
+    if mismatches:
+        print(f"\nResults differ for: {', '.join(mismatches)}")
+        sys.exit(1)
+    print("\nCoded queries returned the same results as the text queries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Measure login throughput and latency at 1/8/64 concurrent users.
+
+Run from the project root:
+    python -m benchmarks.bench_login [logins_per_user] [cost]
+
+cost defaults to the calibrated work factor (see app.services.auth_pool).
+Each concurrency level is run twice: "inline" verifies on the calling
+threads with no bound, "pool" goes through login_user and the auth pool.
+"busy" counts pool logins turned away after waiting QUEUE_TIMEOUT seconds.
+"""
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.data.schema import create_all_tables
+from app.services import database_manager
+from app.services.auth_pool import calibrate_cost, set_target_cost
+from app.services.database_manager import DatabaseManager, get_connection
+from app.services.user_service import hash_passwords, login_user, verify_password
+
+CONCURRENCY = [1, 8, 64]
+PASSWORD = "SecurePass123"
+
+
+def inline_login(username, password):
+    row = get_connection().execute(
+        "SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+    return verify_password(password, row[0])
+
+
+def pooled_login(username, password):
+    success, msg, _, _ = login_user(username, password)
+    if not success and "Too many sign-ins" not in msg:
+        raise AssertionError(msg)
+    return success
+
+
+def measure(login, users, logins_per_user):
+    def session(username):
+        latencies, rejected = [], 0
+        for _ in range(logins_per_user):
+            start = time.perf_counter()
+            if login(username, PASSWORD):
+                latencies.append(time.perf_counter() - start)
+            else:
+                rejected += 1
+        return latencies, rejected
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(users)) as clients:
+        results = list(clients.map(session, users))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(l for result, _ in results for l in result)
+    rejected = sum(r for _, r in results)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return len(latencies) / elapsed, statistics.median(latencies), p95, rejected
+
+
+def main():
+    logins_per_user = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    cost = int(sys.argv[2]) if len(sys.argv) > 2 else calibrate_cost()
+    set_target_cost(cost)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DatabaseManager(Path(tmp) / "bench.db")
+        database_manager.db_manager = manager
+        conn = manager.get_connection()
+        create_all_tables(conn)
+
+        usernames = [f"user{i}" for i in range(max(CONCURRENCY))]
+        hashes = hash_passwords([PASSWORD] * len(usernames))
+        conn.executemany("INSERT INTO users (username, password_hash, role) VALUES (?, ?, 'user')",
+                         zip(usernames, hashes))
+        conn.commit()
+
+        print(f"bcrypt cost {cost}, {logins_per_user} logins per user")
+        print(f"{'users':>5}  {'mode':<6}  {'logins/sec':>10}  {'p50 ms':>8}  {'p95 ms':>8}  {'busy':>4}")
+        for users in CONCURRENCY:
+            for mode, login in (("inline", inline_login), ("pool", pooled_login)):
+                rate, p50, p95, rejected = measure(login, usernames[:users], logins_per_user)
+                print(f"{users:>5}  {mode:<6}  {rate:>10.1f}  {p50 * 1000:>8.1f}  "
+                      f"{p95 * 1000:>8.1f}  {rejected:>4}")
+
+        manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
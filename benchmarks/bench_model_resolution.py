@@ -0,0 +1,61 @@
+"""Measure time-to-first-token with and without the model registry cache.
+
+Uses StubProvider, so no network or API key is needed. list_models sleeps
+for list_delay_ms to stand in for the discovery round-trip.
+
+Run from the project root:
+    python -m benchmarks.bench_model_resolution [requests] [list_delay_ms]
+
+"per-call" builds a new registry for every request (the old behaviour:
+discover, then construct); "cached" shares one registry across requests.
+A last run marks the first preference broken to show the fallback path.
+"""
+import statistics
+import sys
+import time
+
+from app.services.llm_providers import StubProvider
+from app.services.model_registry import ModelRegistry
+
+PREFERENCES = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
+
+
+def first_token_seconds(registry):
+    start = time.perf_counter()
+    _, model = registry.get_model("stub-key")
+    next(registry.provider.stream_chat(model, [], "hello there"))
+    return time.perf_counter() - start
+
+
+def run(requests, make_registry):
+    timings = [first_token_seconds(make_registry()) for _ in range(requests)]
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    list_delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 300) / 1000
+
+    provider = StubProvider(models=PREFERENCES, list_delay=list_delay, first_token_ms=0)
+    print(f"{requests} requests, list_models {list_delay * 1000:.0f} ms")
+    print(f"{'mode':<9}  {'p50 ms':>8}  {'p95 ms':>8}  {'list_models calls':>17}")
+
+    provider.calls["list_models"] = 0
+    p50, p95 = run(requests, lambda: ModelRegistry(provider, PREFERENCES))
+    print(f"{'per-call':<9}  {p50 * 1000:>8.2f}  {p95 * 1000:>8.2f}  {provider.calls['list_models']:>17}")
+
+    provider.calls["list_models"] = 0
+    shared = ModelRegistry(provider, PREFERENCES)
+    p50, p95 = run(requests, lambda: shared)
+    print(f"{'cached':<9}  {p50 * 1000:>8.2f}  {p95 * 1000:>8.2f}  {provider.calls['list_models']:>17}")
+
+    broken = ModelRegistry(StubProvider(models=PREFERENCES, broken={PREFERENCES[0]}, first_token_ms=0), PREFERENCES)
+    name, _ = broken.get_model("stub-key")
+    broken.report_failure(name)
+    print(f"\nfallback: {PREFERENCES[0]} broken -> resolved {name}; "
+          f"after report_failure -> {broken.get_model('stub-key')[0]}")
+
+
+if __name__ == "__main__":
+    main()
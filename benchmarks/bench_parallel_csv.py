@@ -0,0 +1,102 @@
+"""Scale parallel CSV ingest across worker counts and check it is deterministic.
+
+Run from the project root:
+    python -m benchmarks.bench_parallel_csv [rows] [range_mb]
+
+Generates an IT tickets export with quoted, multi-line descriptions, then
+loads it with the streaming path and with parallel ingest at 1, 2, 4 and 8
+workers. Every parallel load must leave byte-for-byte the same table as
+the streaming load; the script exits with status 1 if any digest differs.
+Speed-up is bounded by the CPUs available (reported below).
+"""
+import csv
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.data import datasets
+from app.data.schema import create_all_tables
+from app.services import database_manager
+from app.services.database_manager import DatabaseManager
+
+WORKER_COUNTS = [1, 2, 4, 8]
+PRIORITIES = ["Low", "Medium", "High", "Critical"]
+STATUSES = ["Open", "In Progress", "Resolved", "Closed"]
+
+
+def write_export(path, n, seed=42):
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(datasets.TABLE_SCHEMAS["it_tickets"])
+        for i in range(1, n + 1):
+            description = f"Ticket {i}: user reports \"{rng.choice(STATUSES)}\" error"
+            if i % 7 == 0:
+                description += "\nsecond line, with a comma\nand a third"
+            writer.writerow([
+                i, rng.choice(PRIORITIES), description, rng.choice(STATUSES),
+                f"analyst{rng.randint(1, 40)}",
+                f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:00:00",
+                rng.randint(1, 240) if i % 11 else "",
+            ])
+
+
+def table_digest(conn):
+    digest = hashlib.sha256()
+    for row in conn.execute(
+            "SELECT ticket_id, priority, description, status, assigned_to, created_at, "
+            "resolution_time_hours, typeof(resolution_time_hours) FROM it_tickets ORDER BY rowid"):
+        digest.update(repr(tuple(row)).encode())
+    return digest.hexdigest()[:16]
+
+
+def load(db_path, csv_path, **kwargs):
+    # A fresh database per run, so each load pays the same trigger and
+    # index maintenance as the first upload into an empty table
+    manager = DatabaseManager(db_path)
+    database_manager.db_manager = manager
+    create_all_tables(manager.get_connection())
+    start = time.perf_counter()
+    rows = datasets.load_csv_to_table(csv_path, "it_tickets", **kwargs)
+    elapsed = time.perf_counter() - start
+    digest = table_digest(manager.get_connection())
+    manager.close_all()
+    return rows, elapsed, digest
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    range_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "tickets.csv"
+        write_export(csv_path, n)
+        datasets.PARALLEL_RANGE_BYTES = int(range_mb * 1024 * 1024)
+        _, ranges = datasets.split_csv_ranges(csv_path)
+        print(f"{n:,} tickets, {csv_path.stat().st_size / 1e6:,.1f} MB, "
+              f"{len(ranges)} ranges, {os.cpu_count()} CPUs")
+
+        rows, base, digest = load(Path(tmp) / "stream.db", csv_path, stream=True)
+        print(f"{'mode':<10}  {'seconds':>8}  {'rows/sec':>10}  {'speed-up':>8}  digest")
+        print(f"{'stream':<10}  {base:>8.2f}  {rows / base:>10,.0f}  {1.0:>7.1f}x  {digest}")
+
+        digests = {digest}
+        for workers in WORKER_COUNTS:
+            rows, elapsed, digest = load(Path(tmp) / f"parallel{workers}.db", csv_path,
+                                         parallel=True, workers=workers)
+            digests.add(digest)
+            print(f"{f'{workers} workers':<10}  {elapsed:>8.2f}  {rows / elapsed:>10,.0f}  "
+                  f"{base / elapsed:>7.1f}x  {digest}")
+
+    if rows != n or len(digests) != 1:
+        print("\nParallel loads differ from the streaming load")
+        sys.exit(1)
+    print("\nAll loads produced identical tables")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare the old per-line users.txt import with the batched migration.
+
+Run from the project root:
+    python -m benchmarks.bench_user_migration [sizes] [plaintext_fraction]
+
+sizes is a comma-separated list (default 10000,100000). Most lines carry a
+bcrypt hash, as users.txt does after registration; plaintext_fraction of
+them (default 0.001) are legacy plaintext passwords that must be hashed.
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.data.schema import create_all_tables
+from app.services import database_manager
+from app.services.database_manager import DatabaseManager, get_connection, commit
+from app.services.user_service import hash_password, migrate_users_from_file
+
+SAMPLE_HASH = hash_password("SecurePass123")
+
+
+def write_users_file(path, n, plaintext_fraction):
+    every = int(1 / plaintext_fraction) if plaintext_fraction else 0
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(n):
+            secret = f"legacy-{i}" if every and i % every == 0 else SAMPLE_HASH
+            fh.write(f"user{i},{secret},user\n")
+
+
+def legacy_migrate(path):
+    """The previous implementation: SELECT, hash, INSERT and commit per line."""
+    count = 0
+    with open(path, "r") as fh:
+        for line in fh:
+            username, password_or_hash, role = line.strip().split(",")[:3]
+            if password_or_hash.startswith("$2b$"):
+                pw_hash = password_or_hash
+            else:
+                pw_hash = hash_password(password_or_hash)
+            conn = get_connection()
+            if not conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone():
+                conn.execute(
+                    "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                    (username, pw_hash, role),
+                )
+                commit()
+                count += 1
+    return count
+
+
+def run(migrate, users_file, tmp, name):
+    manager = DatabaseManager(Path(tmp) / f"{name}.db")
+    database_manager.db_manager = manager
+    create_all_tables(manager.get_connection())
+    start = time.perf_counter()
+    migrated = migrate(users_file)
+    elapsed = time.perf_counter() - start
+    manager.close_all()
+    return migrated, elapsed
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10_000, 100_000]
+    plaintext_fraction = float(sys.argv[2]) if len(sys.argv) > 2 else 0.001
+
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            users_file = Path(tmp) / "users.txt"
+            write_users_file(users_file, n, plaintext_fraction)
+
+            old_count, old = run(legacy_migrate, users_file, tmp, "legacy")
+            new_count, new = run(migrate_users_from_file, users_file, tmp, "batched")
+            assert old_count == new_count == n
+
+        print(f"{n:,} users ({plaintext_fraction:.2%} plaintext)")
+        print(f"  per-line  {old:8.2f}s  {n / old:>10,.0f} users/sec")
+        print(f"  batched   {new:8.2f}s  {n / new:>10,.0f} users/sec")
+        print(f"  speed-up  {old / new:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare per-thread commits with the single-writer queue under contention.
+
+Run from the project root:
+    python -m benchmarks.bench_write_contention [writers] [writes_per_writer]
+
+Each writer thread loops over the app's common writes: insert an incident,
+update its status, save a chat message. "direct" runs them the old way, on
+the thread's own pooled connection with a commit per write; "queue" calls
+the data-layer functions, which go through app.services.write_queue.
+"locked" counts writes that failed with "database is locked".
+"""
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.data.schema import create_all_tables
+from app.services import database_manager
+from app.services.database_manager import DatabaseManager, get_connection
+from app.services.write_queue import write_queue
+
+INCIDENT = ("2024-01-01 00:00:00", "High", "Phishing", "Open", "contention test")
+
+
+def direct_writes(i):
+    from app.data.incidents import _insert_incident, _update_incident_status
+    conn = get_connection()
+    incident_id = _insert_incident(conn, None, *INCIDENT)
+    conn.commit()
+    _update_incident_status(conn, incident_id, "Closed")
+    conn.commit()
+    conn.execute(
+        "INSERT INTO ai_chat_history (username, role, message_role, content, timestamp) "
+        "VALUES (?, ?, 'user', ?, ?)", (f"user{i}", "cyber", "hello", "2024-01-01"))
+    conn.commit()
+
+
+def queued_writes(i):
+    from app.data.incidents import insert_incident, update_incident_status
+    from DATA.ai_history import save_message
+    incident_id = insert_incident(*INCIDENT)
+    update_incident_status(incident_id, "Closed")
+    save_message(f"user{i}", "cyber", "user", "hello")
+
+
+def run_writer(fn, i, count):
+    latencies, locked = [], 0
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            fn(i)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            get_connection().rollback()
+            locked += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, locked
+
+
+def measure(fn, writers, count):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        results = list(pool.map(lambda i: run_writer(fn, i, count), range(writers)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(t for lat, _ in results for t in lat)
+    locked = sum(n for _, n in results)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    # Three statements per iteration
+    return 3 * len(latencies) / elapsed, statistics.median(latencies), p95, locked
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = DatabaseManager(Path(tmp) / "bench.db")
+        database_manager.db_manager = manager
+        create_all_tables(manager.get_connection())
+
+        print(f"{writers} writers x {count} iterations (3 writes each)")
+        print(f"{'mode':<7}  {'writes/sec':>10}  {'p50 ms':>8}  {'p95 ms':>8}  {'locked':>6}")
+        for mode, fn in (("direct", direct_writes), ("queue", queued_writes)):
+            rate, p50, p95, locked = measure(fn, writers, count)
+            print(f"{mode:<7}  {rate:>10,.0f}  {p50 * 1000:>8.2f}  {p95 * 1000:>8.2f}  {locked:>6}")
+
+        stats = write_queue.stats()
+        print(f"\nqueue: {stats['commands']:,} commands in {stats['groups']:,} commits "
+              f"(avg group {stats['avg_group']})")
+        write_queue.shutdown()
+        manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
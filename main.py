@@ -1,75 +1,189 @@
-from app.data.db import connect_database, DB_PATH
+from app.data.db import DB_PATH
+from app.services.database_manager import db_manager
 from app.data.schema import create_all_tables
-from app.services.user_service import register_user, migrate_users_from_file
-from app.data.datasets import load_csv_to_table
+from app.services.user_service import (
+    register_user, migrate_users_from_file, hash_passwords, existing_usernames, USERS_TXT_PATH)
+from app.data.datasets import read_csv_for_table, write_frame_to_table
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
+import hashlib
+import json
+import os
+import time
 
 
 DATA_DIR = Path("DATA")
+MANIFEST_PATH = DATA_DIR / "bootstrap_manifest.json"
+
+CSV_FILES = {
+    "cyber_incidents.csv": "cyber_incidents",
+    "datasets_metadata.csv": "datasets_metadata",
+    "it_tickets.csv": "it_tickets",
+}
+
+DEMO_USERS = [
+    ("admin", "Admin123!", "admin"),
+    ("Rushil_Cyber", "SecurePass123", "cyber"),
+    ("Rushil_Data", "SecurePass123", "data"),
+    ("Rushil_IT", "SecurePass123", "it"),
+]
+
+
+class PhaseTimer:
+    """Collect wall-clock time and a one-line result for each setup phase."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        result = {"detail": ""}
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            self.phases.append((name, time.perf_counter() - start, result["detail"]))
+
+    def summary(self):
+        width = max(len(name) for name, _, _ in self.phases)
+        lines = [f" {name:<{width}}  {secs * 1000:>9.1f} ms  {detail}"
+                 for name, secs, detail in self.phases]
+        total = sum(secs for _, secs, _ in self.phases)
+        lines.append(f" {'total':<{width}}  {total * 1000:>9.1f} ms")
+        return "\n".join(lines)
+
+
+def file_fingerprint(path, previous=None):
+    """Return {size, mtime_ns, sha256} for a file, reusing the previous hash
+    when size and mtime are unchanged so re-runs do not re-read inputs."""
+    stat = path.stat()
+    if (previous and previous.get("size") == stat.st_size
+            and previous.get("mtime_ns") == stat.st_mtime_ns):
+        return previous
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest.hexdigest()}
+
+
+def load_manifest():
+    """Return the input manifest for the current database (empty if it was reset)."""
+    database = str(DB_PATH.resolve())
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get("database") != database or not DB_PATH.exists():
+        manifest = {"database": database, "inputs": {}}
+    return manifest
+
+
+def save_manifest(manifest):
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2))
+
+
+def is_unchanged(manifest, name, fingerprint):
+    previous = manifest["inputs"].get(name)
+    return previous is not None and previous.get("sha256") == fingerprint["sha256"]
+
+
+def migrate_users_phase(manifest):
+    if not USERS_TXT_PATH.exists():
+        return "users.txt not found"
+    fingerprint = file_fingerprint(USERS_TXT_PATH, manifest["inputs"].get("users.txt"))
+    if is_unchanged(manifest, "users.txt", fingerprint):
+        return "unchanged, skipped"
+    migrated = migrate_users_from_file()
+    return f"migrated {migrated} users"
+
+
+def load_csv_phase(conn, manifest):
+    """Parse seed CSVs for empty tables in worker processes, then insert them
+    one after another through this process's single writer connection."""
+    jobs = {}
+    notes = []
+    for name, table in CSV_FILES.items():
+        path = DATA_DIR / name
+        if not path.exists():
+            notes.append(f"{name} missing")
+            continue
+
+        fingerprint = file_fingerprint(path, manifest["inputs"].get(name))
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count:
+            state = "unchanged" if is_unchanged(manifest, name, fingerprint) else "already loaded"
+            notes.append(f"{table}: {state} ({count} rows)")
+            manifest["inputs"][name] = fingerprint
+            continue
+        jobs[name] = (path, table, fingerprint)
+
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+            futures = {pool.submit(read_csv_for_table, str(path), table): name
+                       for name, (path, table, _) in jobs.items()}
+            for future in as_completed(futures):
+                name = futures[future]
+                _, table, fingerprint = jobs[name]
+                try:
+                    rows = write_frame_to_table(future.result(), table)
+                    manifest["inputs"][name] = fingerprint
+                    notes.append(f"{table}: loaded {rows} rows")
+                except Exception as e:
+                    notes.append(f"{table}: failed ({e})")
+    return "; ".join(notes)
+
+
+def demo_users_phase():
+    """Create missing demo accounts, hashing their passwords in parallel."""
+    existing = existing_usernames(u for u, _, _ in DEMO_USERS)
+    missing = [account for account in DEMO_USERS if account[0] not in existing]
+    if not missing:
+        return "all present"
+
+    hashes = hash_passwords(password for _, password, _ in missing)
+    created = []
+    for (username, _, role), pw_hash in zip(missing, hashes):
+        success, msg = register_user(username, None, role, password_hash=pw_hash)
+        created.append(username if success else f"{username} ({msg})")
+    return "created " + ", ".join(created)
 
 
 def setup_database_complete():
-    """Create the database, migrate users, and seed CSV data."""
+    """Create the database, migrate users, and seed CSV data (safe to re-run)."""
     print("\n" + "="*50)
     print(" STARTING DATABASE SETUP ")
     print("="*50)
 
-    print("\n[1/6] Connecting to database...")
-    conn = connect_database()
+    timer = PhaseTimer()
+    manifest = load_manifest()
 
-    print("[2/6] Creating tables...")
-    create_all_tables(conn)
-    print("    -> All tables created (including AI chat history)")
+    with timer.phase("schema") as result:
+        conn = db_manager.get_connection()
+        create_all_tables(conn)
+        result["detail"] = "tables, indexes, rollups and search indexes ready"
 
-    print("[3/6] Migrating users from users.txt...")
-    migrated = migrate_users_from_file()
-    print(f"    -> Migrated {migrated} users")
-
-    # Load CSV files if present
-    print("[4/6] Loading CSV files...")
-    csv_files = {
-        "cyber_incidents.csv": ("DATA/cyber_incidents.csv", "cyber_incidents"),
-        "datasets_metadata.csv": ("DATA/datasets_metadata.csv", "datasets_metadata"),
-        "it_tickets.csv": ("DATA/it_tickets.csv", "it_tickets")
-    }
-
-    for name, (path, table) in csv_files.items():
-        p = Path(path)
-        if p.exists():
-            try:
-                cur = conn.cursor()
-                cur.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cur.fetchone()[0]
-
-                if count == 0:
-                    rows = load_csv_to_table(p, table, if_exists='append')
-                    print(f"    -> Loaded {rows} rows into {table}")
-                else:
-                    print(
-                        f"    -> {table} already has {count} rows. Skipping CSV load.")
-            except Exception as e:
-                print(f"    -> Failed loading {name}: {e}")
-        else:
-            print(f"    -> {name} not found. Skipping.")
-
-    print("[5/6] Creating Demo Admin User...")
-    success, msg = register_user("admin", "Admin123!", "admin")
-    print(f"    -> {msg}")
-
-    print("[6/6] Creating Demo Accounts...")
-    demo_users = [
-        ("Rushil_Cyber", "SecurePass123", "cyber"),
-        ("Rushil_Data", "SecurePass123", "data"),
-        ("Rushil_IT", "SecurePass123", "it"),
-    ]
-    for username, password, role in demo_users:
-        success, msg = register_user(username, password, role)
-        if success:
-            print(f"    -> Created demo user: {username} ({role})")
-        else:
-            print(f"    -> {username}: {msg}")
-
-    conn.close()
+    with timer.phase("users.txt migration") as result:
+        result["detail"] = migrate_users_phase(manifest)
+
+    with timer.phase("CSV seed data") as result:
+        result["detail"] = load_csv_phase(conn, manifest)
+
+    with timer.phase("demo accounts") as result:
+        result["detail"] = demo_users_phase()
+
+    # Record users.txt after registration appended to it, so the next run skips it
+    if USERS_TXT_PATH.exists():
+        manifest["inputs"]["users.txt"] = file_fingerprint(
+            USERS_TXT_PATH, manifest["inputs"].get("users.txt"))
+    save_manifest(manifest)
+    db_manager.close_all()
+
+    print(timer.summary())
     print("\n" + "="*50)
     print(f" SETUP COMPLETE")
     print(f" Database: {DB_PATH.resolve()}")
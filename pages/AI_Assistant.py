@@ -1,55 +1,44 @@
 import streamlit as st
 from app.ui.styles import load_custom_css
-from DATA.ai_history import load_history as load_ai_history, save_message as save_ai_message, delete_history as delete_ai_history
+from app.ui.session import require_session, end_session
+from app.ui.chat_history import render_chat_transcript, render_cache_status
+from app.ui.streaming import stream_reply, RESPONSE_TEMPLATE
+from DATA.ai_history import save_message as save_ai_message, delete_history as delete_ai_history
 
-try:
-    from app.services.ai_service import get_gemini_response
-except Exception:
-    get_gemini_response = None
+from app.services.ai_service import get_gemini_response, persist_stream, ai_unavailable_reason
+
+from app.services.prompt_assembler import recent_prompt_metrics
 
 
 class AIAssistantPage:
     def __init__(self):
         load_custom_css()
-        self.qp = st.query_params
         self.username = None
         self.role = None
-        self.user_data = None
+        self.avatar_version = 0
 
     @staticmethod
     def reload_page():
         """Reload page by logging out and redirecting to login."""
-        st.query_params.clear()
-        if "token" in st.session_state:
-            del st.session_state["token"]
-        if "user" in st.session_state:
-            del st.session_state["user"]
-        if "role" in st.session_state:
-            del st.session_state["role"]
+        end_session()
         st.switch_page("Home.py")
         st.stop()
 
     def authenticate(self):
-        if "user" not in self.qp or not self.qp.get("user"):
-            st.query_params.clear()
-            st.switch_page("Home.py")
-            st.stop()
-
-        self.username = self.qp.get("user")[0]
-        self.role = self.qp.get("role", [""])[0]
-        st.session_state.last_page = "pages/AI_Assistant.py"
+        claims = require_session("pages/AI_Assistant.py")
+        self.username = claims["sub"]
+        self.role = claims["role"]
+        self.avatar_version = claims["av"]
 
     def render_header(self):
         col_a, col_b, col_c = st.columns([1, 6, 2])
 
         with col_a:
-            from app.services.user_service import get_user_by_username, get_valid_avatar_path
-            self.user_data = get_user_by_username(self.username)
-            avatar = self.user_data.get("avatar") if self.user_data else None
-            avatar_path = get_valid_avatar_path(self.username, avatar)
+            from app.services.user_service import get_avatar_thumbnail
+            avatar = get_avatar_thumbnail(self.username, 70, self.avatar_version)
 
-            if avatar_path:
-                st.image(avatar_path, width=70)
+            if avatar:
+                st.image(avatar, width=70)
                 st.markdown(
                     """
                     <style>
@@ -95,23 +84,22 @@ class AIAssistantPage:
                     st.switch_page("pages/profile.py")
             with b2:
                 if st.button("Logout"):
-                    st.query_params.clear()
+                    end_session()
                     st.switch_page("Home.py")
 
         st.markdown("---")
 
     def render_chat(self):
         st.subheader("🧠 Enterprise AI Assistant (general)")
-        history = load_ai_history(self.username, self.role or "general") or []
-        if history:
-            for msg in history:
-                who = "You" if msg["role"] == "user" else "AI"
-                cls = "ai-chat-bubble-user" if msg["role"] == "user" else "ai-chat-bubble-assistant"
-                st.markdown(
-                    f"<div class='{cls}'><strong>{who}:</strong> {msg['content']}</div>", unsafe_allow_html=True)
-                st.caption(msg["timestamp"])
-        else:
-            st.info("No chat history yet.")
+        history = render_chat_transcript("assistant_chat", self.username, self.role or "general")
+        render_cache_status(self.username, self.role or "general")
+        last = recent_prompt_metrics(self.username, limit=1)
+        if last:
+            m = last[0]
+            st.caption(
+                f"Last request: ~{m['total_tokens']:,} tokens of {m['budget']:,} budget · "
+                f"{m['request_bytes'] / 1024:.1f} KB · {m['messages_sent']} turns verbatim"
+                + (" + summary" if m["summary_tokens"] else ""))
 
         q = st.text_input("Ask the AI assistant...", key="ai_query")
         if st.button("Send AI", key="ai_send"):
@@ -124,25 +112,19 @@ class AIAssistantPage:
         save_ai_message(self.username, self.role or "general", "user", q)
         chat_history = [{"role": r["role"], "content": r["content"]}
                         for r in history]
-        if get_gemini_response:
+        unavailable = ai_unavailable_reason()
+        if unavailable is None:
             placeholder = st.empty()
-            full = ""
             try:
                 stream = get_gemini_response(
-                    q, chat_history, self.role or "general")
-                for chunk in stream:
-                    if hasattr(chunk, "text"):
-                        full += chunk.text
-                        placeholder.markdown(
-                            f"<div class='ai-response'>{full}▌</div>", unsafe_allow_html=True)
-                placeholder.markdown(
-                    f"<div class='ai-response'>{full}</div>", unsafe_allow_html=True)
-                save_ai_message(self.username, self.role or "general",
-                                "assistant", full)
+                    q, chat_history, self.role or "general", username=self.username)
+                stream_reply(placeholder,
+                             persist_stream(stream, self.username, self.role or "general"),
+                             RESPONSE_TEMPLATE)
             except Exception as e:
                 st.error(f"AI error: {e}")
         else:
-            fallback = f"[Local] Received: {q}"
+            fallback = f"[Local] Received: {q} (AI unavailable: {unavailable})"
             st.markdown(
                 f"<div class='ai-response'>{fallback}</div>", unsafe_allow_html=True)
             save_ai_message(self.username, self.role or "general",
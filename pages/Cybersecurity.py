@@ -6,22 +6,36 @@ import pandas as pd
 
 from app.ui.styles import load_custom_css
 from app.ui.charts import render_chart
-
-from app.data.incidents import get_all_incidents, insert_incident
+from app.ui.data_grid import render_paginated_grid
+from app.ui.search import render_search_box
+from app.ui.chat_history import render_chat_window, render_cache_status
+from app.ui.streaming import stream_reply, BUBBLE_TEMPLATE
+
+from app.data.incidents import (
+    insert_incident, get_incidents_page, get_incidents_by_type_count,
+    get_severity_category_counts, INCIDENT_SUMMARY_COLUMNS)
 from app.data.datasets import load_csv_to_table
+from app.data.rollups import (
+    counts_by_weekday, counts_by_hour, counts_by_day, status_trend,
+    counts_by_dimension, counts_by_pair)
+from app.data.search import search_incidents
+from app.data.kpis import get_incident_kpis
+from app.data.timestamps import utc_now
 
 from DATA.ai_history import (
-    load_history as load_ai_history,
+    load_history_window,
     save_message as save_ai_message,
     delete_history as delete_ai_history
 )
 
-try:
-    from app.services.ai_service import get_gemini_response
-except Exception:
-    get_gemini_response = None
+from app.services.ai_service import (
+    get_gemini_response, persist_stream, ai_unavailable_reason, ai_error_message)
+
+from app.services.user_service import get_avatar_thumbnail
+from app.ui.session import require_session, end_session
 
-from app.services.user_service import get_user_by_username, get_valid_avatar_path
+# Plain or compressed CSV exports accepted by the upload form
+UPLOAD_TYPES = ["csv", "gz", "zip"]
 
 st.set_page_config(page_title="Cybersecurity Dashboard", layout="wide")
 load_custom_css()
@@ -29,45 +43,32 @@ load_custom_css()
 
 class CybersecurityDashboard:
     def __init__(self):
-        self.qp = st.query_params
         self.username = None
         self.role = None
-        self.user = None
-        self.df = None
+        self.avatar_version = 0
+        self.kpis = None
 
     @staticmethod
     def reload_page():
         """Reload page by logging out and redirecting to login."""
-        st.query_params.clear()
-        if "token" in st.session_state:
-            del st.session_state["token"]
-        if "user" in st.session_state:
-            del st.session_state["user"]
-        if "role" in st.session_state:
-            del st.session_state["role"]
+        end_session()
         st.switch_page("Home.py")
         st.stop()
 
     def authenticate(self):
-        if "user" not in self.qp or not self.qp.get("user"):
-            st.query_params.clear()
-            st.switch_page("Home.py")
-            st.stop()
-
-        self.username = self.qp.get("user")[0]
-        self.role = self.qp.get("role", [""])[0]
-        st.session_state.last_page = "pages/Cybersecurity.py"
+        claims = require_session("pages/Cybersecurity.py")
+        self.username = claims["sub"]
+        self.role = claims["role"]
+        self.avatar_version = claims["av"]
 
     def render_header(self):
         col_a, col_b, col_c = st.columns([1, 6, 2])
 
         with col_a:
-            self.user = get_user_by_username(self.username)
-            avatar = self.user.get("avatar") if self.user else None
-            avatar_path = get_valid_avatar_path(self.username, avatar)
+            avatar = get_avatar_thumbnail(self.username, 70, self.avatar_version)
 
-            if avatar_path:
-                st.image(avatar_path, width=70)
+            if avatar:
+                st.image(avatar, width=70)
                 st.markdown(
                     "<style>img{border-radius:50%; border:3px solid #FF1493;}</style>",
                     unsafe_allow_html=True
@@ -100,53 +101,47 @@ class CybersecurityDashboard:
                     st.switch_page("pages/profile.py")
             with b2:
                 if st.button("Logout"):
-                    st.query_params.clear()
+                    end_session()
                     st.switch_page("Home.py")
 
         st.markdown("---")
 
     def load_data(self):
         try:
-            self.df = get_all_incidents()
+            # Metrics come from one grouped query and every chart reads an
+            # aggregate or rollup, so no incident rows are loaded here
+            self.kpis = get_incident_kpis()
         except Exception as e:
             st.error(f"Failed to load incidents: {e}")
-            self.df = None
+            self.kpis = None
 
     def render_main_panel(self):
         st.subheader("📊 Cybersecurity Analytics Overview")
         
-        # Key Metrics at the top
-        if self.df is not None and not self.df.empty:
-            total_incidents = len(self.df)
-            open_incidents = len(self.df[self.df.get('status', pd.Series()).str.lower() == 'open']) if 'status' in self.df.columns else 0
-            closed_incidents = len(self.df[self.df.get('status', pd.Series()).str.lower() == 'closed']) if 'status' in self.df.columns else 0
-            critical_incidents = len(self.df[self.df.get('severity', pd.Series()).str.lower() == 'critical']) if 'severity' in self.df.columns else 0
-            high_severity = len(self.df[self.df.get('severity', pd.Series()).str.lower() == 'high']) if 'severity' in self.df.columns else 0
-            unique_categories = self.df['category'].nunique() if 'category' in self.df.columns else 0
-            resolved_rate = round((closed_incidents / total_incidents * 100), 1) if total_incidents > 0 else 0
-            
+        # Key Metrics at the top (one grouped SQL query)
+        kpis = self.kpis
+        if kpis and kpis["total"] > 0:
             # First row of metrics
             metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
             with metric_col1:
-                st.metric("Total Incidents", total_incidents)
+                st.metric("Total Incidents", kpis["total"])
             with metric_col2:
-                st.metric("Open Incidents", open_incidents)
+                st.metric("Open Incidents", kpis["open"])
             with metric_col3:
-                st.metric("Closed Incidents", closed_incidents)
+                st.metric("Closed Incidents", kpis["closed"])
             with metric_col4:
-                st.metric("Resolution Rate", f"{resolved_rate}%")
+                st.metric("Resolution Rate", f"{kpis['resolution_rate']}%")
             
             # Second row of metrics
             metric_col5, metric_col6, metric_col7, metric_col8 = st.columns(4)
             with metric_col5:
-                st.metric("Critical Severity", critical_incidents)
+                st.metric("Critical Severity", kpis["critical"])
             with metric_col6:
-                st.metric("High Severity", high_severity)
+                st.metric("High Severity", kpis["high"])
             with metric_col7:
-                st.metric("Unique Categories", unique_categories)
+                st.metric("Unique Categories", kpis["unique_categories"])
             with metric_col8:
-                most_common_category = self.df['category'].mode()[0] if 'category' in self.df.columns and not self.df['category'].mode().empty else "N/A"
-                st.metric("Most Common Category", most_common_category)
+                st.metric("Most Common Category", kpis["top_category"] or "N/A")
             
             st.markdown("---")
         
@@ -154,89 +149,69 @@ class CybersecurityDashboard:
 
         with c1:
             st.markdown("### 🔥 Severity")
-            render_chart(self.df, "pie", "severity",
-                         title="Severity Breakdown")
+            render_chart(counts_by_dimension("incident_counts_hourly", "severity"), "pie",
+                         "value", values="count", title="Severity Breakdown")
 
         with c2:
             st.markdown("### 🧩 Category")
-            render_chart(self.df, "bar", "category", color="severity",
-                         title="Incidents by Category")
+            render_chart(get_severity_category_counts(), "bar", "category", y="count",
+                         color="severity", title="Incidents by Category")
 
         with c3:
             st.markdown("### 📈 Trend")
-            render_chart(self.df, "line", "timestamp", title="Incident Trend")
+            render_chart(counts_by_day("incident_counts_hourly"), "line", "date", y="count",
+                         title="Incident Trend")
 
         st.markdown("---")
         
         # Additional Visualizations Section - Direct Display
         st.markdown("### 📈 Advanced Analytics")
-        if self.df is not None and not self.df.empty:
+        if self.kpis and self.kpis["total"] > 0:
                 # Row 1: Status Distribution and Severity vs Status
                 r1_col1, r1_col2, r1_col3, r1_col4 = st.columns([1, 1, 1, 1])
                 
                 with r1_col1:
                     st.markdown("#### 📊 Status")
-                    render_chart(self.df, "pie", "status", title="Status")
+                    render_chart(counts_by_dimension("incident_counts_hourly", "status"), "pie",
+                                 "value", values="count", title="Status")
                 
                 with r1_col2:
                     st.markdown("#### 🔍 Severity")
-                    render_chart(self.df, "box", x="status", y="severity", 
-                               title="Severity by Status")
+                    render_chart(counts_by_pair("incident_counts_hourly", "status", "severity"),
+                                 "bar", x="status", y="count", color="severity",
+                                 title="Severity by Status")
                 
                 with r1_col3:
                     st.markdown("#### 🔥 Heatmap")
-                    if "severity" in self.df.columns and "category" in self.df.columns:
-                        render_chart(self.df, "heatmap", groupby=["severity", "category"],
-                                   title="Severity-Category")
+                    render_chart(get_severity_category_counts(), "heatmap",
+                                 groupby=["severity", "category"], values="count",
+                                 title="Severity-Category")
                 
                 with r1_col4:
                     st.markdown("#### 📊 Category")
-                    render_chart(self.df, "histogram", x="category", 
-                               title="Category Dist")
+                    render_chart(get_incidents_by_type_count(), "histogram", x="category",
+                                 y="count", title="Category Dist")
                 
-                # Row 2: Time-based analysis
-                if "timestamp" in self.df.columns:
-                    try:
-                        df_time = self.df.copy()
-                        df_time['timestamp'] = pd.to_datetime(df_time['timestamp'], errors='coerce')
-                        df_time = df_time.dropna(subset=['timestamp'])
-                        
-                        if not df_time.empty:
-                            df_time['date'] = df_time['timestamp'].dt.date
-                            df_time['hour'] = df_time['timestamp'].dt.hour
-                            df_time['day_of_week'] = df_time['timestamp'].dt.day_name()
-                            
-                            time_col1, time_col2 = st.columns([1, 1])
-                            
-                            with time_col1:
-                                day_counts = df_time['day_of_week'].value_counts()
-                                day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                                day_counts = day_counts.reindex([d for d in day_order if d in day_counts.index], fill_value=0)
-                                day_df = pd.DataFrame({'day': day_counts.index, 'count': day_counts.values})
-                                render_chart(day_df, "bar", x="day", y="count",
-                                           title="By Day")
-                            
-                            with time_col2:
-                                hour_counts = df_time['hour'].value_counts().sort_index()
-                                hour_df = pd.DataFrame({'hour': hour_counts.index, 'count': hour_counts.values})
-                                render_chart(hour_df, "line", x="hour", y="count",
-                                           title="By Hour")
-                    except Exception:
-                        pass
+                # Row 2: Time-based analysis (pre-aggregated hourly rollup)
+                try:
+                    time_col1, time_col2 = st.columns([1, 1])
+
+                    with time_col1:
+                        render_chart(counts_by_weekday("incident_counts_hourly"), "bar", x="day", y="count",
+                                   title="By Day")
+
+                    with time_col2:
+                        render_chart(counts_by_hour("incident_counts_hourly"), "line", x="hour", y="count",
+                                   title="By Hour")
+                except Exception:
+                    pass
                 
                 # Row 3: Status trends
-                if "timestamp" in self.df.columns and "status" in self.df.columns:
-                    try:
-                        df_status_time = self.df.copy()
-                        df_status_time['timestamp'] = pd.to_datetime(df_status_time['timestamp'], errors='coerce')
-                        df_status_time = df_status_time.dropna(subset=['timestamp'])
-                        df_status_time['date'] = df_status_time['timestamp'].dt.date
-                        
-                        status_counts = df_status_time.groupby(['date', 'status']).size().reset_index(name='count')
-                        render_chart(status_counts, "area", x="date", y="count", color="status",
-                                   title="Status Trends")
-                    except Exception:
-                        pass
+                try:
+                    render_chart(status_trend("incident_counts_hourly"), "area", x="date", y="count", color="status",
+                               title="Status Trends")
+                except Exception:
+                    pass
         else:
             st.info("No data available for advanced analytics")
 
@@ -246,10 +221,13 @@ class CybersecurityDashboard:
         data_col, ai_col = st.columns([2, 1])
         
         with data_col:
-            if self.df is None or self.df.empty:
-                st.info("No incidents available.")
-            else:
-                st.dataframe(self.df, height=500)
+            render_search_box("cyber_search", search_incidents, "incident_id",
+                              ["severity", "category", "status", "timestamp"])
+            show_desc = st.checkbox("Show descriptions", key="cyber_grid_desc")
+            render_paginated_grid(
+                "cyber_grid", get_incidents_page, "incident_id",
+                columns=None if show_desc else INCIDENT_SUMMARY_COLUMNS,
+                empty_message="No incidents available.")
         
         with ai_col:
             self.render_ai_panel()
@@ -258,18 +236,26 @@ class CybersecurityDashboard:
 
         st.subheader("📤 Upload incidents CSV")
         with st.form("upload_csv"):
-            file = st.file_uploader("Upload CSV", type="csv")
+            file = st.file_uploader("Upload CSV", type=UPLOAD_TYPES)
             mode = st.selectbox("Mode", ["append", "replace"])
             ok = st.form_submit_button("Upload")
             if ok and file:
+                # Keep the original suffix so .gz/.zip are decompressed on the fly
+                suffix = "".join(Path(file.name).suffixes) or ".csv"
                 tmp = Path("DATA") / \
-                    f"inc_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+                    f"inc_{datetime.now().strftime('%Y%m%d%H%M%S')}{suffix}"
                 tmp.parent.mkdir(exist_ok=True)
                 tmp.write_bytes(file.getbuffer())
+                progress = st.empty()
                 try:
-                    load_csv_to_table(str(tmp), "cyber_incidents",
-                                      if_exists="replace" if mode == "replace" else "append")
-                    st.success("Uploaded successfully.")
+                    rows = load_csv_to_table(
+                        str(tmp), "cyber_incidents",
+                        if_exists="replace" if mode == "replace" else "append",
+                        stream=True,
+                        parallel=True,
+                        progress_callback=lambda n, rate: progress.caption(
+                            f"Ingested {n:,} rows ({rate:,.0f} rows/sec)"))
+                    st.success(f"Uploaded {rows:,} rows successfully.")
                     st.rerun()
                 except Exception as e:
                     st.error(f"Upload failed: {e}")
@@ -291,7 +277,7 @@ class CybersecurityDashboard:
                     st.error("Description is required.")
                 else:
                     try:
-                        insert_incident(datetime.now().isoformat(),
+                        insert_incident(utc_now(),
                                         sev, cat.strip(), status, desc.strip())
                         st.success("Incident added successfully!")
                         st.rerun()
@@ -317,86 +303,40 @@ class CybersecurityDashboard:
         for i, question in enumerate(example_questions):
             if st.button(question, key=f"example_cyber_{i}"):
                 # Automatically send the question
-                history = load_ai_history(self.username, "cyber") or []
+                history, _ = load_history_window(self.username, "cyber")
                 save_ai_message(self.username, "cyber", "user", question)
                 chat_history = [{"role": m["role"], "content": m["content"]}
                                 for m in history]
 
-                if get_gemini_response:
+                unavailable = ai_unavailable_reason()
+                if unavailable is None:
                     typing_placeholder = st.empty()
                     # Show typing animation
                     typing_placeholder.markdown(
                         "<div class='ai-chat-bubble-assistant'><strong>AI:</strong> <span>Typing<span class='typing-dots'><span>.</span><span>.</span><span>.</span></span></span></div>", 
                         unsafe_allow_html=True
                     )
-                    full = ""
                     try:
-                        for chunk in get_gemini_response(question, chat_history, "cyber"):
-                            if hasattr(chunk, "text"):
-                                full += chunk.text
-                                typing_placeholder.markdown(
-                                    f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {full}▌</div>", 
-                                    unsafe_allow_html=True
-                                )
-                        typing_placeholder.markdown(
-                            f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {full}</div>", 
-                            unsafe_allow_html=True
-                        )
-                        save_ai_message(self.username, "cyber", "assistant", full)
+                        stream = persist_stream(
+                            get_gemini_response(question, chat_history, "cyber", username=self.username),
+                            self.username, "cyber")
+                        stream_reply(typing_placeholder, stream, BUBBLE_TEMPLATE)
                     except Exception as e:
-                        error_msg = f"⚠️ AI Error: {str(e)}"
+                        error_msg = ai_error_message(e)
                         typing_placeholder.markdown(
                             f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {error_msg}</div>", 
                             unsafe_allow_html=True
                         )
-                        save_ai_message(self.username, "cyber", "assistant", error_msg)
                 else:
-                    fallback = f"[Local] Received: {question}"
+                    fallback = f"[Local] Received: {question} (AI unavailable: {unavailable})"
                     save_ai_message(self.username, "cyber", "assistant", fallback)
                 
                 st.rerun()
 
         st.markdown("---")
 
-        history = load_ai_history(self.username, "cyber") or []
-        
-        # Show last message outside, previous history in dropdown
-        if history:
-            # Find the last user message (question) and its answer
-            last_user_msg = None
-            last_user_idx = None
-            for i in range(len(history) - 1, -1, -1):
-                if history[i]["role"] == "user":
-                    last_user_msg = history[i]
-                    last_user_idx = i
-                    break
-            
-            # Display last message/question directly (not in expander)
-            if last_user_msg:
-                st.markdown("### 💬 Last Message")
-                st.markdown(f"<div class='ai-chat-bubble-user'><strong>You:</strong> {last_user_msg['content']}</div>", unsafe_allow_html=True)
-                st.caption(last_user_msg["timestamp"])
-                
-                # Show the corresponding answer if it exists
-                if last_user_idx + 1 < len(history) and history[last_user_idx + 1]["role"] == "assistant":
-                    answer = history[last_user_idx + 1]
-                    st.markdown(f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {answer['content']}</div>", unsafe_allow_html=True)
-                    st.caption(answer["timestamp"])
-                
-                # Show previous history in dropdown
-                if len(history) > 2:  # More than just the last Q&A pair
-                    previous_history = history[:last_user_idx]
-                    if previous_history:
-                        with st.expander("💬 Previous Chat History", expanded=False):
-                            for msg in previous_history:
-                                cls = "ai-chat-bubble-user" if msg["role"] == "user" else "ai-chat-bubble-assistant"
-                                who = "You" if msg["role"] == "user" else "AI"
-                                st.markdown(f"<div class='{cls}'><strong>{who}:</strong> {msg['content']}</div>", unsafe_allow_html=True)
-                                st.caption(msg["timestamp"])
-            else:
-                st.info("No questions asked yet. Try asking a question above!")
-        else:
-            st.info("No chat history. Try asking a question above!")
+        history = render_chat_window("cyber_chat", self.username, "cyber")
+        render_cache_status(self.username, "cyber")
 
         st.markdown("---")
         
@@ -414,8 +354,8 @@ class CybersecurityDashboard:
             chat_history = [{"role": m["role"], "content": m["content"]}
                             for m in history]
 
-            if get_gemini_response:
-                full = ""
+            unavailable = ai_unavailable_reason()
+            if unavailable is None:
                 typing_placeholder = st.empty()
                 # Show typing animation
                 typing_placeholder.markdown(
@@ -423,27 +363,18 @@ class CybersecurityDashboard:
                     unsafe_allow_html=True
                 )
                 try:
-                    for chunk in get_gemini_response(user_message, chat_history, "cyber"):
-                        if hasattr(chunk, "text"):
-                            full += chunk.text
-                            typing_placeholder.markdown(
-                                f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {full}▌</div>", 
-                                unsafe_allow_html=True
-                            )
-                    typing_placeholder.markdown(
-                        f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {full}</div>", 
-                        unsafe_allow_html=True
-                    )
-                    save_ai_message(self.username, "cyber", "assistant", full)
+                    stream = persist_stream(
+                        get_gemini_response(user_message, chat_history, "cyber", username=self.username),
+                        self.username, "cyber")
+                    stream_reply(typing_placeholder, stream, BUBBLE_TEMPLATE)
                 except Exception as e:
-                    error_msg = f"⚠️ AI Error: {str(e)}"
+                    error_msg = ai_error_message(e)
                     typing_placeholder.markdown(
                         f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {error_msg}</div>", 
                         unsafe_allow_html=True
                     )
-                    save_ai_message(self.username, "cyber", "assistant", error_msg)
             else:
-                fallback = f"[Local] Received: {user_message}"
+                fallback = f"[Local] Received: {user_message} (AI unavailable: {unavailable})"
                 save_ai_message(self.username, "cyber", "assistant", fallback)
             
             # Clear input and rerun
@@ -5,20 +5,28 @@ import pandas as pd
 
 from app.ui.styles import load_custom_css
 from app.ui.charts import render_chart
-
-from app.data.datasets import list_datasets, load_csv_to_table
+from app.ui.data_grid import render_paginated_grid
+from app.ui.chat_history import render_chat_window, render_cache_status
+from app.ui.streaming import stream_reply, PANEL_TEMPLATE
+
+from app.data.datasets import (
+    list_datasets_page, list_recent_datasets, get_uploads_by_day, get_uploader_summary,
+    get_column_counts, load_csv_to_table)
+from app.data.kpis import get_dataset_kpis, get_top_datasets
 from DATA.ai_history import (
-    load_history as load_ai_history,
+    load_history_window,
     save_message as save_ai_message,
     delete_history as delete_ai_history
 )
 
-try:
-    from app.services.ai_service import get_gemini_response
-except Exception:
-    get_gemini_response = None
+from app.services.ai_service import (
+    get_gemini_response, persist_stream, ai_unavailable_reason, ai_error_message)
+
+from app.services.user_service import get_avatar_thumbnail
+from app.ui.session import require_session, end_session
 
-from app.services.user_service import get_user_by_username, get_valid_avatar_path
+# Datasets shown in the rows-per-dataset bar chart
+TOP_DATASETS = 20
 
 st.set_page_config(page_title="Data Science Dashboard", layout="wide")
 load_custom_css()
@@ -26,45 +34,32 @@ load_custom_css()
 
 class DataScienceDashboard:
     def __init__(self):
-        self.qp = st.query_params
         self.username = None
         self.role = None
-        self.user = None
-        self.df = None
+        self.avatar_version = 0
+        self.kpis = None
 
     @staticmethod
     def reload_page():
         """Reload page by logging out and redirecting to login."""
-        st.query_params.clear()
-        if "token" in st.session_state:
-            del st.session_state["token"]
-        if "user" in st.session_state:
-            del st.session_state["user"]
-        if "role" in st.session_state:
-            del st.session_state["role"]
+        end_session()
         st.switch_page("Home.py")
         st.stop()
 
     def authenticate(self):
-        if "user" not in self.qp or not self.qp.get("user"):
-            st.query_params.clear()
-            st.switch_page("Home.py")
-            st.stop()
-
-        self.username = self.qp.get("user")[0]
-        self.role = self.qp.get("role", [""])[0]
-        st.session_state.last_page = "pages/Data_Science.py"
+        claims = require_session("pages/Data_Science.py")
+        self.username = claims["sub"]
+        self.role = claims["role"]
+        self.avatar_version = claims["av"]
 
     def render_header(self):
         col_a, col_b, col_c = st.columns([1, 6, 2])
 
         with col_a:
-            self.user = get_user_by_username(self.username)
-            avatar = self.user.get("avatar") if self.user else None
-            avatar_path = get_valid_avatar_path(self.username, avatar)
+            avatar = get_avatar_thumbnail(self.username, 70, self.avatar_version)
 
-            if avatar_path:
-                st.image(avatar_path, width=70)
+            if avatar:
+                st.image(avatar, width=70)
                 st.markdown(
                     "<style>img{border-radius:50%; border:3px solid #FF1493;}</style>", unsafe_allow_html=True)
             else:
@@ -95,164 +90,145 @@ class DataScienceDashboard:
                     st.switch_page("pages/profile.py")
             with b2:
                 if st.button("Logout"):
-                    st.query_params.clear()
+                    end_session()
                     st.switch_page("Home.py")
 
         st.markdown("---")
 
     def load_data(self):
         try:
-            self.df = list_datasets()
+            # Metrics come from one grouped query and every chart reads an
+            # aggregate or a bounded recent sample, so the metadata table
+            # is never loaded here
+            self.kpis = get_dataset_kpis()
         except Exception as e:
             st.error(f"Failed to load datasets: {e}")
-            self.df = None
+            self.kpis = None
 
     def render_main_panel(self):
         st.subheader("📈 Dataset Analytics Overview")
         
-        # Key Metrics at the top
-        if self.df is not None and not self.df.empty:
-            total_datasets = len(self.df)
-            total_rows = self.df['rows'].sum() if 'rows' in self.df.columns else 0
-            total_columns = self.df['columns'].sum() if 'columns' in self.df.columns else 0
-            unique_uploaders = self.df['uploaded_by'].nunique() if 'uploaded_by' in self.df.columns else 0
-            avg_rows = round(self.df['rows'].mean(), 0) if 'rows' in self.df.columns else 0
-            avg_columns = round(self.df['columns'].mean(), 1) if 'columns' in self.df.columns else 0
-            total_data_points = total_rows * total_columns if total_rows > 0 and total_columns > 0 else 0
-            largest_dataset_rows = int(self.df['rows'].max()) if 'rows' in self.df.columns else 0
-            
+        # Key Metrics at the top (one grouped SQL query)
+        kpis = self.kpis
+        if kpis and kpis["total"] > 0:
             # First row of metrics
             metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
             with metric_col1:
-                st.metric("Total Datasets", total_datasets)
+                st.metric("Total Datasets", kpis["total"])
             with metric_col2:
-                st.metric("Total Rows", f"{total_rows:,}")
+                st.metric("Total Rows", f"{kpis['total_rows']:,}")
             with metric_col3:
-                st.metric("Total Columns", total_columns)
+                st.metric("Total Columns", kpis["total_columns"])
             with metric_col4:
-                st.metric("Total Data Points", f"{total_data_points:,}")
+                st.metric("Total Data Points", f"{kpis['total_data_points']:,}")
             
             # Second row of metrics
             metric_col5, metric_col6, metric_col7, metric_col8 = st.columns(4)
             with metric_col5:
-                st.metric("Unique Uploaders", unique_uploaders)
+                st.metric("Unique Uploaders", kpis["unique_uploaders"])
             with metric_col6:
-                st.metric("Avg Rows per Dataset", f"{avg_rows:,.0f}")
+                st.metric("Avg Rows per Dataset", f"{kpis['avg_rows']:,.0f}")
             with metric_col7:
-                st.metric("Avg Columns per Dataset", f"{avg_columns:.1f}")
+                st.metric("Avg Columns per Dataset", f"{kpis['avg_columns']:.1f}")
             with metric_col8:
-                st.metric("Largest Dataset", f"{largest_dataset_rows:,} rows")
+                st.metric("Largest Dataset", f"{kpis['max_rows']:,} rows")
             
             st.markdown("---")
         
+        uploads = get_uploads_by_day()
         c1, c2, c3 = st.columns([1, 1, 1])
 
         with c1:
             st.markdown("### 📊 Columns Distribution")
-            if self.df is not None and "columns" in self.df.columns:
-                render_chart(self.df, chart_type="pie", x="columns",
-                             title="Column Distribution")
-            else:
-                st.info("No 'columns' field available for pie chart")
+            render_chart(get_column_counts(), chart_type="pie", x="columns",
+                         values="count", title="Column Distribution")
 
         with c2:
             st.markdown("### 📊 Rows per Dataset")
-            if self.df is not None and "rows" in self.df.columns:
-                render_chart(self.df, chart_type="bar", x="name",
-                             y="rows", title="Rows per Dataset")
-            else:
-                st.info("No 'rows' field available for bar chart")
+            render_chart(get_top_datasets(TOP_DATASETS), chart_type="bar", x="name",
+                         y="rows", title=f"Rows per Dataset (largest {TOP_DATASETS})")
 
         with c3:
             st.markdown("### 📈 Upload Trend")
-            if self.df is not None and "upload_date" in self.df.columns:
-                render_chart(self.df, chart_type="line",
-                             x="upload_date", title="Upload Trend")
-            else:
-                st.info("No 'upload_date' field available")
+            render_chart(uploads, chart_type="line", x="day", y="datasets",
+                         title="Upload Trend")
 
         st.markdown("---")
         
         # Additional Visualizations Section
         # Advanced Analytics - Direct Display
         st.markdown("### 📊 Advanced Dataset Analytics")
-        if self.df is not None and not self.df.empty:
+        if self.kpis and self.kpis["total"] > 0:
+                # Distributions need per-dataset values: the newest uploads only
+                recent = list_recent_datasets()
+                uploaders = get_uploader_summary()
+
                 # Row 1: Multiple small charts
                 r1_col1, r1_col2, r1_col3, r1_col4 = st.columns([1, 1, 1, 1])
                 
                 with r1_col1:
                     st.markdown("#### 📏 Size")
-                    if "rows" in self.df.columns and "columns" in self.df.columns:
-                        render_chart(self.df, "scatter", x="columns", y="rows",
-                                   title="Rows vs Cols")
+                    render_chart(recent, "scatter", x="columns", y="rows",
+                                 title="Rows vs Cols (recent)")
                 
                 with r1_col2:
                     st.markdown("#### 👥 Uploader")
-                    if "uploaded_by" in self.df.columns:
-                        render_chart(self.df, "bar", x="uploaded_by",
-                                   title="By Uploader")
+                    render_chart(uploaders, "bar", x="uploaded_by", y="datasets",
+                                 title="By Uploader")
                 
                 with r1_col3:
                     st.markdown("#### 📊 Rows Dist")
-                    if "rows" in self.df.columns:
-                        render_chart(self.df, "histogram", x="rows",
-                                   title="Rows Dist")
+                    render_chart(recent, "histogram", x="rows",
+                                 title="Rows Dist (recent)")
                 
                 with r1_col4:
                     st.markdown("#### 📦 Stats")
-                    if "rows" in self.df.columns:
-                        render_chart(self.df, "box", y="rows",
-                                   title="Rows Box")
+                    render_chart(recent, "box", y="rows",
+                                 title="Rows Box (recent)")
                 
-                # Row 2: Time-based
-                if "upload_date" in self.df.columns:
-                    try:
-                        df_time = self.df.copy()
-                        df_time['upload_date'] = pd.to_datetime(df_time['upload_date'], errors='coerce')
-                        df_time = df_time.dropna(subset=['upload_date'])
-                        
-                        if not df_time.empty:
-                            df_time['day_of_week'] = df_time['upload_date'].dt.day_name()
-                            df_time['month'] = df_time['upload_date'].dt.to_period('M').astype(str)
-                            
-                            time_col1, time_col2 = st.columns([1, 1])
-                            
-                            with time_col1:
-                                month_counts = df_time['month'].value_counts().sort_index()
-                                month_df = pd.DataFrame({'month': month_counts.index, 'count': month_counts.values})
-                                render_chart(month_df, "bar", x="month", y="count",
-                                           title="By Month")
-                            
-                            with time_col2:
-                                day_counts = df_time['day_of_week'].value_counts()
-                                day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                                day_counts = day_counts.reindex([d for d in day_order if d in day_counts.index], fill_value=0)
-                                day_df = pd.DataFrame({'day': day_counts.index, 'count': day_counts.values})
-                                render_chart(day_df, "bar", x="day", y="count",
-                                           title="By Day")
-                    except Exception:
-                        pass
+                # Row 2: Time-based, folded from the per-day upload counts
+                try:
+                    days = pd.to_datetime(uploads["day"], errors="coerce")
+                    by_time = uploads.assign(
+                        month=days.dt.to_period("M").astype(str),
+                        day_of_week=days.dt.day_name())[days.notna()]
+
+                    if not by_time.empty:
+                        time_col1, time_col2 = st.columns([1, 1])
+
+                        with time_col1:
+                            month_df = (by_time.groupby("month")["datasets"].sum()
+                                        .rename("count").reset_index())
+                            render_chart(month_df, "bar", x="month", y="count",
+                                       title="By Month")
+
+                        with time_col2:
+                            day_counts = by_time.groupby("day_of_week")["datasets"].sum()
+                            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+                            day_counts = day_counts.reindex([d for d in day_order if d in day_counts.index], fill_value=0)
+                            day_df = pd.DataFrame({'day': day_counts.index, 'count': day_counts.values})
+                            render_chart(day_df, "bar", x="day", y="count",
+                                       title="By Day")
+                except Exception:
+                    pass
                 
                 # Row 3: Uploader performance
-                if "uploaded_by" in self.df.columns and "rows" in self.df.columns:
-                    uploader_col1, uploader_col2 = st.columns([1, 1])
-                    
-                    with uploader_col1:
-                        uploader_rows = self.df.groupby('uploaded_by')['rows'].sum().reset_index()
-                        uploader_rows.columns = ['uploaded_by', 'total_rows']
-                        render_chart(uploader_rows, "bar", x="uploaded_by", y="total_rows",
-                                   title="Total Rows")
-                    
-                    with uploader_col2:
-                        if "columns" in self.df.columns:
-                            df_heatmap = self.df.copy()
-                            df_heatmap['size_category'] = pd.cut(
-                                df_heatmap['rows'] * df_heatmap['columns'],
-                                bins=3,
-                                labels=['Small', 'Medium', 'Large']
-                            )
-                            render_chart(df_heatmap, "heatmap", groupby=["uploaded_by", "size_category"],
-                                       title="Uploader Heatmap")
+                uploader_col1, uploader_col2 = st.columns([1, 1])
+
+                with uploader_col1:
+                    render_chart(uploaders, "bar", x="uploaded_by", y="total_rows",
+                               title="Total Rows")
+
+                with uploader_col2:
+                    if not recent.empty:
+                        df_heatmap = recent.copy()
+                        df_heatmap['size_category'] = pd.cut(
+                            df_heatmap['rows'] * df_heatmap['columns'],
+                            bins=3,
+                            labels=['Small', 'Medium', 'Large']
+                        )
+                        render_chart(df_heatmap, "heatmap", groupby=["uploaded_by", "size_category"],
+                                   title="Uploader Heatmap (recent)")
         else:
             st.info("No data available for advanced analytics")
 
@@ -262,10 +238,9 @@ class DataScienceDashboard:
         data_col, ai_col = st.columns([2, 1])
         
         with data_col:
-            if self.df is None or self.df.empty:
-                st.info("No datasets found.")
-            else:
-                st.dataframe(self.df, height=500)
+            render_paginated_grid(
+                "data_grid", list_datasets_page, "dataset_id",
+                empty_message="No datasets found.")
         
         with ai_col:
             self.render_ai_panel()
@@ -357,86 +332,40 @@ class DataScienceDashboard:
         for i, question in enumerate(example_questions):
             if st.button(question, key=f"example_data_{i}"):
                 # Automatically send the question
-                history = load_ai_history(self.username, "data") or []
+                history, _ = load_history_window(self.username, "data")
                 save_ai_message(self.username, "data", "user", question)
                 chat_history = [{"role": r["role"], "content": r["content"]}
                                 for r in history]
 
-                if get_gemini_response:
+                unavailable = ai_unavailable_reason()
+                if unavailable is None:
                     typing_placeholder = st.empty()
                     # Show typing animation
                     typing_placeholder.markdown(
                         "<div class='ai-response'><strong>AI:</strong> <span>Typing<span class='typing-dots'><span>.</span><span>.</span><span>.</span></span></span></div>", 
                         unsafe_allow_html=True
                     )
-                    full = ""
                     try:
-                        for chunk in get_gemini_response(question, chat_history, "data"):
-                            if hasattr(chunk, "text"):
-                                full += chunk.text
-                                typing_placeholder.markdown(
-                                    f"<div class='ai-response'><strong>AI:</strong> {full}▌</div>", 
-                                    unsafe_allow_html=True
-                                )
-                        typing_placeholder.markdown(
-                            f"<div class='ai-response'><strong>AI:</strong> {full}</div>", 
-                            unsafe_allow_html=True
-                        )
-                        save_ai_message(self.username, "data", "assistant", full)
+                        stream = persist_stream(
+                            get_gemini_response(question, chat_history, "data", username=self.username),
+                            self.username, "data")
+                        stream_reply(typing_placeholder, stream, PANEL_TEMPLATE)
                     except Exception as e:
-                        error_msg = f"⚠️ AI Error: {str(e)}"
+                        error_msg = ai_error_message(e)
                         typing_placeholder.markdown(
                             f"<div class='ai-response'><strong>AI:</strong> {error_msg}</div>", 
                             unsafe_allow_html=True
                         )
-                        save_ai_message(self.username, "data", "assistant", error_msg)
                 else:
-                    fallback = f"[Local] Received: {question}"
+                    fallback = f"[Local] Received: {question} (AI unavailable: {unavailable})"
                     save_ai_message(self.username, "data", "assistant", fallback)
                 
                 st.rerun()
 
         st.markdown("---")
 
-        history = load_ai_history(self.username, "data") or []
-        
-        # Show last message outside, previous history in dropdown
-        if history:
-            # Find the last user message (question) and its answer
-            last_user_msg = None
-            last_user_idx = None
-            for i in range(len(history) - 1, -1, -1):
-                if history[i]["role"] == "user":
-                    last_user_msg = history[i]
-                    last_user_idx = i
-                    break
-            
-            # Display last message/question directly (not in expander)
-            if last_user_msg:
-                st.markdown("### 💬 Last Message")
-                st.markdown(f"<div class='ai-chat-bubble-user'><strong>You:</strong> {last_user_msg['content']}</div>", unsafe_allow_html=True)
-                st.caption(last_user_msg["timestamp"])
-                
-                # Show the corresponding answer if it exists
-                if last_user_idx + 1 < len(history) and history[last_user_idx + 1]["role"] == "assistant":
-                    answer = history[last_user_idx + 1]
-                    st.markdown(f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {answer['content']}</div>", unsafe_allow_html=True)
-                    st.caption(answer["timestamp"])
-                
-                # Show previous history in dropdown
-                if len(history) > 2:  # More than just the last Q&A pair
-                    previous_history = history[:last_user_idx]
-                    if previous_history:
-                        with st.expander("💬 Previous Chat History", expanded=False):
-                            for msg in previous_history:
-                                cls = "ai-chat-bubble-user" if msg["role"] == "user" else "ai-chat-bubble-assistant"
-                                who = "You" if msg["role"] == "user" else "AI"
-                                st.markdown(f"<div class='{cls}'><strong>{who}:</strong> {msg['content']}</div>", unsafe_allow_html=True)
-                                st.caption(msg["timestamp"])
-            else:
-                st.info("No questions asked yet. Try asking a question above!")
-        else:
-            st.info("No chat history. Try asking a question above!")
+        history = render_chat_window("data_chat", self.username, "data")
+        render_cache_status(self.username, "data")
 
         st.markdown("---")
         
@@ -457,36 +386,27 @@ class DataScienceDashboard:
             chat_history = [{"role": r["role"], "content": r["content"]}
                             for r in history]
             
-            if get_gemini_response:
+            unavailable = ai_unavailable_reason()
+            if unavailable is None:
                 typing_placeholder = st.empty()
                 # Show typing animation
                 typing_placeholder.markdown(
                     "<div class='ai-response'><strong>AI:</strong> <span>Typing<span class='typing-dots'><span>.</span><span>.</span><span>.</span></span></span></div>", 
                     unsafe_allow_html=True
                 )
-                full = ""
                 try:
-                    for chunk in get_gemini_response(user_message, chat_history, "data"):
-                        if hasattr(chunk, "text"):
-                            full += chunk.text
-                            typing_placeholder.markdown(
-                                f"<div class='ai-response'><strong>AI:</strong> {full}▌</div>", 
-                                unsafe_allow_html=True
-                            )
-                    typing_placeholder.markdown(
-                        f"<div class='ai-response'><strong>AI:</strong> {full}</div>", 
-                        unsafe_allow_html=True
-                    )
-                    save_ai_message(self.username, "data", "assistant", full)
+                    stream = persist_stream(
+                        get_gemini_response(user_message, chat_history, "data", username=self.username),
+                        self.username, "data")
+                    stream_reply(typing_placeholder, stream, PANEL_TEMPLATE)
                 except Exception as e:
-                    error_msg = f"⚠️ AI Error: {str(e)}"
+                    error_msg = ai_error_message(e)
                     typing_placeholder.markdown(
                         f"<div class='ai-response'><strong>AI:</strong> {error_msg}</div>", 
                         unsafe_allow_html=True
                     )
-                    save_ai_message(self.username, "data", "assistant", error_msg)
             else:
-                fallback = f"[Local] Received: {user_message}"
+                fallback = f"[Local] Received: {user_message} (AI unavailable: {unavailable})"
                 st.markdown(
                     f"<div class='ai-response'>{fallback}</div>", unsafe_allow_html=True)
                 try:
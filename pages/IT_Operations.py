@@ -5,22 +5,36 @@ import pandas as pd
 
 from app.ui.styles import load_custom_css
 from app.ui.charts import render_chart
-
-from app.data.tickets import get_all_tickets, insert_ticket
+from app.ui.data_grid import render_paginated_grid
+from app.ui.search import render_search_box
+from app.ui.chat_history import render_chat_window, render_cache_status
+from app.ui.streaming import stream_reply, PANEL_TEMPLATE
+
+from app.data.tickets import (
+    insert_ticket, get_tickets_page, get_recent_tickets, get_assignee_status_counts,
+    TICKET_SUMMARY_COLUMNS)
 from app.data.datasets import load_csv_to_table
+from app.data.rollups import (
+    counts_by_weekday, counts_by_hour, counts_by_day, status_trend,
+    counts_by_dimension, counts_by_pair)
+from app.data.search import search_tickets
+from app.data.kpis import get_ticket_kpis, get_assignee_sla
+from app.data.timestamps import utc_now
 
 from DATA.ai_history import (
-    load_history as load_ai_history,
+    load_history_window,
     save_message as save_ai_message,
     delete_history as delete_ai_history
 )
 
-try:
-    from app.services.ai_service import get_gemini_response
-except Exception:
-    get_gemini_response = None
+from app.services.ai_service import (
+    get_gemini_response, persist_stream, ai_unavailable_reason, ai_error_message)
+
+from app.services.user_service import get_avatar_thumbnail
+from app.ui.session import require_session, end_session
 
-from app.services.user_service import get_user_by_username, get_valid_avatar_path
+# Plain or compressed CSV exports accepted by the upload form
+UPLOAD_TYPES = ["csv", "gz", "zip"]
 
 st.set_page_config(page_title="IT Operations Dashboard", layout="wide")
 load_custom_css()
@@ -28,45 +42,32 @@ load_custom_css()
 
 class ITOperationsDashboard:
     def __init__(self):
-        self.qp = st.query_params
         self.username = None
         self.role = None
-        self.user = None
-        self.df = None
+        self.avatar_version = 0
+        self.kpis = None
 
     @staticmethod
     def reload_page():
         """Reload page by logging out and redirecting to login."""
-        st.query_params.clear()
-        if "token" in st.session_state:
-            del st.session_state["token"]
-        if "user" in st.session_state:
-            del st.session_state["user"]
-        if "role" in st.session_state:
-            del st.session_state["role"]
+        end_session()
         st.switch_page("Home.py")
         st.stop()
 
     def authenticate(self):
-        if "user" not in self.qp or not self.qp.get("user"):
-            st.query_params.clear()
-            st.switch_page("Home.py")
-            st.stop()
-
-        self.username = self.qp.get("user")[0]
-        self.role = self.qp.get("role", [""])[0]
-        st.session_state.last_page = "pages/IT_Operations.py"
+        claims = require_session("pages/IT_Operations.py")
+        self.username = claims["sub"]
+        self.role = claims["role"]
+        self.avatar_version = claims["av"]
 
     def render_header(self):
         col_a, col_b, col_c = st.columns([1, 6, 2])
 
         with col_a:
-            self.user = get_user_by_username(self.username)
-            avatar = self.user.get("avatar") if self.user else None
-            avatar_path = get_valid_avatar_path(self.username, avatar)
+            avatar = get_avatar_thumbnail(self.username, 70, self.avatar_version)
 
-            if avatar_path:
-                st.image(avatar_path, width=70)
+            if avatar:
+                st.image(avatar, width=70)
                 st.markdown(
                     "<style>img{border-radius:50%; border:3px solid #FF1493;}</style>", unsafe_allow_html=True)
             else:
@@ -97,162 +98,131 @@ class ITOperationsDashboard:
                     st.switch_page("pages/profile.py")
             with b2:
                 if st.button("Logout"):
-                    st.query_params.clear()
+                    end_session()
                     st.switch_page("Home.py")
 
         st.markdown("---")
 
     def load_data(self):
         try:
-            self.df = get_all_tickets()
+            # Metrics come from one grouped query and every chart reads an
+            # aggregate, a rollup or a bounded recent sample, so the ticket
+            # table is never loaded here
+            self.kpis = get_ticket_kpis()
         except Exception as e:
             st.error(f"Failed to load tickets: {e}")
-            self.df = None
+            self.kpis = None
 
     def render_main_panel(self):
         st.subheader("📊 IT Analytics Overview")
         
-        # Key Metrics at the top
-        if self.df is not None and not self.df.empty:
-            total_tickets = len(self.df)
-            open_tickets = len(self.df[self.df.get('status', pd.Series()).str.lower() == 'open']) if 'status' in self.df.columns else 0
-            resolved_tickets = len(self.df[self.df.get('status', pd.Series()).str.lower().isin(['resolved', 'closed'])]) if 'status' in self.df.columns else 0
-            high_priority = len(self.df[self.df.get('priority', pd.Series()).str.lower().isin(['high', 'critical'])]) if 'priority' in self.df.columns else 0
-            unique_assignees = self.df['assigned_to'].nunique() if 'assigned_to' in self.df.columns else 0
-            avg_resolution_hours = round(self.df['resolution_time_hours'].mean(), 1) if 'resolution_time_hours' in self.df.columns else 0
-            resolution_rate = round((resolved_tickets / total_tickets * 100), 1) if total_tickets > 0 else 0
-            
+        # Key Metrics at the top (one grouped SQL query)
+        kpis = self.kpis
+        if kpis and kpis["total"] > 0:
             # First row of metrics
             metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
             with metric_col1:
-                st.metric("Total Tickets", total_tickets)
+                st.metric("Total Tickets", kpis["total"])
             with metric_col2:
-                st.metric("Open Tickets", open_tickets)
+                st.metric("Open Tickets", kpis["open"])
             with metric_col3:
-                st.metric("Resolved Tickets", resolved_tickets)
+                st.metric("Resolved Tickets", kpis["resolved"])
             with metric_col4:
-                st.metric("Resolution Rate", f"{resolution_rate}%")
+                st.metric("Resolution Rate", f"{kpis['resolution_rate']}%")
             
             # Second row of metrics
             metric_col5, metric_col6, metric_col7, metric_col8 = st.columns(4)
             with metric_col5:
-                st.metric("High Priority", high_priority)
+                st.metric("High Priority", kpis["high_priority"])
             with metric_col6:
-                st.metric("Active Assignees", unique_assignees)
+                st.metric("Active Assignees", kpis["unique_assignees"])
             with metric_col7:
-                st.metric("Avg Resolution Time", f"{avg_resolution_hours}h")
+                st.metric("Avg Resolution Time", f"{kpis['avg_resolution_hours']}h")
             with metric_col8:
-                most_common_priority = self.df['priority'].mode()[0] if 'priority' in self.df.columns and not self.df['priority'].mode().empty else "N/A"
-                st.metric("Most Common Priority", most_common_priority)
+                st.metric("Most Common Priority", kpis["top_priority"] or "N/A")
             
             st.markdown("---")
         
         c1, c2, c3 = st.columns([1, 1, 1])
 
         with c1:
-            render_chart(self.df, chart_type="pie",
-                         x="status", title="Ticket Status")
+            render_chart(counts_by_dimension("ticket_counts_hourly", "status"), chart_type="pie",
+                         x="value", values="count", title="Ticket Status")
 
         with c2:
-            render_chart(self.df, chart_type="bar", x="priority",
+            render_chart(counts_by_pair("ticket_counts_hourly", "priority", "status"),
+                         chart_type="bar", x="priority", y="count",
                          color="status", title="Tickets by Priority")
 
         with c3:
-            render_chart(self.df, chart_type="line", x="created_at",
-                         title="Tickets Over Time")
+            render_chart(counts_by_day("ticket_counts_hourly"), chart_type="line", x="date",
+                         y="count", title="Tickets Over Time")
 
         st.markdown("---")
         
         # Additional Visualizations Section
         # Advanced Analytics - Direct Display
         st.markdown("### 📈 Advanced IT Analytics")
-        if self.df is not None and not self.df.empty:
+        if self.kpis and self.kpis["total"] > 0:
                 # Row 1: Multiple small charts
                 r1_col1, r1_col2, r1_col3, r1_col4 = st.columns([1, 1, 1, 1])
                 
+                assignees = get_assignee_sla()
+
                 with r1_col1:
                     st.markdown("#### 👥 Assignee")
-                    if "assigned_to" in self.df.columns:
-                        render_chart(self.df, "bar", x="assigned_to", 
-                                   title="By Assignee")
+                    render_chart(assignees, "bar", x="assigned_to", y="tickets",
+                                 title="By Assignee")
                 
                 with r1_col2:
                     st.markdown("#### 📊 Priority")
-                    render_chart(self.df, "histogram", x="priority",
-                               title="Priority Dist")
+                    render_chart(counts_by_dimension("ticket_counts_hourly", "priority"),
+                                 "histogram", x="value", y="count", title="Priority Dist")
                 
                 with r1_col3:
                     st.markdown("#### 🔥 Heatmap")
-                    if "priority" in self.df.columns and "status" in self.df.columns:
-                        render_chart(self.df, "heatmap", groupby=["priority", "status"],
-                                   title="Priority-Status")
+                    render_chart(counts_by_pair("ticket_counts_hourly", "priority", "status"),
+                                 "heatmap", groupby=["priority", "status"], values="count",
+                                 title="Priority-Status")
                 
                 with r1_col4:
                     st.markdown("#### ⏱️ Resolution")
-                    if "resolution_time_hours" in self.df.columns:
-                        render_chart(self.df, "box", x="priority", 
-                                   y="resolution_time_hours",
-                                   title="Res Time")
+                    # A distribution needs raw values: the newest tickets only
+                    render_chart(get_recent_tickets(), "box", x="priority",
+                                 y="resolution_time_hours",
+                                 title="Res Time (recent)")
                 
-                # Row 2: Time-based
-                if "created_at" in self.df.columns:
-                    try:
-                        df_time = self.df.copy()
-                        df_time['created_at'] = pd.to_datetime(df_time['created_at'], errors='coerce')
-                        df_time = df_time.dropna(subset=['created_at'])
-                        
-                        if not df_time.empty:
-                            df_time['day_of_week'] = df_time['created_at'].dt.day_name()
-                            df_time['hour'] = df_time['created_at'].dt.hour
-                            
-                            time_col1, time_col2 = st.columns([1, 1])
-                            
-                            with time_col1:
-                                day_counts = df_time['day_of_week'].value_counts()
-                                day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-                                day_counts = day_counts.reindex([d for d in day_order if d in day_counts.index], fill_value=0)
-                                day_df = pd.DataFrame({'day': day_counts.index, 'count': day_counts.values})
-                                render_chart(day_df, "bar", x="day", y="count",
-                                           title="By Day")
-                            
-                            with time_col2:
-                                hour_counts = df_time['hour'].value_counts().sort_index()
-                                hour_df = pd.DataFrame({'hour': hour_counts.index, 'count': hour_counts.values})
-                                render_chart(hour_df, "line", x="hour", y="count",
-                                           title="By Hour")
-                    except Exception:
-                        pass
+                # Row 2: Time-based analysis (pre-aggregated hourly rollup)
+                try:
+                    time_col1, time_col2 = st.columns([1, 1])
+
+                    with time_col1:
+                        render_chart(counts_by_weekday("ticket_counts_hourly"), "bar", x="day", y="count",
+                                   title="By Day")
+
+                    with time_col2:
+                        render_chart(counts_by_hour("ticket_counts_hourly"), "line", x="hour", y="count",
+                                   title="By Hour")
+                except Exception:
+                    pass
                 
                 # Row 3: Status trends
-                if "created_at" in self.df.columns and "status" in self.df.columns:
-                    try:
-                        df_status_time = self.df.copy()
-                        df_status_time['created_at'] = pd.to_datetime(df_status_time['created_at'], errors='coerce')
-                        df_status_time = df_status_time.dropna(subset=['created_at'])
-                        df_status_time['date'] = df_status_time['created_at'].dt.date
-                        
-                        status_counts = df_status_time.groupby(['date', 'status']).size().reset_index(name='count')
-                        render_chart(status_counts, "area", x="date", y="count", color="status",
-                                   title="Status Trends")
-                    except Exception:
-                        pass
+                try:
+                    render_chart(status_trend("ticket_counts_hourly"), "area", x="date", y="count", color="status",
+                               title="Status Trends")
+                except Exception:
+                    pass
                 
                 # Row 4: Assignee Performance
-                if "assigned_to" in self.df.columns:
-                    assignee_col1, assignee_col2 = st.columns([1, 1])
-                    
-                    with assignee_col1:
-                        if "status" in self.df.columns:
-                            assignee_status = self.df.groupby(['assigned_to', 'status']).size().reset_index(name='count')
-                            render_chart(assignee_status, "bar", x="assigned_to", y="count", color="status",
-                                       title="By Assignee & Status")
-                    
-                    with assignee_col2:
-                        if "resolution_time_hours" in self.df.columns:
-                            avg_res = self.df.groupby('assigned_to')['resolution_time_hours'].mean().reset_index()
-                            avg_res.columns = ['assigned_to', 'avg_resolution_hours']
-                            render_chart(avg_res, "bar", x="assigned_to", y="avg_resolution_hours",
-                                       title="Avg Res Time")
+                assignee_col1, assignee_col2 = st.columns([1, 1])
+
+                with assignee_col1:
+                    render_chart(get_assignee_status_counts(), "bar", x="assigned_to", y="count",
+                                 color="status", title="By Assignee & Status")
+
+                with assignee_col2:
+                    render_chart(assignees, "bar", x="assigned_to", y="avg_resolution_hours",
+                                 title="Avg Res Time")
         else:
             st.info("No data available for advanced analytics")
 
@@ -262,10 +232,13 @@ class ITOperationsDashboard:
         data_col, ai_col = st.columns([2, 1])
         
         with data_col:
-            if self.df is None or self.df.empty:
-                st.info("No tickets.")
-            else:
-                st.dataframe(self.df, height=500)
+            render_search_box("it_search", search_tickets, "ticket_id",
+                              ["priority", "status", "assigned_to", "created_at"])
+            show_desc = st.checkbox("Show descriptions", key="it_grid_desc")
+            render_paginated_grid(
+                "it_grid", get_tickets_page, "ticket_id",
+                columns=None if show_desc else TICKET_SUMMARY_COLUMNS,
+                empty_message="No tickets.")
         
         with ai_col:
             self.render_ai_panel()
@@ -273,7 +246,7 @@ class ITOperationsDashboard:
         st.markdown("---")
         st.subheader("📤 Upload Tickets CSV (Same schema)")
         with st.form("upload_tickets"):
-            f = st.file_uploader("Drop CSV or click", type="csv")
+            f = st.file_uploader("Drop CSV or click", type=UPLOAD_TYPES)
             mode = st.selectbox("Upload mode", ["append", "replace"])
             go = st.form_submit_button("Upload")
             if go:
@@ -282,14 +255,22 @@ class ITOperationsDashboard:
                 else:
                     p = Path("DATA")
                     p.mkdir(exist_ok=True)
+                    # Keep the original suffix so .gz/.zip are decompressed on the fly
+                    suffix = "".join(Path(f.name).suffixes) or ".csv"
                     tmp = p / \
-                        f"uploaded_it_{datetime.now().strftime('%Y%m%d%H%M%S')}.csv"
+                        f"uploaded_it_{datetime.now().strftime('%Y%m%d%H%M%S')}{suffix}"
                     with open(tmp, "wb") as fh:
                         fh.write(f.getbuffer())
+                    progress = st.empty()
                     try:
-                        load_csv_to_table(
-                            str(tmp), "it_tickets", if_exists="replace" if mode == "replace" else "append")
-                        st.success("Uploaded successfully.")
+                        rows = load_csv_to_table(
+                            str(tmp), "it_tickets",
+                            if_exists="replace" if mode == "replace" else "append",
+                            stream=True,
+                            parallel=True,
+                            progress_callback=lambda n, rate: progress.caption(
+                                f"Ingested {n:,} rows ({rate:,.0f} rows/sec)"))
+                        st.success(f"Uploaded {rows:,} rows successfully.")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Upload failed: {e}")
@@ -310,7 +291,7 @@ class ITOperationsDashboard:
                 else:
                     try:
                         insert_ticket(pri, descr.strip(), "Pending", assign.strip(),
-                                      datetime.now().isoformat(), 0)
+                                      utc_now(), 0)
                         st.success("Ticket created successfully!")
                         st.rerun()
                     except Exception as e:
@@ -335,86 +316,40 @@ class ITOperationsDashboard:
         for i, question in enumerate(example_questions):
             if st.button(question, key=f"example_it_{i}"):
                 # Automatically send the question
-                history = load_ai_history(self.username, "it") or []
+                history, _ = load_history_window(self.username, "it")
                 save_ai_message(self.username, "it", "user", question)
                 chat_history = [{"role": r["role"], "content": r["content"]}
                                 for r in history]
 
-                if get_gemini_response:
+                unavailable = ai_unavailable_reason()
+                if unavailable is None:
                     typing_placeholder = st.empty()
                     # Show typing animation
                     typing_placeholder.markdown(
                         "<div class='ai-response'><strong>AI:</strong> <span>Typing<span class='typing-dots'><span>.</span><span>.</span><span>.</span></span></span></div>", 
                         unsafe_allow_html=True
                     )
-                    full = ""
                     try:
-                        for chunk in get_gemini_response(question, chat_history, "it"):
-                            if hasattr(chunk, "text"):
-                                full += chunk.text
-                                typing_placeholder.markdown(
-                                    f"<div class='ai-response'><strong>AI:</strong> {full}▌</div>", 
-                                    unsafe_allow_html=True
-                                )
-                        typing_placeholder.markdown(
-                            f"<div class='ai-response'><strong>AI:</strong> {full}</div>", 
-                            unsafe_allow_html=True
-                        )
-                        save_ai_message(self.username, "it", "assistant", full)
+                        stream = persist_stream(
+                            get_gemini_response(question, chat_history, "it", username=self.username),
+                            self.username, "it")
+                        stream_reply(typing_placeholder, stream, PANEL_TEMPLATE)
                     except Exception as e:
-                        error_msg = f"⚠️ AI Error: {str(e)}"
+                        error_msg = ai_error_message(e)
                         typing_placeholder.markdown(
                             f"<div class='ai-response'><strong>AI:</strong> {error_msg}</div>", 
                             unsafe_allow_html=True
                         )
-                        save_ai_message(self.username, "it", "assistant", error_msg)
                 else:
-                    fallback = f"[Local] Received: {question}"
+                    fallback = f"[Local] Received: {question} (AI unavailable: {unavailable})"
                     save_ai_message(self.username, "it", "assistant", fallback)
                 
                 st.rerun()
 
         st.markdown("---")
 
-        history = load_ai_history(self.username, "it") or []
-        
-        # Show last message outside, previous history in dropdown
-        if history:
-            # Find the last user message (question) and its answer
-            last_user_msg = None
-            last_user_idx = None
-            for i in range(len(history) - 1, -1, -1):
-                if history[i]["role"] == "user":
-                    last_user_msg = history[i]
-                    last_user_idx = i
-                    break
-            
-            # Display last message/question directly (not in expander)
-            if last_user_msg:
-                st.markdown("### 💬 Last Message")
-                st.markdown(f"<div class='ai-chat-bubble-user'><strong>You:</strong> {last_user_msg['content']}</div>", unsafe_allow_html=True)
-                st.caption(last_user_msg["timestamp"])
-                
-                # Show the corresponding answer if it exists
-                if last_user_idx + 1 < len(history) and history[last_user_idx + 1]["role"] == "assistant":
-                    answer = history[last_user_idx + 1]
-                    st.markdown(f"<div class='ai-chat-bubble-assistant'><strong>AI:</strong> {answer['content']}</div>", unsafe_allow_html=True)
-                    st.caption(answer["timestamp"])
-                
-                # Show previous history in dropdown
-                if len(history) > 2:  # More than just the last Q&A pair
-                    previous_history = history[:last_user_idx]
-                    if previous_history:
-                        with st.expander("💬 Previous Chat History", expanded=False):
-                            for msg in previous_history:
-                                cls = "ai-chat-bubble-user" if msg["role"] == "user" else "ai-chat-bubble-assistant"
-                                who = "You" if msg["role"] == "user" else "AI"
-                                st.markdown(f"<div class='{cls}'><strong>{who}:</strong> {msg['content']}</div>", unsafe_allow_html=True)
-                                st.caption(msg["timestamp"])
-            else:
-                st.info("No questions asked yet. Try asking a question above!")
-        else:
-            st.info("No chat history. Try asking a question above!")
+        history = render_chat_window("it_chat", self.username, "it")
+        render_cache_status(self.username, "it")
 
         st.markdown("---")
         
@@ -435,36 +370,27 @@ class ITOperationsDashboard:
             chat_history = [{"role": r["role"], "content": r["content"]}
                             for r in history]
             
-            if get_gemini_response:
+            unavailable = ai_unavailable_reason()
+            if unavailable is None:
                 typing_placeholder = st.empty()
                 # Show typing animation
                 typing_placeholder.markdown(
                     "<div class='ai-response'><strong>AI:</strong> <span>Typing<span class='typing-dots'><span>.</span><span>.</span><span>.</span></span></span></div>", 
                     unsafe_allow_html=True
                 )
-                full = ""
                 try:
-                    for chunk in get_gemini_response(user_message, chat_history, "it"):
-                        if hasattr(chunk, "text"):
-                            full += chunk.text
-                            typing_placeholder.markdown(
-                                f"<div class='ai-response'><strong>AI:</strong> {full}▌</div>", 
-                                unsafe_allow_html=True
-                            )
-                    typing_placeholder.markdown(
-                        f"<div class='ai-response'><strong>AI:</strong> {full}</div>", 
-                        unsafe_allow_html=True
-                    )
-                    save_ai_message(self.username, "it", "assistant", full)
+                    stream = persist_stream(
+                        get_gemini_response(user_message, chat_history, "it", username=self.username),
+                        self.username, "it")
+                    stream_reply(typing_placeholder, stream, PANEL_TEMPLATE)
                 except Exception as e:
-                    error_msg = f"⚠️ AI Error: {str(e)}"
+                    error_msg = ai_error_message(e)
                     typing_placeholder.markdown(
                         f"<div class='ai-response'><strong>AI:</strong> {error_msg}</div>", 
                         unsafe_allow_html=True
                     )
-                    save_ai_message(self.username, "it", "assistant", error_msg)
             else:
-                fallback = f"[Local] Received: {user_message}"
+                fallback = f"[Local] Received: {user_message} (AI unavailable: {unavailable})"
                 st.markdown(
                     f"<div class='ai-response'>{fallback}</div>", unsafe_allow_html=True)
                 try:
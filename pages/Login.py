@@ -1,5 +1,6 @@
 import streamlit as st
 from app.services.user_service import login_user
+from app.ui.session import start_session
 
 
 class LoginPage:
@@ -25,7 +26,7 @@ class LoginPage:
             st.session_state.logged_in = True
             st.session_state.username = self.username
             st.session_state.role = role
-            st.session_state.token = token
+            start_session(token)
             st.session_state.messages = []
 
             if role == "cyber":
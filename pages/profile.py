@@ -1,15 +1,16 @@
 import streamlit as st
-import os
 from pathlib import Path
-from PIL import Image
 
 from app.services.user_service import (
     get_user_by_username,
     update_user_profile_image,
     remove_user_profile_image,
-    get_valid_avatar_path,
+    get_avatar_thumbnail,
+    save_avatar_thumbnails,
 )
 from app.ui.styles import load_custom_css
+from app.ui.session import require_session, end_session, start_session
+from app.services.session_tokens import refresh_session_token, RevocationCheckError
 
 
 class ProfilePage:
@@ -17,14 +18,8 @@ class ProfilePage:
 
     def __init__(self):
         load_custom_css()
-        self.qp = st.query_params
-
-        if "user" not in self.qp or not self.qp.get("user"):
-            st.query_params.clear()
-            st.switch_page("Home.py")
-            st.stop()
-
-        self.username = self.qp.get("user")[0]
+        claims = require_session()
+        self.username = claims["sub"]
         self.user = get_user_by_username(self.username)
 
         if not self.user:
@@ -33,6 +28,17 @@ class ProfilePage:
 
         Path(self.IMAGE_FOLDER).mkdir(parents=True, exist_ok=True)
 
+    def refresh_token(self):
+        """Re-issue the session token so headers pick up the new avatar version."""
+        try:
+            token = refresh_session_token(
+                st.session_state.get("token"), avatar_version=self.user["avatar_version"])
+        except RevocationCheckError as e:
+            st.error(f"Could not refresh your session: {e}")
+            return
+        if token:
+            start_session(token)
+
     def render(self):
         st.title("⚙️ Profile Settings")
         self.render_back_button()
@@ -56,6 +62,7 @@ class ProfilePage:
                     st.cache_data.clear()
                     # Refresh user data
                     self.user = get_user_by_username(self.username)
+                    self.refresh_token()
                     st.rerun()
                 else:
                     st.error(message)
@@ -79,17 +86,16 @@ class ProfilePage:
             )
 
             if st.button("Logout"):
-                st.query_params.clear()
+                end_session()
                 st.switch_page("Home.py")
 
         st.markdown("---")
 
     def render_avatar(self, size=200):
-        avatar = self.user.get("avatar")
-        avatar_path = get_valid_avatar_path(self.username, avatar)
-        
-        if avatar_path and os.path.exists(avatar_path):
-            st.image(avatar_path, width=size)
+        avatar = get_avatar_thumbnail(self.username, size, self.user["avatar_version"])
+
+        if avatar:
+            st.image(avatar, width=size)
             st.markdown(
                 "<style>img{border-radius:100%;border:3px solid #FF1493;}</style>",
                 unsafe_allow_html=True,
@@ -106,21 +112,21 @@ class ProfilePage:
         uploaded = st.file_uploader(
             "Choose an image", type=["png", "jpg", "jpeg"])
 
-        if uploaded:
+        # The uploader keeps its file across reruns; process each upload once
+        if uploaded and st.session_state.get("avatar_upload_id") != uploaded.file_id:
+            st.session_state["avatar_upload_id"] = uploaded.file_id
             self.save_avatar(uploaded)
 
     def save_avatar(self, uploaded):
         try:
-            img = Image.open(uploaded).convert("RGB")
-            save_path = os.path.abspath(
-                os.path.join(self.IMAGE_FOLDER, f"{self.username}.jpg")
-            ).replace("\\", "/")
-
-            img.save(save_path, format="JPEG", quality=85)
+            # Decoded once here; pages only ever load the pre-sized thumbnails
+            save_path = save_avatar_thumbnails(self.username, uploaded)
 
             if update_user_profile_image(self.username, save_path):
                 st.success("Avatar updated.")
                 st.cache_data.clear()
+                self.user = get_user_by_username(self.username)
+                self.refresh_token()
                 st.markdown(
                     "<script>window.location.reload();</script>",
                     unsafe_allow_html=True,
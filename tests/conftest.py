@@ -0,0 +1,22 @@
+import pytest
+
+from app.data.cache import query_cache
+from app.data.schema import create_all_tables
+from app.services import database_manager
+from app.services.database_manager import DatabaseManager
+from app.services.write_queue import write_queue
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """Point the process-wide pool at a fresh database with every table created."""
+    previous = database_manager.db_manager
+    manager = DatabaseManager(tmp_path / "test.db")
+    database_manager.db_manager = manager
+    query_cache.clear()
+    create_all_tables(manager.get_connection())
+    yield manager
+    write_queue.flush()
+    manager.close_all()
+    query_cache.clear()
+    database_manager.db_manager = previous
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from app.data.cache import QueryCache
+
+
+def test_failed_compute_releases_its_key(db_manager):
+    cache = QueryCache()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", fail)
+    assert cache._inflight == {}
+    assert cache.get_or_compute("key", lambda: 42) == 42
+
+
+def test_data_version_is_read_once_per_interval(db_manager):
+    cache = QueryCache(version_interval=60)
+    statements = []
+    cache.get_or_compute("warm", lambda: 0)
+    cache._version_conn.set_trace_callback(statements.append)
+
+    for i in range(50):
+        cache.get_or_compute(("key", i % 5), lambda: i)
+    assert statements == []
+    assert cache.stats()["hits"] == 45
+
+
+def test_other_process_writes_invalidate_after_interval(db_manager):
+    cache = QueryCache(version_interval=0)
+    assert cache.get_or_compute("key", lambda: "old") == "old"
+
+    # A writer outside the pool: no generation bump, only data_version moves
+    other = sqlite3.connect(db_manager.db_path)
+    other.execute("INSERT INTO users (username, password_hash) VALUES ('x', 'y')")
+    other.commit()
+    other.close()
+
+    assert cache.get_or_compute("key", lambda: "new") == "new"
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+from app.data.db import connect_database
+from app.data.schema import migrate_enum_columns
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    conn = connect_database(tmp_path / "legacy.db")
+    conn.execute("""
+    CREATE TABLE cyber_incidents (
+        incident_id INTEGER PRIMARY KEY, timestamp TEXT, severity TEXT,
+        category TEXT, status TEXT, description TEXT)""")
+    conn.executemany(
+        "INSERT INTO cyber_incidents VALUES (?, '2024-01-01', ?, 'Phishing', 'Open', 'd')",
+        [(1, "High"), (2, "Low")])
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_plain_table_is_moved_to_coded_storage(legacy_db):
+    migrate_enum_columns(legacy_db)
+
+    assert [r[0] for r in legacy_db.execute(
+        "SELECT value FROM incident_severities ORDER BY code")] == ["High", "Low"]
+    assert legacy_db.execute("SELECT COUNT(*) FROM cyber_incidents_base").fetchone()[0] == 2
+
+
+def test_failed_copy_leaves_the_table_untouched(legacy_db):
+    # A leftover storage table makes the copy fail after the lookups are filled
+    legacy_db.execute("CREATE TABLE cyber_incidents_base (x)")
+    legacy_db.commit()
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate_enum_columns(legacy_db)
+
+    assert not legacy_db.in_transaction
+    assert legacy_db.execute("SELECT COUNT(*) FROM incident_severities").fetchone()[0] == 0
+    assert legacy_db.execute("SELECT COUNT(*) FROM cyber_incidents").fetchone()[0] == 2
@@ -0,0 +1,65 @@
+import csv
+import random
+
+import pytest
+
+from app.data import datasets
+from app.data.schema import create_all_tables
+from app.services import database_manager
+from app.services.database_manager import DatabaseManager
+
+ROWS = 2000
+
+
+def write_export(path, n, seed=42):
+    """A tickets export with quoted, multi-line descriptions and blank cells."""
+    rng = random.Random(seed)
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(datasets.TABLE_SCHEMAS["it_tickets"])
+        for i in range(1, n + 1):
+            description = f"Ticket {i}: user reports \"{rng.choice(['Open', 'Closed'])}\" error"
+            if i % 7 == 0:
+                description += "\nsecond line, with a comma\nand a third"
+            writer.writerow([
+                i, rng.choice(["Low", "Medium", "High"]), description,
+                rng.choice(["Open", "Resolved"]), f"analyst{rng.randint(1, 40)}",
+                f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 09:00:00",
+                rng.randint(1, 240) if i % 11 else "",
+            ])
+
+
+def load_rows(db_path, csv_path, **kwargs):
+    """Load csv_path into a fresh database and return (rows loaded, table rows)."""
+    manager = DatabaseManager(db_path)
+    database_manager.db_manager = manager
+    try:
+        create_all_tables(manager.get_connection())
+        loaded = datasets.load_csv_to_table(csv_path, "it_tickets", **kwargs)
+        rows = manager.get_connection().execute(
+            "SELECT ticket_id, priority, description, status, assigned_to, created_at, "
+            "resolution_time_hours, typeof(resolution_time_hours) FROM it_tickets "
+            "ORDER BY rowid").fetchall()
+    finally:
+        manager.close_all()
+    return loaded, rows
+
+
+@pytest.fixture
+def export(db_manager, tmp_path, monkeypatch):
+    # Small ranges so quoted, multi-line descriptions straddle range boundaries
+    monkeypatch.setattr(datasets, "PARALLEL_RANGE_BYTES", 4096)
+    csv_path = tmp_path / "tickets.csv"
+    write_export(csv_path, ROWS)
+    assert len(datasets.split_csv_ranges(csv_path)[1]) > 10
+    return csv_path
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_parallel_load_matches_stream_load(export, tmp_path, workers):
+    loaded, expected = load_rows(tmp_path / "stream.db", export, stream=True)
+    parallel_loaded, rows = load_rows(tmp_path / f"parallel{workers}.db", export,
+                                      parallel=True, workers=workers)
+
+    assert loaded == parallel_loaded == ROWS
+    assert rows == expected
@@ -0,0 +1,31 @@
+import pytest
+
+pytest.importorskip("streamlit")
+
+from app.services.ai_service import persist_stream
+from app.services.llm_providers import TextChunk
+from app.services.write_queue import write_queue
+from DATA.ai_history import load_history
+
+
+def _failing_stream(*texts):
+    for text in texts:
+        yield TextChunk(text)
+    raise RuntimeError("connection reset")
+
+
+def _assistant_rows():
+    write_queue.flush()
+    return [m for m in load_history("analyst", "cyber") if m["role"] == "assistant"]
+
+
+@pytest.mark.parametrize("texts", [(), ("partial ", "reply")])
+def test_failed_stream_saves_one_row_with_the_error(db_manager, texts):
+    with pytest.raises(RuntimeError):
+        for _ in persist_stream(_failing_stream(*texts), "analyst", "cyber"):
+            pass
+
+    rows = _assistant_rows()
+    assert len(rows) == 1
+    assert rows[0]["content"].startswith("".join(texts))
+    assert rows[0]["content"].endswith("AI Error: connection reset")
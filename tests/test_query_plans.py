@@ -0,0 +1,148 @@
+"""Every data-layer query must be served by an index, never a full SCAN.
+
+Each reader/writer in app/data and DATA/ai_history is called against a
+seeded database while the SQL it issues is traced; every traced statement
+is then run through EXPLAIN QUERY PLAN.
+"""
+import pytest
+
+from app.data import incidents, tickets, datasets, users, kpis, search, rollups
+from app.data.schema import ROLLUPS, storage_table
+from DATA import ai_history
+
+# Readers that intentionally return every row; they may scan, but the
+# ordering must still come from an index rather than a temp sort.
+FULL_READS = {"get_all_incidents", "get_all_tickets",
+              "list_datasets", "list_users"}
+
+# Newest-N readers for distribution charts; they walk the primary key
+# backwards and stop at the limit.
+BOUNDED_READS = {"get_recent_tickets", "list_recent_datasets"}
+
+# Whole-table aggregates (KPI rows, chart counts); they may scan and sort
+# their (small) grouped output, but grouping itself must be index-driven.
+AGGREGATE_READS = {"get_incident_kpis", "get_ticket_kpis", "get_dataset_kpis",
+                   "get_assignee_sla", "get_severity_category_counts",
+                   "get_assignee_status_counts", "get_uploads_by_day",
+                   "get_uploader_summary", "get_column_counts"}
+
+# Readers over the pre-aggregated rollups; they may scan and group the
+# rollup itself but must never scan the tables it summarises.
+ROLLUP_BASE_TABLES = {storage_table(table) for _, table, *_ in ROLLUPS}
+
+TRACED_PREFIXES = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+DATA_LAYER_CALLS = [
+    (incidents.get_all_incidents, ()),
+    (incidents.get_incidents_page, (1, 50)),
+    (incidents.get_incidents_between, ("2024-01-01", "2024-02-01")),
+    (incidents.get_incident_by_id, (1,)),
+    (incidents.update_incident_status, (1, "Closed")),
+    (incidents.get_incidents_by_type_count, ()),
+    (incidents.get_high_severity_by_status, ()),
+    (incidents.delete_incident, (2,)),
+    (incidents.get_severity_category_counts, ()),
+    (tickets.get_all_tickets, ()),
+    (tickets.get_tickets_page, (1, 50)),
+    (tickets.get_tickets_between, ("2024-01-01", "2024-02-01")),
+    (tickets.get_ticket_by_id, (1,)),
+    (tickets.update_ticket_status, (1, "Resolved")),
+    (tickets.delete_ticket, (2,)),
+    (tickets.get_recent_tickets, ()),
+    (tickets.get_assignee_status_counts, ()),
+    (datasets.list_datasets, ()),
+    (datasets.list_datasets_page, (1, 50)),
+    (datasets.list_datasets_between, ("2024-01-01", "2024-02-01")),
+    (datasets.list_recent_datasets, ()),
+    (datasets.get_uploads_by_day, ()),
+    (datasets.get_uploader_summary, ()),
+    (datasets.get_column_counts, ()),
+    (kpis.get_incident_kpis, ()),
+    (kpis.get_ticket_kpis, ()),
+    (kpis.get_dataset_kpis, ()),
+    (kpis.get_assignee_sla, ()),
+    (kpis.get_top_datasets, (5,)),
+    (rollups.counts_by_weekday, ("incident_counts_hourly",)),
+    (rollups.counts_by_hour, ("incident_counts_hourly",)),
+    (rollups.counts_by_day, ("ticket_counts_hourly",)),
+    (rollups.status_trend, ("ticket_counts_hourly",)),
+    (rollups.counts_by_dimension, ("incident_counts_hourly", "severity")),
+    (rollups.counts_by_pair, ("ticket_counts_hourly", "priority", "status")),
+    (rollups.recent_window_counts, ("incident_counts_hourly",)),
+    (search.search_incidents, ("phishing",)),
+    (search.search_tickets, ("printer",)),
+    (users.get_user_by_username, ("analyst",)),
+    (users.list_users, ()),
+    (ai_history.load_history, ("analyst", "cyber")),
+    (ai_history.load_history_window, ("analyst", "cyber", 20, 100)),
+    (ai_history.delete_history, ("analyst", "cyber")),
+]
+
+
+def seed(conn):
+    conn.executemany(
+        "INSERT INTO cyber_incidents "
+        "(incident_id, timestamp, severity, category, status, description) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, f"2024-01-0{i} 10:00:00", "High", "Phishing", "Open", "d")
+         for i in range(1, 4)])
+    conn.executemany(
+        "INSERT INTO it_tickets "
+        "(ticket_id, priority, description, status, assigned_to, created_at, resolution_time_hours) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(i, "High", "d", "Open", "IT_Support_A", f"2024-01-0{i}", 4)
+         for i in range(1, 4)])
+    conn.execute(
+        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+        ("analyst", "x", "cyber"))
+    conn.execute(
+        "INSERT INTO ai_chat_history (username, role, message_role, content, timestamp) "
+        "VALUES ('analyst', 'cyber', 'user', 'hi', '2024-01-01')")
+    conn.commit()
+
+
+def plan_problems(conn, sql, full_read=False, aggregate=False, rollup=False):
+    """Return the plan lines that indicate an unindexed access path."""
+    problems = []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall():
+        detail = row[-1]
+        if rollup:
+            if detail.startswith("SCAN") and detail.split()[1] in ROLLUP_BASE_TABLES:
+                problems.append(detail)
+        elif aggregate:
+            if "TEMP B-TREE FOR GROUP BY" in detail:
+                problems.append(detail)
+        elif detail.startswith("SCAN") and "INDEX" not in detail and not full_read:
+            problems.append(detail)
+        elif "TEMP B-TREE FOR GROUP BY" in detail:
+            problems.append(detail)
+        elif full_read and "TEMP B-TREE FOR ORDER BY" in detail:
+            problems.append(detail)
+    return problems
+
+
+@pytest.mark.parametrize(
+    "fn, args", DATA_LAYER_CALLS,
+    ids=[f"{fn.__module__}.{fn.__name__}" for fn, _ in DATA_LAYER_CALLS])
+def test_query_uses_index(db_manager, fn, args):
+    conn = db_manager.get_connection()
+    seed(conn)
+
+    traced = []
+    conn.set_trace_callback(traced.append)
+    # Inside a unit of work, writes run on this connection instead of the
+    # write queue, so they are traced too
+    try:
+        with db_manager.unit_of_work():
+            fn(*args)
+    finally:
+        conn.set_trace_callback(None)
+
+    statements = [sql for sql in traced
+                  if sql.lstrip().upper().startswith(TRACED_PREFIXES)]
+    assert statements, f"{fn.__name__} issued no traced queries"
+    for sql in statements:
+        problems = plan_problems(conn, sql, fn.__name__ in FULL_READS | BOUNDED_READS,
+                                 fn.__name__ in AGGREGATE_READS,
+                                 fn.__module__ == rollups.__name__)
+        assert not problems, f"{fn.__name__}: {problems}\n{sql}"
@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from app.services import ai_service
+
+
+def _keys(db_manager):
+    return {r[0] for r in db_manager.get_connection().execute(
+        "SELECT cache_key FROM ai_response_cache")}
+
+
+def test_entries_expire_by_age_even_when_hit(db_manager):
+    ai_service.store_cached_response("old", "cyber", "q", "v", "m", "answer")
+    # Age the entry past the TTL while it keeps being used
+    db_manager.get_connection().execute(
+        "UPDATE ai_response_cache SET created_at = ?, last_used = ?",
+        (time.time() - ai_service.RESPONSE_CACHE_TTL - 1, time.time()))
+    db_manager.get_connection().commit()
+
+    assert ai_service.get_cached_response("old") is None
+    ai_service.store_cached_response("new", "cyber", "q2", "v", "m", "answer")
+
+    assert _keys(db_manager) == {"new"}
@@ -0,0 +1,48 @@
+from app.data import incidents, kpis, rollups
+from app.data.schema import create_rollup_tables
+
+
+def _status_totals():
+    df = rollups.counts_by_dimension.__wrapped__("incident_counts_hourly", "status")
+    return dict(zip(df["value"], df["count"]))
+
+
+def test_undated_rows_count_towards_dimension_totals(db_manager):
+    incidents.insert_incident("2024-01-01 10:00:00", "High", "Phishing", "Open", "d")
+    incidents.insert_incident(None, "High", "Phishing", "Open", "d")
+    incidents.insert_incident("not a date", "Low", "Malware", "Closed", "d")
+
+    assert _status_totals() == {"Open": 2, "Closed": 1}
+    assert sum(_status_totals().values()) == kpis.get_incident_kpis.__wrapped__()["total"]
+    # Time charts only see the dated row
+    assert rollups.counts_by_hour.__wrapped__("incident_counts_hourly")["count"].sum() == 1
+
+
+def test_emptied_groups_are_removed(db_manager):
+    first = incidents.insert_incident("2024-01-01 10:00:00", "High", "Phishing", "Open", "d")
+    second = incidents.insert_incident(None, "High", "Phishing", "Open", "d")
+    incidents.update_incident_status(first, "Closed")
+    incidents.delete_incident(second)
+
+    conn = db_manager.get_connection()
+    assert conn.execute(
+        "SELECT COUNT(*) FROM incident_counts_hourly WHERE count <= 0").fetchone()[0] == 0
+    assert _status_totals() == {"Closed": 1}
+
+
+def test_stale_triggers_are_replaced_and_rollup_rebuilt(db_manager):
+    conn = db_manager.get_connection()
+    incidents.insert_incident(None, "High", "Phishing", "Open", "d")
+    # An older trigger body, and a rollup missing the undated row
+    conn.execute("DROP TRIGGER trg_incident_counts_hourly_insert")
+    conn.execute("""
+    CREATE TRIGGER trg_incident_counts_hourly_insert
+    AFTER INSERT ON cyber_incidents_base BEGIN SELECT 1; END""")
+    conn.execute("DELETE FROM incident_counts_hourly")
+    conn.commit()
+
+    create_rollup_tables(conn)
+
+    assert _status_totals() == {"Open": 1}
+    incidents.insert_incident(None, "Low", "Malware", "Closed", "d")
+    assert _status_totals() == {"Open": 1, "Closed": 1}
@@ -0,0 +1,49 @@
+import pytest
+
+from app.services import session_tokens
+from app.services.session_tokens import (
+    issue_session_token, revoke_session_token, verify_session_token, RevocationCheckError)
+
+
+@pytest.fixture
+def tokens(db_manager, monkeypatch):
+    monkeypatch.setattr(session_tokens, "_secret", b"test-secret")
+    monkeypatch.setattr(session_tokens, "_revocations",
+                        {"version": None, "checked": 0.0, "token_ids": frozenset()})
+    return db_manager
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-token", "a.b.c", "eyJ9.é", "é.ü", None])
+def test_malformed_tokens_are_rejected(tokens, token):
+    assert verify_session_token(token) is None
+
+
+def test_tampered_signature_is_rejected(tokens):
+    payload, signature = issue_session_token("analyst", "cyber").split(".")
+    assert verify_session_token(f"{payload}.{signature[:-1]}é") is None
+
+
+def _break_revocation_table(manager):
+    conn = manager.get_connection()
+    conn.execute("DROP TABLE revoked_sessions")
+    conn.commit()
+    session_tokens._revocations["checked"] = 0.0
+
+
+def test_revoked_token_stays_rejected_when_lookup_fails(tokens):
+    revoked = issue_session_token("analyst", "cyber")
+    assert revoke_session_token(revoked)
+    assert verify_session_token(revoked) is None
+
+    _break_revocation_table(tokens)
+
+    assert verify_session_token(revoked) is None
+    assert verify_session_token(issue_session_token("analyst", "cyber"))["sub"] == "analyst"
+
+
+def test_lookup_failure_without_a_loaded_list_rejects(tokens):
+    _break_revocation_table(tokens)
+
+    with pytest.raises(RevocationCheckError):
+        verify_session_token(issue_session_token("analyst", "cyber"))
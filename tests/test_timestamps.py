@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from app.data.timestamps import to_epoch, utc_now
+from app.services.write_queue import write_queue
+from DATA.ai_history import save_message
+
+
+@pytest.fixture
+def non_utc_clock(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_utc_now_is_read_back_as_the_current_epoch(non_utc_clock):
+    assert abs(to_epoch(utc_now()) - time.time()) < 5
+
+
+def test_written_timestamps_round_trip_through_ts_epoch(db_manager, non_utc_clock):
+    before = int(time.time())
+    save_message("analyst", "cyber", "user", "hi")
+    write_queue.flush()
+    after = int(time.time()) + 1
+
+    ts, ts_epoch = db_manager.get_connection().execute(
+        "SELECT timestamp, ts_epoch FROM ai_chat_history").fetchone()
+    assert ts_epoch == to_epoch(ts)
+    assert before <= ts_epoch <= after
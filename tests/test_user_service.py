@@ -0,0 +1,25 @@
+import pytest
+
+from app.services import user_service
+
+TARGET_COST = 12
+
+
+def _hash_at(cost):
+    return f"$2b${cost:02d}$" + "x" * 53
+
+
+@pytest.fixture(autouse=True)
+def pinned_cost(monkeypatch):
+    monkeypatch.setattr(user_service, "target_cost", lambda: TARGET_COST)
+
+
+def test_lower_cost_hashes_are_upgraded():
+    assert user_service.needs_rehash(_hash_at(TARGET_COST - 1))
+    assert user_service.needs_rehash("not a bcrypt hash")
+
+
+def test_equal_or_higher_cost_hashes_are_kept():
+    # A host that calibrated higher must not be downgraded by this one
+    assert not user_service.needs_rehash(_hash_at(TARGET_COST))
+    assert not user_service.needs_rehash(_hash_at(TARGET_COST + 1))
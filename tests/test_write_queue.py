@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+from app.services.write_queue import WriteQueue
+
+
+def test_failed_command_is_rolled_back_alone_and_nothing_is_rerun(db_manager):
+    queue = WriteQueue()
+    calls = []
+
+    def insert(conn, username):
+        calls.append(username)
+        conn.execute("INSERT INTO users (username, password_hash) VALUES (?, 'x')", (username,))
+
+    def insert_then_fail(conn, username):
+        insert(conn, username)
+        raise RuntimeError("boom")
+
+    # Hold the writer on a first command so the rest queue up as one group
+    gate = threading.Event()
+    queue.submit(lambda conn: gate.wait(5))
+    futures = [queue.submit(insert, "before"),
+               queue.submit(insert_then_fail, "failed"),
+               queue.submit(insert, "after")]
+    gate.set()
+    futures[0].result(5)
+    with pytest.raises(RuntimeError):
+        futures[1].result(5)
+    futures[2].result(5)
+    queue.shutdown()
+
+    assert queue.stats()["groups"] <= 2  # the three commands shared a group
+    assert calls == ["before", "failed", "after"]
+    rows = db_manager.get_connection().execute("SELECT username FROM users").fetchall()
+    assert sorted(r[0] for r in rows) == ["after", "before"]